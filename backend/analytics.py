@@ -0,0 +1,101 @@
+"""Server-side aggregations behind /api/analytics/dashboard and /api/dashboard/stats.
+
+Every figure is grouped inside MongoDB and only the grouped numbers come
+back, so the cost no longer depends on pulling whole collections into the
+API process (and nothing is silently cut off at 10,000 rows).
+"""
+import asyncio
+
+from datecodec import shop_timezone
+
+MONTHS_SHOWN = 6
+
+
+def _month_of(field):
+    """Shop-local ``YYYY-MM`` of a BSON date field."""
+    return {"$dateToString": {"format": "%Y-%m", "date": field, "timezone": shop_timezone().key}}
+
+
+# Pipeline tail keeping the most recent MONTHS_SHOWN month groups
+LAST_MONTHS = [{"$sort": {"_id": -1}}, {"$limit": MONTHS_SHOWN}]
+
+
+def _booking_pipeline():
+    return [{"$facet": {
+        "by_status": [
+            {"$group": {"_id": {"$ifNull": ["$status", "Unknown"]}, "count": {"$sum": 1}}},
+        ],
+        "by_month": [
+            # appointment_day is already the shop-local day, so its first 7 characters are the month
+            {"$match": {"appointment_day": {"$type": "string"}}},
+            {"$group": {"_id": {"$substrCP": ["$appointment_day", 0, 7]}, "count": {"$sum": 1}}},
+            *LAST_MONTHS,
+        ],
+        "by_zone": [
+            {"$group": {"_id": "$zone_id", "count": {"$sum": 1}}},
+        ],
+    }}]
+
+
+def _invoice_pipeline():
+    return [{"$facet": {
+        "by_month": [
+            {"$match": {"created_at": {"$type": "date"}}},
+            {"$group": {"_id": _month_of("$created_at"), "revenue": {"$sum": "$total"}}},
+            *LAST_MONTHS,
+        ],
+        "total": [
+            {"$group": {"_id": None, "revenue": {"$sum": "$total"}}},
+        ],
+    }}]
+
+
+def _customer_pipeline():
+    return [
+        {"$match": {"created_at": {"$type": "date"}}},
+        {"$group": {"_id": _month_of("$created_at"), "count": {"$sum": 1}}},
+        *LAST_MONTHS,
+    ]
+
+
+async def dashboard_analytics(db):
+    """Compute the analytics dashboard payload with concurrent aggregations."""
+    bookings, invoices, customers, zones = await asyncio.gather(
+        db.bookings.aggregate(_booking_pipeline()).to_list(1),
+        db.invoices.aggregate(_invoice_pipeline()).to_list(1),
+        db.customers.aggregate(_customer_pipeline()).to_list(MONTHS_SHOWN),
+        db.zones.find({}, {"_id": 0, "zone_id": 1, "name": 1}).to_list(1000),
+    )
+    bookings, invoices = bookings[0], invoices[0]
+
+    bookings_per_zone = {row['_id']: row['count'] for row in bookings['by_zone']}
+    total = invoices['total'][0]['revenue'] if invoices['total'] else 0
+
+    return {
+        "bookings_by_status": {row['_id']: row['count'] for row in bookings['by_status']},
+        "bookings_by_month": {row['_id']: row['count'] for row in reversed(bookings['by_month'])},
+        "revenue_by_month": {row['_id']: row['revenue'] for row in reversed(invoices['by_month'])},
+        "zone_utilization": {zone['name']: bookings_per_zone.get(zone['zone_id'], 0) for zone in zones},
+        "customers_by_month": {row['_id']: row['count'] for row in reversed(customers)},
+        "total_revenue": total,
+    }
+
+
+async def dashboard_stats(db):
+    """Counts behind /api/dashboard/stats: one grouped pass per collection, run concurrently."""
+    customers, bookings, zones = await asyncio.gather(
+        db.customers.count_documents({}),
+        db.bookings.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]).to_list(None),
+        db.zones.aggregate([{"$group": {"_id": "$is_active", "count": {"$sum": 1}}}]).to_list(None),
+    )
+    by_status = {row['_id']: row['count'] for row in bookings}
+    by_active = {row['_id']: row['count'] for row in zones}
+
+    return {
+        "total_customers": customers,
+        "total_bookings": sum(by_status.values()),
+        "pending_bookings": by_status.get("Pending", 0),
+        "completed_bookings": by_status.get("Completed", 0),
+        "total_zones": sum(by_active.values()),
+        "active_zones": by_active.get(True, 0),
+    }
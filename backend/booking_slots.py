@@ -0,0 +1,188 @@
+"""Atomic zone reservations built on unique per-zone slot keys.
+
+A booking claims every fixed-width time slot its interval touches as a
+document in ``booking_slots``, which carries a unique index on
+``(zone_id, slot)``. Two bookings that overlap share at least one slot, so the
+database itself rejects the second claim: the check is a handful of index
+lookups no matter how long the zone's history is, and concurrent requests for
+the same time resolve to exactly one winner.
+
+Slots are claimed before the booking document is written, so a process that
+dies in between leaves slots behind with no booking. A claim whose booking is
+missing or cancelled and which is older than ``STALE_CLAIM_SECONDS`` is
+treated as abandoned and taken over by the next booking that needs it.
+"""
+from datetime import datetime, timedelta, timezone
+
+from pymongo.errors import BulkWriteError
+
+from datecodec import to_utc
+
+# A claim this old without an active booking behind it is abandoned
+STALE_CLAIM_SECONDS = 300
+
+# Times a reservation retries after taking over abandoned slots
+MAX_TAKEOVERS = 3
+
+
+class SlotConflict(Exception):
+    """Raised when a slot in the requested window is held by another booking."""
+
+    def __init__(self, booking_id):
+        super().__init__(f"Slot held by booking {booking_id}")
+        self.booking_id = booking_id
+
+
+def slot_keys(start, end, slot_minutes):
+    """Start times (aware UTC) of every slot intersecting ``[start, end)``."""
+    step = slot_minutes * 60
+    end_ts = to_utc(end).timestamp()
+    ts = to_utc(start).timestamp() // step * step
+    keys = []
+    while ts < end_ts:
+        keys.append(datetime.fromtimestamp(ts, timezone.utc))
+        ts += step
+    return keys
+
+
+def on_grid(start, duration_minutes, slot_minutes):
+    """True when ``start`` and the booking's end both fall on slot boundaries.
+
+    Only such windows map exactly onto slots; any other window also claims the
+    partial slots at its ends and can clash with a neighbour it does not overlap.
+    """
+    step = slot_minutes * 60
+    return to_utc(start).timestamp() % step == 0 and duration_minutes % slot_minutes == 0
+
+
+async def take_over_stale(db, holders, stale_after=STALE_CLAIM_SECONDS):
+    """Release the slots of ``holders`` that are abandoned claims; returns the released ids.
+
+    A holder is abandoned when its booking is missing or cancelled and none of
+    its slots was claimed within ``stale_after`` seconds (a fresh claim may
+    belong to a booking that is still being written).
+    """
+    holders = list(set(holders))
+    if not holders:
+        return set()
+    active = {
+        b['booking_id']
+        async for b in db.bookings.find(
+            {"booking_id": {"$in": holders}, "status": {"$ne": "Cancelled"}}, {"_id": 0, "booking_id": 1}
+        )
+    }
+    candidates = [holder for holder in holders if holder not in active]
+    if not candidates:
+        return set()
+    cutoff = datetime.now(timezone.utc) - timedelta(seconds=stale_after)
+    recent = {
+        s['booking_id']
+        async for s in db.booking_slots.find(
+            {"booking_id": {"$in": candidates}, "claimed_at": {"$gte": cutoff}}, {"_id": 0, "booking_id": 1}
+        )
+    }
+    stale = [holder for holder in candidates if holder not in recent]
+    if stale:
+        await db.booking_slots.delete_many({
+            "booking_id": {"$in": stale},
+            "$or": [{"claimed_at": {"$lt": cutoff}}, {"claimed_at": {"$exists": False}}]
+        })
+    return set(stale)
+
+
+async def reserve_slots(db, zone_id, booking_id, start, end, slot_minutes):
+    """Claim the zone's slots for ``[start, end)`` on behalf of ``booking_id``.
+
+    Slots the booking already holds are kept, so rescheduling only claims the
+    difference. Slots are inserted in time order; on a duplicate key the
+    partial claim is rolled back and, unless the holder's claim is abandoned
+    and can be taken over, ``SlotConflict`` names the holder.
+    """
+    wanted = slot_keys(start, end, slot_minutes)
+    held = {
+        to_utc(s['slot'])
+        async for s in db.booking_slots.find({"booking_id": booking_id}, {"_id": 0, "slot": 1})
+    }
+    missing = [s for s in wanted if s not in held]
+
+    for attempt in range(MAX_TAKEOVERS + 1):
+        if not missing:
+            break
+        claimed_at = datetime.now(timezone.utc)
+        try:
+            await db.booking_slots.insert_many(
+                [{"zone_id": zone_id, "slot": s, "booking_id": booking_id, "claimed_at": claimed_at} for s in missing],
+                ordered=True
+            )
+            break
+        except BulkWriteError as e:
+            await db.booking_slots.delete_many({"booking_id": booking_id, "slot": {"$in": missing}})
+            write_errors = e.details.get('writeErrors', [])
+            if not write_errors or write_errors[0].get('code') != 11000:
+                raise
+            slot = write_errors[0]['op']['slot']
+            holder = await db.booking_slots.find_one({"zone_id": zone_id, "slot": slot}, {"_id": 0, "booking_id": 1})
+            if attempt == MAX_TAKEOVERS:
+                raise SlotConflict(holder['booking_id'] if holder else None)
+            # Retry if the slot was freed meanwhile or its claim was abandoned
+            if holder is not None and not await take_over_stale(db, [holder['booking_id']]):
+                raise SlotConflict(holder['booking_id'])
+
+    stale = list(held.difference(wanted))
+    if stale:
+        await db.booking_slots.delete_many({"booking_id": booking_id, "slot": {"$in": stale}})
+
+
+async def reserve_many(db, zone_id, windows, slot_minutes):
+    """Claim slots for several bookings in one zone at once.
+
+    ``windows`` maps booking ids to ``(start, end)``. Slots already held are
+    found with a single ``$in`` lookup and the rest are inserted with one
+    unordered ``insert_many``; windows that overlap a held slot, an earlier
+    window of the same call or a concurrent claim get nothing. Returns
+    ``{booking_id: holder}`` for the windows that were not reserved, where
+    ``holder`` is the conflicting booking's id (None if it is gone already).
+    Abandoned claims found by the lookup are taken over first.
+    """
+    keys = {booking_id: slot_keys(start, end, slot_minutes) for booking_id, (start, end) in windows.items()}
+    wanted = {slot for slots in keys.values() for slot in slots}
+    held = {}
+    if wanted:
+        async for s in db.booking_slots.find({"zone_id": zone_id, "slot": {"$in": list(wanted)}}, {"_id": 0, "slot": 1, "booking_id": 1}):
+            held[to_utc(s['slot'])] = s['booking_id']
+        released = await take_over_stale(db, held.values())
+        held = {slot: holder for slot, holder in held.items() if holder not in released}
+
+    conflicts = {}
+    claims = []
+    claimed_at = datetime.now(timezone.utc)
+    for booking_id, slots in sorted(keys.items(), key=lambda item: to_utc(windows[item[0]][0])):
+        holder = next((held[slot] for slot in slots if slot in held), None)
+        if holder is not None:
+            conflicts[booking_id] = holder
+            continue
+        for slot in slots:
+            held[slot] = booking_id
+        claims.extend({"zone_id": zone_id, "slot": slot, "booking_id": booking_id, "claimed_at": claimed_at} for slot in slots)
+
+    if claims:
+        try:
+            await db.booking_slots.insert_many(claims, ordered=False)
+        except BulkWriteError as e:
+            write_errors = e.details.get('writeErrors', [])
+            if any(error.get('code') != 11000 for error in write_errors):
+                await db.booking_slots.delete_many({"booking_id": {"$in": list(keys)}})
+                raise
+            # Lost a race for these slots: drop whatever those bookings did get
+            lost = {claims[error['index']]['booking_id']: claims[error['index']]['slot'] for error in write_errors}
+            await db.booking_slots.delete_many({"booking_id": {"$in": list(lost)}})
+            for booking_id, slot in lost.items():
+                holder = await db.booking_slots.find_one({"zone_id": zone_id, "slot": slot}, {"_id": 0, "booking_id": 1})
+                conflicts[booking_id] = holder['booking_id'] if holder else None
+    return conflicts
+
+
+async def release_slots(db, booking_id):
+    """Free every slot held by a booking (cancellation or failed insert)."""
+    await db.booking_slots.delete_many({"booking_id": booking_id})
+
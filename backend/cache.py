@@ -0,0 +1,131 @@
+"""Small in-process caches with hit/miss accounting."""
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """Bounded LRU cache whose entries also expire after ``ttl`` seconds.
+
+    Not shared between uvicorn workers: ``ttl`` is the upper bound on how
+    long a worker can serve a value after another worker changed it.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._data = OrderedDict()
+        self._inflight = {}
+
+    def __len__(self):
+        return len(self._data)
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is not None:
+            expires_at, value = entry
+            if expires_at > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return value
+            del self._data[key]
+        self.misses += 1
+        return default
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+        if ttl <= 0 or self.maxsize <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get_or_compute(self, key, compute):
+        """Cached value for ``key``, awaiting ``compute()`` on a miss.
+
+        Concurrent misses for the same key share one in-flight computation
+        instead of each running ``compute`` (counted as ``coalesced``).
+        """
+        _missing = object()
+        value = self.get(key, _missing)
+        if value is not _missing:
+            return value
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+        task = asyncio.ensure_future(compute())
+        self._inflight[key] = task
+        try:
+            value = await asyncio.shield(task)
+        finally:
+            self._inflight.pop(key, None)
+        self.set(key, value)
+        return value
+
+    def invalidate(self, key):
+        self._data.pop(key, None)
+
+    def invalidate_where(self, predicate):
+        """Drop every entry whose value matches ``predicate``."""
+        for key in [k for k, (_, v) in self._data.items() if predicate(v)]:
+            del self._data[key]
+
+    def invalidate_keys(self, predicate):
+        """Drop every entry whose key matches ``predicate``."""
+        for key in [k for k in self._data if predicate(k)]:
+            del self._data[key]
+
+    def clear(self):
+        self._data.clear()
+
+    def stats(self):
+        """Counters since start; coalesced misses count as hits since they did not recompute."""
+        lookups = self.hits + self.misses
+        served = self.hits + self.coalesced
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_ratio": round(served / lookups, 4) if lookups else 0.0,
+        }
+
+
+class VersionedCache:
+    """Read-through cache of whole reference collections, one version counter per name.
+
+    ``invalidate(name)`` bumps the version, so a load that started before a
+    write can never repopulate the cache with pre-write data: it is stored
+    under the old version, which nobody reads any more. Entries also expire
+    after ``ttl``, bounding staleness for writes made by other workers.
+    """
+
+    def __init__(self, maxsize=64, ttl=300.0):
+        self._cache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._versions = {}
+
+    def version(self, name):
+        return self._versions.get(name, 0)
+
+    async def get(self, name, load, variant=None):
+        """Cached value of ``name``, awaiting ``load()`` on a miss.
+
+        ``variant`` caches something derived from the same data (e.g. its
+        encoded form) under the same version.
+        """
+        return await self._cache.get_or_compute((name, self.version(name), variant), load)
+
+    def invalidate(self, *names):
+        self._cache.invalidate_keys(lambda key: key[0] in names)
+        for name in names:
+            self._versions[name] = self.version(name) + 1
+
+    def stats(self):
+        return {**self._cache.stats(), "versions": dict(self._versions)}
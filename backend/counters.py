@@ -0,0 +1,76 @@
+"""Atomic sequence allocation for human-facing numbers (booking and invoice numbers).
+
+Each sequence is one document in the ``counters`` collection holding the last
+value handed out. Values are reserved with a single ``find_one_and_update``
++ ``$inc``, so concurrent requests and multiple uvicorn workers never see the
+same number.
+
+The same collection also holds per-collection change counters
+(``version:<collection>``), bumped after every write to that collection, so
+list endpoints can tell whether a client's copy is current with one
+``_id`` lookup instead of re-reading the collection.
+"""
+import asyncio
+
+from pymongo import ReturnDocument
+
+
+class SequenceAllocator:
+    """Hands out increasing integers for a named sequence.
+
+    With ``block_size`` > 1 the allocator reserves numbers in blocks (hi/lo)
+    and serves them from memory, trading one round-trip per block for gaps
+    when a worker restarts and interleaved numbering across workers.
+    """
+
+    def __init__(self, name, block_size=1):
+        self.name = name
+        self.block_size = max(1, block_size)
+        self._next = 0
+        self._hi = -1
+        self._lock = asyncio.Lock()
+
+    async def allocate(self, db, count=1):
+        """Reserve ``count`` consecutive numbers straight from the counter and return them as a range."""
+        counter = await db.counters.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"value": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        hi = counter['value']
+        return range(hi - count + 1, hi + 1)
+
+    async def next(self, db):
+        if self.block_size == 1:
+            return (await self.allocate(db)).start
+        async with self._lock:
+            if self._next > self._hi:
+                block = await self.allocate(db, self.block_size)
+                self._next, self._hi = block.start, block.stop - 1
+            value = self._next
+            self._next += 1
+            return value
+
+    async def seed(self, db, collection, field):
+        """Raise the counter to at least the highest ``field`` already stored in ``collection``.
+
+        Uses ``$max`` so it is idempotent and never moves a counter backwards;
+        safe to run on every startup.
+        """
+        last = await db[collection].find_one(
+            {field: {"$type": "number"}}, {"_id": 0, field: 1}, sort=[(field, -1)]
+        )
+        current = last[field] if last else 0
+        await db.counters.update_one({"_id": self.name}, {"$max": {"value": current}}, upsert=True)
+        return current
+
+
+async def bump_version(db, name):
+    """Advance the change counter of collection ``name``; call after the write has landed."""
+    await db.counters.update_one({"_id": f"version:{name}"}, {"$inc": {"value": 1}}, upsert=True)
+
+
+async def current_version(db, name):
+    counter = await db.counters.find_one({"_id": f"version:{name}"})
+    return counter['value'] if counter else 0
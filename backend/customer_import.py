@@ -0,0 +1,213 @@
+"""Bulk customer import from CSV (or Excel) files.
+
+Rows are read ``chunk_size`` at a time (parsing runs in a worker thread) and
+each chunk costs two round-trips: one indexed lookup of the chunk's phone
+numbers and emails, and one unordered ``bulk_write`` of upserts. Memory use
+depends on the chunk size, not the file size; the error report is capped at
+``MAX_ERRORS`` entries.
+
+A row is a duplicate of a customer with the same normalized phone number
+(``phone_digits``) or, failing that, the same email address (as entered or
+in lowercase) -- an existing customer or one created by an earlier row of
+the same file. With ``on_duplicate="update"`` the customer takes the row's
+non-empty values; with ``"skip"`` it is left alone. Rows are resolved in
+file order, so the outcome does not depend on where chunks begin and end.
+Imports do not lock the collection: two imports of overlapping files running
+at the same time can still create the same new customer twice.
+
+Columns are matched case-insensitively by header: ``name`` and ``phone`` are
+required, ``email`` and ``address`` optional, anything else is ignored.
+Excel files need the optional ``openpyxl`` package.
+"""
+import asyncio
+import csv
+import io
+import uuid
+from datetime import datetime, timezone
+from itertools import islice
+
+from pydantic import ValidationError
+from pymongo import UpdateOne
+
+from counters import bump_version
+from customer_search import normalize_phone, search_fields
+from rollups import record_customer
+
+try:
+    import openpyxl
+except ImportError:  # pragma: no cover - optional dependency
+    openpyxl = None
+
+COLUMNS = ("name", "email", "phone", "address")
+REQUIRED_COLUMNS = ("name", "phone")
+DUPLICATE_MODES = ("update", "skip")
+
+# Rows reported individually; further errors are only counted
+MAX_ERRORS = 1000
+
+
+class ImportFormatError(ValueError):
+    """Raised when a file cannot be read as a customer list at all."""
+
+
+def excel_available():
+    return openpyxl is not None
+
+
+def _header(cells):
+    header = [str(cell or "").strip().lower() for cell in cells]
+    missing = [column for column in REQUIRED_COLUMNS if column not in header]
+    if missing:
+        raise ImportFormatError(f"Missing required columns: {', '.join(missing)}")
+    return header
+
+
+def csv_rows(binary_file):
+    """``(line_number, {column: value})`` for each data row of a CSV file."""
+    text = io.TextIOWrapper(binary_file, encoding="utf-8-sig", newline="")
+    reader = csv.reader(text)
+    try:
+        header = _header(next(reader))
+    except StopIteration:
+        raise ImportFormatError("File is empty")
+    except UnicodeDecodeError:
+        raise ImportFormatError("CSV files must be UTF-8 encoded")
+    for row in reader:
+        if any(cell.strip() for cell in row):
+            yield reader.line_num, dict(zip(header, row))
+
+
+def xlsx_rows(binary_file):
+    """``(row_number, {column: value})`` for each data row of the first sheet of an .xlsx file."""
+    workbook = openpyxl.load_workbook(binary_file, read_only=True, data_only=True)
+    try:
+        rows = workbook.worksheets[0].iter_rows(values_only=True)
+        try:
+            header = _header(next(rows))
+        except StopIteration:
+            raise ImportFormatError("File is empty")
+        for number, row in enumerate(rows, start=2):
+            if any(cell not in (None, "") for cell in row):
+                yield number, dict(zip(header, ("" if cell is None else str(cell) for cell in row)))
+    finally:
+        workbook.close()
+
+
+def _read_rows(rows, count):
+    try:
+        return list(islice(rows, count))
+    except UnicodeDecodeError:
+        raise ImportFormatError("CSV files must be UTF-8 encoded")
+
+
+def _validate(model, raw):
+    values = {column: (raw.get(column) or "").strip() for column in COLUMNS}
+    for column in ("email", "address"):
+        values[column] = values[column] or None
+    customer = model(**values)
+    if not customer.name:
+        raise ValueError("name: required")
+    digits = normalize_phone(customer.phone)
+    if not digits:
+        raise ValueError("phone: must contain digits")
+    return customer, digits
+
+
+def _error_message(error):
+    if isinstance(error, ValidationError):
+        return "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in error.errors())
+    return str(error)
+
+
+async def _write_chunk(db, rows, on_duplicate):
+    """Resolve and write one chunk of ``(customer, phone_digits)`` rows in file order.
+
+    Returns ``(inserted, duplicates, updated_ids)``: customers created, rows
+    that matched a customer (updated or skipped, depending on ``on_duplicate``)
+    and the ids of existing customers that were changed.
+    """
+    emails = {customer.email for customer, _ in rows if customer.email}
+    # Addresses are stored as entered; also look for the lowercase form
+    emails |= {email.lower() for email in emails}
+    existing = await db.customers.find(
+        {"$or": [{"phone_digits": {"$in": list({digits for _, digits in rows})}}, {"email": {"$in": list(emails)}}]},
+        {"_id": 0, "customer_id": 1, "phone_digits": 1, "email": 1}
+    ).to_list(None)
+    by_phone = {c['phone_digits']: c['customer_id'] for c in existing if c.get('phone_digits')}
+    # Keyed by the stored address, so a match never depends on which other rows share the chunk
+    by_email = {c['email']: c['customer_id'] for c in existing if c.get('email')}
+
+    # Fold the rows into one set of values per customer, as if written one by one
+    updates = {}
+    created = set()
+    duplicates = 0
+    for customer, digits in rows:
+        fields = {key: value for key, value in customer.model_dump().items() if value is not None}
+        fields.update(search_fields(customer.name, customer.phone))
+        customer_id = by_phone.get(digits) or (
+            by_email.get(customer.email) or by_email.get(customer.email.lower()) if customer.email else None
+        )
+        if customer_id is None:
+            customer_id = str(uuid.uuid4())
+            created.add(customer_id)
+            updates[customer_id] = fields
+        else:
+            duplicates += 1
+            if on_duplicate == "update":
+                updates.setdefault(customer_id, {}).update(fields)
+        by_phone[digits] = customer_id
+        if customer.email:
+            by_email.setdefault(customer.email, customer_id)
+            by_email.setdefault(customer.email.lower(), customer_id)
+
+    now = datetime.now(timezone.utc)
+    operations = [
+        UpdateOne({"customer_id": customer_id}, {"$set": fields, "$setOnInsert": {"created_at": now}}, upsert=True)
+        if customer_id in created else
+        UpdateOne({"customer_id": customer_id}, {"$set": fields})
+        for customer_id, fields in updates.items()
+    ]
+    inserted = 0
+    updated_ids = [customer_id for customer_id in updates if customer_id not in created]
+    if operations:
+        result = await db.customers.bulk_write(operations, ordered=False)
+        await bump_version(db, "customers")
+        inserted = result.upserted_count
+        if inserted:
+            await record_customer(db, {"created_at": now}, sign=inserted)
+    return inserted, duplicates, updated_ids
+
+
+async def import_customers(db, rows, model, on_duplicate="update", chunk_size=1000, on_updated=None):
+    """Import customers from an iterator of ``(line_number, row)``; returns a report.
+
+    ``model`` validates each row (the API's ``CustomerCreate``). ``on_updated``
+    is called with the ids of existing customers changed by each chunk, e.g.
+    to drop cached data derived from them.
+    """
+    report = {"rows": 0, "inserted": 0, "updated": 0, "skipped": 0, "failed": 0, "errors": []}
+
+    def fail(line, error):
+        report["failed"] += 1
+        if len(report["errors"]) < MAX_ERRORS:
+            report["errors"].append({"row": line, "error": error})
+
+    while True:
+        chunk = await asyncio.to_thread(_read_rows, rows, chunk_size)
+        if not chunk:
+            break
+        report["rows"] += len(chunk)
+        valid = []
+        for line, raw in chunk:
+            try:
+                valid.append(_validate(model, raw))
+            except (ValidationError, ValueError) as e:
+                fail(line, _error_message(e))
+        if not valid:
+            continue
+        inserted, duplicates, updated_ids = await _write_chunk(db, valid, on_duplicate)
+        if updated_ids and on_updated is not None:
+            on_updated(updated_ids)
+        report["inserted"] += inserted
+        report["updated" if on_duplicate == "update" else "skipped"] += duplicates
+    return report
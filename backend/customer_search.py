@@ -0,0 +1,153 @@
+"""Indexed customer type-ahead.
+
+Every customer document carries three derived fields, kept in step with
+``name`` and ``phone`` by ``search_fields``:
+
+* ``phone_digits`` - the phone number with everything but digits removed
+* ``name_tokens``  - lowercase, accent-free words of the name
+* ``search_grams`` - trigrams of those words and of ``phone_digits``
+
+Prefix lookups are anchored regexes on the token/digit fields (index range
+scans); substring lookups need every trigram of the query term, which the
+multikey index on ``search_grams`` answers. Candidates are then checked and
+ranked in Python. User input is escaped before it reaches a regex.
+
+Words and numbers of one or two characters have no trigram, so they match
+only at the start of a name word or of the phone number: "jo" finds "John"
+and "Bo Jo", and "55" finds "555-0101", but "hn" and "01" find nothing. The
+old unindexed regex scan also matched such short fragments mid-word.
+"""
+import asyncio
+import re
+import unicodedata
+
+SEARCH_FIELDS = ("phone_digits", "name_tokens", "search_grams")
+
+# Rows pulled from MongoDB per search before ranking
+CANDIDATE_LIMIT = 200
+
+_WORD = re.compile(r"[^\W_]+")
+_NON_DIGIT = re.compile(r"\D")
+
+
+def normalize_phone(phone):
+    return _NON_DIGIT.sub("", phone or "")
+
+
+def _fold(text):
+    """Lowercase and strip accents, so "José" is found by "jose"."""
+    decomposed = unicodedata.normalize("NFKD", text or "")
+    return "".join(c for c in decomposed if not unicodedata.combining(c)).casefold()
+
+
+def name_tokens(name):
+    return _WORD.findall(_fold(name))
+
+
+def trigrams(term):
+    return {term[i:i + 3] for i in range(len(term) - 2)}
+
+
+def search_fields(name, phone):
+    """Derived search fields to store alongside a customer's name and phone."""
+    tokens = name_tokens(name)
+    digits = normalize_phone(phone)
+    grams = set(trigrams(digits))
+    for token in tokens:
+        grams |= trigrams(token)
+    return {
+        "phone_digits": digits,
+        "name_tokens": sorted(set(tokens)),
+        "search_grams": sorted(grams),
+    }
+
+
+def _query_terms(text):
+    terms = name_tokens(text)
+    digits = normalize_phone(text)
+    # Only treat the input as a phone number if it is mostly digits ("555-01", "+1 555")
+    if len(digits) < max(1, len(re.sub(r"\s", "", text)) // 2):
+        digits = ""
+    return terms, digits
+
+
+def _mongo_filter(terms, digits):
+    clauses = []
+    if terms:
+        # Every word of the query is the start of some word of the name (the only
+        # match for words shorter than 3 characters)
+        clauses.append({"$and": [{"name_tokens": {"$regex": f"^{re.escape(t)}"}} for t in terms]})
+        # ...or, for words of 3+ characters, appears anywhere inside the name
+        long_terms = [t for t in terms if len(t) >= 3]
+        if long_terms:
+            clauses.append({"search_grams": {"$all": sorted(set().union(*map(trigrams, long_terms)))}})
+    if digits:
+        clauses.append({"phone_digits": {"$regex": f"^{digits}"}})
+        if len(digits) >= 3:
+            clauses.append({"search_grams": {"$all": sorted(trigrams(digits))}})
+    return {"$or": clauses} if clauses else None
+
+
+def _score(customer, terms, digits):
+    """Rank a candidate, or None if it does not really match (trigrams over-approximate)."""
+    best = None
+    if digits:
+        phone = customer.get('phone_digits') or normalize_phone(customer.get('phone'))
+        if phone == digits:
+            best = 0
+        elif phone.startswith(digits):
+            best = 1
+        elif digits in phone:
+            best = 4
+    if terms:
+        tokens = customer.get('name_tokens') or name_tokens(customer.get('name'))
+        folded = " ".join(tokens)
+        ranks = []
+        for term in terms:
+            if term in tokens:
+                ranks.append(0)
+            elif any(token.startswith(term) for token in tokens):
+                ranks.append(2)
+            elif term in folded:
+                ranks.append(3)
+            else:
+                ranks = None
+                break
+        if ranks is not None:
+            rank = max(ranks)
+            best = rank if best is None else min(best, rank)
+    return best
+
+
+async def search_customers(db, text, limit=10):
+    """Best ``limit`` customers for a type-ahead query, best match first.
+
+    Exact word/number matches are fetched separately from the broad
+    prefix/substring candidates, so a very common prefix cannot crowd them out.
+    """
+    terms, digits = _query_terms(text or "")
+    query = _mongo_filter(terms, digits)
+    if query is None:
+        return []
+    exact = [{"name_tokens": {"$all": terms}}] if terms else []
+    if digits:
+        exact.append({"phone_digits": digits})
+    fields = {"_id": 0, "search_grams": 0}
+    exact_matches, candidates = await asyncio.gather(
+        db.customers.find({"$or": exact}, fields).limit(limit).to_list(limit),
+        db.customers.find(query, fields).limit(CANDIDATE_LIMIT).to_list(CANDIDATE_LIMIT),
+    )
+
+    ranked = {}
+    for customer in exact_matches + candidates:
+        score = _score(customer, terms, digits)
+        if score is not None:
+            ranked[customer['customer_id']] = ((score, len(customer.get('name') or ""), customer.get('name') or ""), customer)
+    best = [customer for _, customer in sorted(ranked.values(), key=lambda row: row[0])[:limit]]
+    return [{k: v for k, v in customer.items() if k not in SEARCH_FIELDS} for customer in best]
+
+
+async def matching_customer_ids(db, text, limit=100):
+    """IDs of customers matching ``text``, for filtering other collections by customer."""
+    customers = await search_customers(db, text, limit)
+    return [customer['customer_id'] for customer in customers]
@@ -0,0 +1,89 @@
+"""Storage codec for timestamps.
+
+Timestamps are stored as native BSON dates (always UTC) instead of ISO
+strings, so Mongo can index, range-scan and sort them and the read path gets
+``datetime`` objects back without parsing. Bookings additionally carry an
+``appointment_day`` key (``YYYY-MM-DD`` in the shop's local timezone) so "all
+bookings on a given day" is an equality match on an indexed field.
+
+Naive datetimes are wall-clock times in the shop timezone (``SHOP_TIMEZONE``,
+default UTC) -- that is what the booking form sends.
+"""
+import os
+from datetime import date, datetime, timedelta, timezone
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+
+@lru_cache(maxsize=None)
+def shop_timezone():
+    return ZoneInfo(os.environ.get('SHOP_TIMEZONE', 'UTC'))
+
+
+def to_utc(value):
+    """Coerce a datetime or ISO string into an aware UTC datetime (None if unparseable)."""
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace('Z', '+00:00') if value.endswith('Z') else value)
+        except ValueError:
+            return None
+    if not isinstance(value, datetime):
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=shop_timezone())
+    return value.astimezone(timezone.utc)
+
+
+def to_local(value):
+    """Convert a stored timestamp to shop-local wall-clock time."""
+    value = to_utc(value)
+    return value.astimezone(shop_timezone()) if value else None
+
+
+def local_day(value):
+    """Shop-local calendar day (``YYYY-MM-DD``) a timestamp falls on."""
+    value = to_local(value)
+    return value.date().isoformat() if value else None
+
+
+def parse_day(value):
+    """Normalize a ``YYYY-MM-DD`` (or full ISO datetime) query parameter to a day key.
+
+    Raises ValueError for anything that is neither.
+    """
+    if len(value) == 10:
+        return date.fromisoformat(value).isoformat()
+    day = local_day(value)
+    if day is None:
+        raise ValueError(f"Invalid date: {value}")
+    return day
+
+
+def appointment_fields(value):
+    """Stored representation of a booking's appointment time."""
+    start = to_utc(value)
+    return {"appointment_datetime": start, "appointment_day": local_day(start)}
+
+
+def date_range(start=None, end=None):
+    """Mongo range condition for ``start``..``end`` query parameters.
+
+    Each bound is a ``YYYY-MM-DD`` shop-local day or an ISO datetime. A day
+    as ``end`` includes that whole day. Returns None when neither is given;
+    raises ValueError for an unparseable bound.
+    """
+    condition = {}
+    if start:
+        condition["$gte"] = _bound(start)
+    if end:
+        if len(end) == 10:
+            end = (date.fromisoformat(end) + timedelta(days=1)).isoformat()
+        condition["$lt"] = _bound(end)
+    return condition or None
+
+
+def _bound(value):
+    parsed = to_utc(value)
+    if parsed is None:
+        raise ValueError(f"Invalid date: {value}")
+    return parsed
@@ -0,0 +1,107 @@
+"""Email bodies rendered from precompiled templates.
+
+Templates are the ``templates/*.html`` files next to this module, compiled
+into ``string.Template`` objects once when the module is imported at
+startup. Every value is HTML-escaped before it is substituted.
+
+Rendering is pure: the caller passes in the invoice, customer and currency,
+so the server can cache a rendered invoice (invoices never change once
+created) and serve resends and previews without rendering again.
+"""
+from datetime import datetime
+from html import escape
+from pathlib import Path
+from string import Template
+
+from datecodec import to_local
+
+TEMPLATE_DIR = Path(__file__).parent / "templates"
+
+CURRENCY_SYMBOLS = {
+    'USD': '$',
+    'EUR': '€',
+    'GBP': '£',
+    'INR': '₹',
+    'AUD': 'A$',
+    'CAD': 'C$',
+    'JPY': '¥',
+    'CNY': '¥'
+}
+
+
+def load_templates(directory=TEMPLATE_DIR):
+    return {path.stem: Template(path.read_text(encoding="utf-8")) for path in sorted(directory.glob("*.html"))}
+
+
+TEMPLATES = load_templates()
+
+
+def _render(name, **values):
+    return TEMPLATES[name].substitute({key: escape(str(value)) for key, value in values.items()})
+
+
+def format_currency(amount, currency):
+    return f"{CURRENCY_SYMBOLS.get(currency, '$')}{amount:,.2f}"
+
+
+def render_invoice(invoice, customer, currency):
+    """Subject and HTML body of an invoice email."""
+    customer = customer or {}
+    full_invoice_number = f"{invoice.get('invoice_prefix', '')}{invoice['invoice_number']}"
+    invoice_date = to_local(invoice['created_at']) or invoice['created_at']
+    formatted_date = invoice_date.strftime('%B %d, %Y') if isinstance(invoice_date, datetime) else str(invoice_date)
+
+    items = "".join(_render(
+        "invoice_item",
+        product_name=item['product_name'],
+        price=format_currency(item['price'], currency),
+        tax_amount=format_currency(item['tax_amount'], currency),
+        total=format_currency(item['total'], currency)
+    ) for item in invoice['items'])
+    phone_line = _render("invoice_phone", phone=customer['phone']) if customer.get('phone') else ""
+    discount_line = ""
+    if invoice.get('discount_percentage', 0) > 0:
+        discount_line = _render(
+            "invoice_discount",
+            discount_percentage=invoice['discount_percentage'],
+            discount_amount=format_currency(invoice['discount_amount'], currency)
+        )
+
+    html = TEMPLATES["invoice"].substitute(
+        customer_name=escape(customer.get('name', 'Customer')),
+        invoice_number=escape(full_invoice_number),
+        date=escape(formatted_date),
+        phone_line=phone_line,
+        items=items,
+        subtotal=escape(format_currency(invoice['subtotal'], currency)),
+        tax_amount=escape(format_currency(invoice['tax_amount'], currency)),
+        discount_line=discount_line,
+        total=escape(format_currency(invoice['total'], currency))
+    )
+    return f"Invoice {full_invoice_number} from Car Logic", html
+
+
+def render_booking_confirmation(booking, customer):
+    """Subject and HTML body of a booking confirmation email."""
+    return "Booking Confirmation", _render(
+        "booking_confirmation",
+        customer_name=customer.get('name', 'Customer'),
+        booking_number=booking['booking_number'],
+        appointment=to_local(booking['appointment_datetime']).strftime('%Y-%m-%d %H:%M'),
+        duration_minutes=booking['duration_minutes']
+    )
+
+
+def render_booking_series_confirmation(bookings, customer):
+    """Subject and HTML body of one confirmation for several bookings made together."""
+    rows = "".join(_render(
+        "booking_series_row",
+        booking_number=booking['booking_number'],
+        appointment=to_local(booking['appointment_datetime']).strftime('%Y-%m-%d %H:%M'),
+        duration_minutes=booking['duration_minutes']
+    ) for booking in bookings)
+    html = TEMPLATES["booking_series_confirmation"].substitute(
+        customer_name=escape(customer.get('name', 'Customer')),
+        rows=rows
+    )
+    return "Booking Confirmation", html
@@ -0,0 +1,46 @@
+"""Full-collection exports streamed as newline-delimited JSON.
+
+Rows come off the Motor cursor one batch at a time and are encoded straight
+to bytes, so memory use is bounded by the batch size rather than the size of
+the export, and nothing is truncated. Rows are written as stored (no
+response model validation); dates are ISO 8601 strings in UTC and any other
+value JSON has no type for is written as its string form.
+"""
+import json
+from datetime import datetime
+
+from customer_search import SEARCH_FIELDS
+
+# Exportable collections: the date field the range filter applies to, and what to leave out
+EXPORTS = {
+    "bookings": {"date_field": "appointment_datetime", "exclude": ()},
+    "customers": {"date_field": "created_at", "exclude": SEARCH_FIELDS},
+    "invoices": {"date_field": "created_at", "exclude": ()},
+}
+
+
+def _default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    # ObjectId, Decimal128, UUID and the like written by other tools
+    return str(value)
+
+
+def export_cursor(db, kind, date_condition=None, batch_size=1000):
+    """Cursor over one exportable collection in date order, optionally restricted to a date range."""
+    spec = EXPORTS[kind]
+    query = {spec["date_field"]: date_condition} if date_condition else {}
+    projection = {"_id": 0, **{field: 0 for field in spec["exclude"]}}
+    return db[kind].find(query, projection, batch_size=batch_size).sort(spec["date_field"], 1)
+
+
+async def stream_ndjson(cursor, batch_size=1000):
+    """Yield the cursor's documents as NDJSON, one chunk per ``batch_size`` rows."""
+    lines = []
+    async for doc in cursor:
+        lines.append(json.dumps(doc, default=_default, separators=(",", ":")))
+        if len(lines) >= batch_size:
+            yield ("\n".join(lines) + "\n").encode()
+            lines = []
+    if lines:
+        yield ("\n".join(lines) + "\n").encode()
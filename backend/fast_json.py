@@ -0,0 +1,77 @@
+"""Opt-in fast path for large list responses.
+
+Normally FastAPI validates every row a list handler returns against the
+``response_model`` and then serializes it again with the standard ``json``
+module. Rows read with ``model_projection`` already have exactly the model's
+fields, as stored by the API, so most of that work is redundant.
+``conform`` does the part that still matters for older rows -- filling in
+model defaults for missing fields and parsing dates stored as ISO strings --
+and ``FastJSONResponse`` encodes the result directly with orjson. Rows it
+cannot fix cheaply (a required field missing, an unparseable date) go through
+full model validation, which fails the request just as the regular path
+would. The route keeps its ``response_model``, so the OpenAPI schema is
+unchanged.
+
+Enabled with ``FAST_JSON_LISTS=true``; without orjson installed the regular
+path is used.
+"""
+from datetime import datetime
+from functools import lru_cache
+from typing import get_args
+
+from fastapi.responses import JSONResponse
+
+from datecodec import to_utc
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def available():
+    return orjson is not None
+
+
+def model_projection(model):
+    """Projection that reads exactly the fields of a Pydantic model."""
+    return {"_id": 0, **{name: 1 for name in model.model_fields}}
+
+
+@lru_cache(maxsize=None)
+def _row_spec(model):
+    required, defaulted, dates = [], [], []
+    for name, field in model.model_fields.items():
+        (required if field.is_required() else defaulted).append((name, field))
+        if field.annotation is datetime or datetime in get_args(field.annotation):
+            dates.append(name)
+    return required, defaulted, dates
+
+
+def conform(rows, model):
+    """Bring stored rows (read with ``model_projection``) in line with ``model``, in place."""
+    required, defaulted, dates = _row_spec(model)
+    size = len(model.model_fields)
+    for i, row in enumerate(rows):
+        if len(row) < size:
+            if any(name not in row for name, _ in required):
+                rows[i] = model.model_validate(row).model_dump()
+                continue
+            for name, field in defaulted:
+                if name not in row:
+                    row[name] = field.get_default(call_default_factory=True)
+        for name in dates:
+            value = row[name]
+            if value is not None and not isinstance(value, datetime):
+                parsed = to_utc(value)
+                if parsed is None:
+                    rows[i] = model.model_validate(row).model_dump()
+                    break
+                row[name] = parsed
+    return rows
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content) -> bytes:
+        # OPT_UTC_Z writes UTC datetimes with a "Z" suffix, like Pydantic does
+        return orjson.dumps(content, option=orjson.OPT_UTC_Z)
@@ -0,0 +1,133 @@
+"""Conditional GETs and response compression for JSON API responses.
+
+``ConditionalCompressionMiddleware`` gives every successful JSON GET response
+a weak ETag (a hash of the body, unless the handler already set one) and
+answers a matching ``If-None-Match`` with an empty 304. Bodies above
+``minimum_size`` are then compressed with brotli or gzip, whichever the
+client prefers (brotli only if the optional ``brotli`` package is
+installed). Streaming exports and non-JSON responses pass through untouched.
+
+Handlers that know their ETag up front (see ``etag_for``) can answer 304
+themselves without building the body at all.
+
+With ``server_timing`` set, each handled response also carries
+``Server-Timing: process-cpu;dur=<ms>``: the CPU time the whole process used
+while the request ran. It includes work for any concurrent requests, so it is
+only meaningful when benchmarking one request at a time, and it is off by
+default so production responses do not expose it.
+"""
+import gzip
+import hashlib
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+
+def etag_for(body: bytes) -> str:
+    return f'W/"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an ``If-None-Match`` header value matches ``etag`` (weak comparison)."""
+    if not if_none_match or not etag:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == opaque for tag in if_none_match.split(","))
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+def _server_timing(cpu_start):
+    return f"process-cpu;dur={(time.process_time() - cpu_start) * 1000:.2f}"
+
+
+class ConditionalCompressionMiddleware:
+    def __init__(self, app, minimum_size=1024, gzip_level=6, brotli_quality=4, server_timing=False):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.server_timing = server_timing
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "GET":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        cpu_start = time.process_time()
+        start = None
+        chunks = []
+        passthrough = False
+
+        async def buffered_send(message):
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                if message["status"] == 304:
+                    # A handler that checked its own ETag
+                    not_modified = MutableHeaders(raw=list(message["headers"]))
+                    not_modified.add_vary_header("Accept-Encoding")
+                    if self.server_timing:
+                        not_modified["Server-Timing"] = _server_timing(cpu_start)
+                    passthrough = True
+                    await send({**message, "headers": not_modified.raw})
+                elif (message["status"] != 200
+                        or not headers.get("content-type", "").startswith("application/json")
+                        or "content-encoding" in headers):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start = message
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                await self._respond(start, b"".join(chunks), request_headers, cpu_start, send)
+
+        await self.app(scope, receive, buffered_send)
+
+    async def _respond(self, start, body, request_headers, cpu_start, send):
+        headers = MutableHeaders(raw=list(start["headers"]))
+        etag = headers.get("etag") or etag_for(body)
+        headers["ETag"] = etag
+        headers["Cache-Control"] = headers.get("cache-control", "private, no-cache")
+        headers.add_vary_header("Accept-Encoding")
+        status = start["status"]
+
+        if etag_matches(request_headers.get("if-none-match"), etag):
+            status, body = 304, b""
+            del headers["content-length"]
+            del headers["content-type"]
+        elif len(body) >= self.minimum_size:
+            accepted = _accepted_encodings(request_headers.get("accept-encoding"))
+            if brotli is not None and "br" in accepted:
+                body = brotli.compress(body, quality=self.brotli_quality)
+                headers["Content-Encoding"] = "br"
+            elif "gzip" in accepted:
+                body = gzip.compress(body, compresslevel=self.gzip_level)
+                headers["Content-Encoding"] = "gzip"
+
+        if status != 304:
+            headers["Content-Length"] = str(len(body))
+        if self.server_timing:
+            headers["Server-Timing"] = _server_timing(cpu_start)
+        await send({"type": "http.response.start", "status": status, "headers": headers.raw})
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,169 @@
+"""Declared MongoDB indexes, startup reconciliation and an index usage report.
+
+``INDEXES`` is the single source of truth for the indexes the API relies on.
+``ensure_indexes`` creates whatever is missing; every worker runs it at
+startup. Rebuilding an index whose definition changed drops it first, so
+queries run without it until the rebuild finishes: that only happens with
+``rebuild=True`` (``scripts/check_indexes.py --apply`` or
+``POST /api/admin/indexes/rebuild``). ``index_report`` compares the
+declaration with what the server actually has, using ``$indexStats`` to
+flag indexes nothing reads.
+"""
+import logging
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.errors import OperationFailure
+
+logger = logging.getLogger(__name__)
+
+INDEXES = {
+    "users": [
+        IndexModel([("user_id", ASCENDING)], unique=True),
+        IndexModel([("email", ASCENDING)], unique=True),
+    ],
+    "customers": [
+        IndexModel([("customer_id", ASCENDING)], unique=True),
+        # List order; (sort key, id) pairs below back keyset pagination
+        IndexModel([("created_at", ASCENDING), ("customer_id", ASCENDING)]),
+        # Type-ahead search fields (see customer_search.py)
+        IndexModel([("name_tokens", ASCENDING)]),
+        IndexModel([("phone_digits", ASCENDING)]),
+        # Duplicate detection on import (see customer_import.py)
+        IndexModel([("email", ASCENDING)]),
+        IndexModel([("search_grams", ASCENDING)]),
+    ],
+    "categories": [
+        IndexModel([("category_id", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING), ("category_id", ASCENDING)]),
+    ],
+    "taxes": [
+        IndexModel([("tax_id", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING), ("tax_id", ASCENDING)]),
+    ],
+    "products": [
+        IndexModel([("product_id", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING), ("product_id", ASCENDING)]),
+        IndexModel([("tax_ids", ASCENDING)]),
+    ],
+    "zones": [
+        IndexModel([("zone_id", ASCENDING)], unique=True),
+        IndexModel([("name", ASCENDING), ("zone_id", ASCENDING)]),
+        IndexModel([("is_active", ASCENDING)]),
+    ],
+    "bookings": [
+        IndexModel([("booking_id", ASCENDING)], unique=True),
+        # Default grid order plus each filter of GET /bookings followed by its
+        # sort key and the booking_id tie-breaker used by cursors
+        IndexModel([("booking_number", DESCENDING), ("booking_id", DESCENDING)]),
+        IndexModel([("appointment_datetime", DESCENDING), ("booking_id", DESCENDING)]),
+        IndexModel([("status", ASCENDING), ("booking_number", DESCENDING), ("booking_id", DESCENDING)]),
+        IndexModel([("appointment_day", ASCENDING), ("booking_number", DESCENDING), ("booking_id", DESCENDING)]),
+        IndexModel([("customer_id", ASCENDING), ("booking_number", DESCENDING), ("booking_id", DESCENDING)]),
+        IndexModel([("zone_id", ASCENDING), ("status", ASCENDING)]),
+    ],
+    "booking_slots": [
+        IndexModel([("zone_id", ASCENDING), ("slot", ASCENDING)], unique=True),
+        IndexModel([("booking_id", ASCENDING)]),
+    ],
+    "invoices": [
+        IndexModel([("invoice_id", ASCENDING)], unique=True),
+        IndexModel([("invoice_number", DESCENDING), ("invoice_id", DESCENDING)]),
+        IndexModel([("booking_id", ASCENDING)]),
+        IndexModel([("customer_id", ASCENDING)]),
+        IndexModel([("created_at", ASCENDING)]),
+    ],
+    "settings": [
+        IndexModel([("settings_id", ASCENDING)], unique=True),
+    ],
+    "email_outbox": [
+        IndexModel([("message_id", ASCENDING)], unique=True),
+        # Due pending messages in order, and expired leases of crashed senders
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("lease_until", ASCENDING)]),
+        IndexModel([("status", ASCENDING), ("created_at", DESCENDING)]),
+    ],
+    "analytics_rollups": [
+        IndexModel([("kind", ASCENDING), ("key", DESCENDING)]),
+    ],
+}
+
+
+def _spec(index):
+    """Comparable (keys, unique) pair for a declared IndexModel or an index_information() entry."""
+    if isinstance(index, IndexModel):
+        doc = index.document
+        return list(doc['key'].items()), bool(doc.get('unique', False))
+    return [tuple(k) for k in index['key']], bool(index.get('unique', False))
+
+
+async def ensure_indexes(db, collections=None, prune=False, rebuild=False):
+    """Create declared indexes that are missing; with ``rebuild``, also rebuild ones whose definition changed.
+
+    Changed indexes are otherwise left as they are and reported. Undeclared
+    indexes are only reported, or dropped when ``prune`` is set.
+    A failing index (e.g. unique over existing duplicates) is logged and
+    skipped so the API still starts. Returns a list of actions taken.
+    """
+    actions = []
+    for name, models in INDEXES.items():
+        if collections and name not in collections:
+            continue
+        collection = db[name]
+        existing = await collection.index_information()
+        declared = {model.document['name'] for model in models}
+
+        for model in models:
+            index_name = model.document['name']
+            if index_name in existing:
+                if _spec(existing[index_name]) == _spec(model):
+                    continue
+                if not rebuild:
+                    logger.warning(f"Index {name}.{index_name} differs from its declaration; run scripts/check_indexes.py --apply to rebuild it")
+                    actions.append(f"{name}.{index_name}: definition changed (not rebuilt)")
+                    continue
+                await collection.drop_index(index_name)
+                actions.append(f"{name}.{index_name}: dropped (definition changed)")
+            try:
+                await collection.create_indexes([model])
+                actions.append(f"{name}.{index_name}: created")
+            except OperationFailure as e:
+                logger.error(f"Could not create index {name}.{index_name}: {e}")
+                actions.append(f"{name}.{index_name}: FAILED ({e.code})")
+
+        for index_name in existing:
+            if index_name == "_id_" or index_name in declared:
+                continue
+            if prune:
+                await collection.drop_index(index_name)
+                actions.append(f"{name}.{index_name}: dropped (undeclared)")
+            else:
+                actions.append(f"{name}.{index_name}: undeclared")
+
+    for action in actions:
+        logger.info(f"Index bootstrap: {action}")
+    return actions
+
+
+async def index_report(db):
+    """Per collection: declared indexes that are missing or differ, and existing indexes with no recorded use.
+
+    Usage comes from ``$indexStats`` and counts since the last server restart,
+    so "unused" only means something on a server that has been up a while.
+    """
+    report = {}
+    for name, models in INDEXES.items():
+        stats = await db[name].aggregate([{"$indexStats": {}}]).to_list(None)
+        existing = await db[name].index_information()
+        usage = {s['name']: s.get('accesses', {}).get('ops', 0) for s in stats}
+        declared = {model.document['name'] for model in models}
+        report[name] = {
+            "missing": sorted(declared - set(usage)),
+            "changed": sorted(
+                model.document['name'] for model in models
+                if model.document['name'] in existing and _spec(existing[model.document['name']]) != _spec(model)
+            ),
+            "unused": sorted(n for n, ops in usage.items() if ops == 0 and n != "_id_"),
+            "undeclared": sorted(n for n in usage if n not in declared and n != "_id_"),
+            "usage": usage,
+        }
+    return report
@@ -0,0 +1,213 @@
+"""Server-side invoice PDFs.
+
+Layout is CPU-bound, so PDFs are drawn with reportlab in a small process
+pool with a cap on how many renders may wait for it (the same shape as
+``PasswordHasher``). The event loop only awaits the result.
+
+Rendered files are cached on disk under ``<cache_dir>/<TEMPLATE_VERSION>/``.
+Invoices never change, so the file name only needs the invoice id plus a
+fingerprint of the outside details printed on it (currency, customer name
+and phone). Bump ``TEMPLATE_VERSION`` whenever the layout changes; old
+directories can then be deleted. Files are written to a temporary name and
+renamed, so several API workers can share one cache directory.
+
+reportlab is optional: without it ``available()`` is False and the API
+answers 501.
+"""
+import asyncio
+import hashlib
+import io
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+from datecodec import to_local
+from emails import format_currency
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import mm
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+except ImportError:  # pragma: no cover - optional dependency
+    A4 = None
+
+TEMPLATE_VERSION = "1"
+
+BRAND = "#0066ff"
+
+
+def available():
+    return A4 is not None
+
+
+class PdfPoolBusy(Exception):
+    """Raised when too many PDF renders are already queued."""
+
+
+def _money(amount, currency):
+    # The built-in PDF fonts are Latin-1; spell out symbols they cannot draw (e.g. ₹)
+    text = format_currency(amount, currency)
+    try:
+        text.encode("cp1252")
+    except UnicodeEncodeError:
+        text = f"{currency} {amount:,.2f}"
+    return text
+
+
+def render_pdf(invoice, customer, currency):
+    """PDF bytes of one invoice. Runs in a pool worker, so it only uses its arguments."""
+    customer = customer or {}
+    styles = getSampleStyleSheet()
+    full_invoice_number = f"{invoice.get('invoice_prefix', '')}{invoice['invoice_number']}"
+    invoice_date = to_local(invoice['created_at']) or invoice['created_at']
+    formatted_date = invoice_date.strftime('%B %d, %Y') if isinstance(invoice_date, datetime) else str(invoice_date)
+
+    story = [
+        Paragraph(f'<font color="{BRAND}">Car Logic</font>', styles["Title"]),
+        Paragraph("INVOICE", styles["Heading2"]),
+        Spacer(1, 4 * mm),
+    ]
+    details = [
+        ("Invoice Number", full_invoice_number),
+        ("Date", formatted_date),
+        ("Customer Name", customer.get('name', 'Customer')),
+    ]
+    if customer.get('phone'):
+        details.append(("Customer Phone", customer['phone']))
+    details_table = Table([[f"{label}:", value] for label, value in details], colWidths=[40 * mm, None], hAlign="LEFT")
+    details_table.setStyle(TableStyle([
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 2),
+    ]))
+    story += [details_table, Spacer(1, 6 * mm)]
+
+    rows = [["Service", "Price", "Tax", "Total"]]
+    for item in invoice['items']:
+        rows.append([
+            Paragraph(item['product_name'].replace("&", "&amp;").replace("<", "&lt;"), styles["BodyText"]),
+            _money(item['price'], currency),
+            _money(item['tax_amount'], currency),
+            _money(item['total'], currency),
+        ])
+    items_table = Table(rows, colWidths=[None, 30 * mm, 30 * mm, 30 * mm], repeatRows=1)
+    items_table.setStyle(TableStyle([
+        ("BACKGROUND", (0, 0), (-1, 0), colors.HexColor(BRAND)),
+        ("TEXTCOLOR", (0, 0), (-1, 0), colors.white),
+        ("FONTNAME", (0, 0), (-1, 0), "Helvetica-Bold"),
+        ("ALIGN", (1, 0), (-1, -1), "RIGHT"),
+        ("VALIGN", (0, 0), (-1, -1), "MIDDLE"),
+        ("ROWBACKGROUNDS", (0, 1), (-1, -1), [colors.white, colors.HexColor("#f9f9f9")]),
+        ("LINEBELOW", (0, 1), (-1, -1), 0.5, colors.HexColor("#dddddd")),
+    ]))
+    story += [items_table, Spacer(1, 6 * mm)]
+
+    summary = [
+        ["Subtotal:", _money(invoice['subtotal'], currency)],
+        ["Tax:", _money(invoice['tax_amount'], currency)],
+    ]
+    if invoice.get('discount_percentage', 0) > 0:
+        summary.append([f"Discount ({invoice['discount_percentage']}%):", f"-{_money(invoice['discount_amount'], currency)}"])
+    summary.append(["Total:", _money(invoice['total'], currency)])
+    summary_table = Table(summary, colWidths=[50 * mm, 35 * mm], hAlign="RIGHT")
+    summary_table.setStyle(TableStyle([
+        ("ALIGN", (0, 0), (-1, -1), "RIGHT"),
+        ("FONTNAME", (0, -1), (-1, -1), "Helvetica-Bold"),
+        ("TEXTCOLOR", (0, -1), (-1, -1), colors.HexColor(BRAND)),
+        ("LINEABOVE", (0, -1), (-1, -1), 1, colors.HexColor(BRAND)),
+    ]))
+    story += [summary_table, Spacer(1, 10 * mm), Paragraph("Thank you for choosing Car Logic Car Wash!", styles["Italic"])]
+
+    buffer = io.BytesIO()
+    SimpleDocTemplate(
+        buffer, pagesize=A4, title=f"Invoice {full_invoice_number}",
+        leftMargin=18 * mm, rightMargin=18 * mm, topMargin=18 * mm, bottomMargin=18 * mm
+    ).build(story)
+    return buffer.getvalue()
+
+
+class InvoicePdfRenderer:
+    """Renders invoice PDFs on a bounded process pool, with an on-disk cache."""
+
+    def __init__(self, cache_dir, max_workers=2, max_queue=16):
+        self.cache_dir = Path(cache_dir) / TEMPLATE_VERSION
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._executor = None
+        self._pending = 0
+        self._inflight = {}
+
+    @property
+    def pending(self):
+        return self._pending
+
+    def path(self, invoice, customer, currency):
+        customer = customer or {}
+        fingerprint = hashlib.sha1(
+            "\x00".join([currency, customer.get('name') or "", customer.get('phone') or ""]).encode()
+        ).hexdigest()[:12]
+        return self.cache_dir / f"{invoice['invoice_id']}.{fingerprint}.pdf"
+
+    def _store(self, path, data):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
+    async def _render(self, path, invoice, customer, currency):
+        if self._pending >= self.max_workers + self.max_queue:
+            raise PdfPoolBusy()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._pending += 1
+        try:
+            data = await asyncio.get_running_loop().run_in_executor(self._executor, render_pdf, invoice, customer, currency)
+        finally:
+            self._pending -= 1
+        await asyncio.to_thread(self._store, path, data)
+        return data
+
+    async def get(self, invoice, customer, currency):
+        """``(pdf_bytes, cached)`` for an invoice; concurrent requests for one PDF share a render."""
+        path = self.path(invoice, customer, currency)
+        try:
+            return await asyncio.to_thread(path.read_bytes), True
+        except FileNotFoundError:
+            pass
+        render = self._inflight.get(path)
+        if render is None:
+            render = asyncio.ensure_future(self._render(path, invoice, customer, currency))
+            self._inflight[path] = render
+            render.add_done_callback(lambda _: self._inflight.pop(path, None))
+        return await asyncio.shield(render), False
+
+    async def prerender(self, jobs, busy_wait=0.5):
+        """Render ``(invoice, customer, currency)`` jobs, ``max_workers`` at a time; returns ``(rendered, cached)``.
+
+        When interactive requests have filled the pool, waits ``busy_wait``
+        seconds and tries again instead of failing the batch.
+        """
+        slots = asyncio.Semaphore(self.max_workers)
+
+        async def one(job):
+            async with slots:
+                while True:
+                    try:
+                        _, cached = await self.get(*job)
+                        return cached
+                    except PdfPoolBusy:
+                        await asyncio.sleep(busy_wait)
+        results = await asyncio.gather(*(one(job) for job in jobs))
+        return results.count(False), results.count(True)
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
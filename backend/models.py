@@ -0,0 +1,249 @@
+"""Request and response models of the API.
+
+Shared by server.py and the scripts, which can import them without starting
+the app (database client, worker pools, startup hooks).
+"""
+import uuid
+from datetime import datetime, timezone
+from typing import Generic, List, Optional, TypeVar
+
+from pydantic import BaseModel, ConfigDict, EmailStr, Field
+
+
+class User(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    user_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    email: EmailStr
+    name: str
+    role: str
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class UserCreate(BaseModel):
+    email: EmailStr
+    password: str
+    name: str
+    role: str = "Staff"
+
+
+class UserLogin(BaseModel):
+    email: EmailStr
+    password: str
+
+
+class Customer(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    customer_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    email: Optional[EmailStr] = None
+    phone: str
+    address: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class CustomerCreate(BaseModel):
+    name: str
+    email: Optional[EmailStr] = None
+    phone: str
+    address: Optional[str] = None
+
+
+class Category(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    category_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    description: Optional[str] = None
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class CategoryCreate(BaseModel):
+    name: str
+    description: Optional[str] = None
+
+
+class Tax(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    tax_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    percentage: float
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class TaxCreate(BaseModel):
+    name: str
+    percentage: float
+
+
+class Product(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    product_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    code: str
+    category_id: str
+    tax_ids: List[str]
+    buy_price: Optional[float] = None
+    sell_price: float
+    tax_rate: float = 0.0  # Combined rate of tax_ids as a fraction, maintained by pricing.py
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class ProductCreate(BaseModel):
+    name: str
+    code: str
+    category_id: str
+    tax_ids: List[str]
+    buy_price: Optional[float] = None
+    sell_price: float
+
+
+class WashZone(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    zone_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    name: str
+    is_active: bool = True
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class WashZoneCreate(BaseModel):
+    name: str
+    is_active: bool = True
+
+
+# Statuses a booking can be given
+BOOKING_STATUSES = ("Pending", "Completed", "Cancelled")
+
+
+class Booking(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    booking_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
+    booking_number: Optional[int] = None
+    customer_id: str
+    zone_id: str
+    product_ids: List[str]
+    appointment_datetime: datetime
+    appointment_day: Optional[str] = None
+    duration_minutes: int = 60
+    vehicle_pickup_by_us: bool = False
+    vehicle_dropoff_by_us: bool = False
+    status: str = "Pending"
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+
+class BookingCreate(BaseModel):
+    customer_id: str
+    zone_id: str
+    product_ids: List[str]
+    appointment_datetime: datetime
+    duration_minutes: int = Field(default=60, gt=0)
+    vehicle_pickup_by_us: bool = False
+    vehicle_dropoff_by_us: bool = False
+
+
+class BookingRecurrence(BaseModel):
+    start: datetime
+    every_days: int = Field(default=7, ge=1)
+    count: int = Field(ge=1)
+
+
+class BulkBookingCreate(BaseModel):
+    customer_id: str
+    zone_id: str
+    product_ids: List[str]
+    duration_minutes: int = Field(default=60, gt=0)
+    vehicle_pickup_by_us: bool = False
+    vehicle_dropoff_by_us: bool = False
+    # Either explicit appointment times or a recurrence rule
+    appointments: Optional[List[datetime]] = None
+    recurrence: Optional[BookingRecurrence] = None
+
+
+class BulkBookingResult(BaseModel):
+    appointment_datetime: datetime
+    status: str
+    booking: Optional[Booking] = None
+    conflict_with: Optional[str] = None
+
+
+class BulkBookingResponse(BaseModel):
+    created: int
+    conflicts: int
+    results: List[BulkBookingResult]
+
+
+class BulkStatusUpdate(BaseModel):
+    booking_ids: List[str]
+    status: str
+
+
+class BatchInvoiceCreate(BaseModel):
+    date_from: str
+    date_to: Optional[str] = None
+    status: str = "Completed"
+    invoice_prefix: str = ""
+
+
+class BookingUpdate(BaseModel):
+    status: Optional[str] = None
+    customer_id: Optional[str] = None
+    appointment_datetime: Optional[datetime] = None
+    duration_minutes: Optional[int] = Field(default=None, gt=0)
+    vehicle_pickup_by_us: Optional[bool] = None
+    vehicle_dropoff_by_us: Optional[bool] = None
+    product_ids: Optional[List[str]] = None
+
+
+class Settings(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    settings_id: str = "default"
+    currency: str = "USD"
+    show_tax_bifurcation: bool = True
+    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+
+
+class SettingsUpdate(BaseModel):
+    currency: Optional[str] = None
+    show_tax_bifurcation: Optional[bool] = None
+
+
+class Invoice(BaseModel):
+    model_config = ConfigDict(extra="ignore")
+    invoice_id: str
+    invoice_number: Optional[int] = None
+    invoice_prefix: Optional[str] = ""
+    booking_id: str
+    customer_id: str
+    items: List[dict]
+    subtotal: float
+    tax_amount: float
+    discount_percentage: float = 0.0
+    discount_amount: float = 0.0
+    total: float
+    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    created_by: str
+
+
+class InvoiceCreate(BaseModel):
+    booking_id: str
+    discount_percentage: float = 0.0
+    invoice_prefix: str = ""
+    product_ids: Optional[List[str]] = None  # Optional: if provided, will update booking and use these products
+
+
+class EmailRequest(BaseModel):
+    recipient_email: EmailStr
+    subject: str
+    html_content: str
+
+
+T = TypeVar("T")
+
+
+class Page(BaseModel, Generic[T]):
+    items: List[T]
+    next_cursor: Optional[str] = None
+
+
+class CountedPage(Page[T], Generic[T]):
+    total: int
+    total_estimated: bool = False
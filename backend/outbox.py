@@ -0,0 +1,251 @@
+"""Durable email outbox with background delivery.
+
+Request handlers never wait on the email provider. ``EmailOutbox.enqueue``
+stores the message in the ``email_outbox`` collection and returns; a worker
+task in each API process claims due messages and hands them to a transport,
+at most ``concurrency`` at a time.
+
+A message is claimed atomically (``find_one_and_update`` from ``pending`` to
+``sending`` with a lease), so several uvicorn workers can share one outbox
+without sending a message twice. A failed send is retried with exponential
+backoff and jitter; after ``max_attempts`` the message is moved to ``dead``
+and stays there until requeued. If a process dies mid-send its lease expires
+and another worker picks the message up again (at-least-once delivery),
+unless that send was already its last attempt: then it is moved to ``dead``
+too, so a message that keeps crashing its sender is not retried forever.
+
+Transports are objects with an async ``send(message)`` returning the
+provider's message id: ``ResendTransport`` in production and
+``RecordingTransport`` (keeps messages in memory, can be told to fail) for
+local runs and tests.
+"""
+import asyncio
+import logging
+import random
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from pymongo import ReturnDocument
+
+import resend
+
+logger = logging.getLogger(__name__)
+
+STATUSES = ("pending", "sending", "sent", "dead")
+
+
+class ResendTransport:
+    def __init__(self, sender):
+        self.sender = sender
+
+    async def send(self, message):
+        params = {
+            "from": self.sender,
+            "to": message['to'],
+            "subject": message['subject'],
+            "html": message['html']
+        }
+        if message.get('attachments'):
+            params["attachments"] = message['attachments']
+        result = await asyncio.to_thread(resend.Emails.send, params)
+        return result.get("id")
+
+
+class RecordingTransport:
+    """Keeps sent messages in ``sent``; the first ``fail_first`` sends raise."""
+
+    def __init__(self, fail_first=0):
+        self.fail_first = fail_first
+        self.sent = []
+        self.calls = 0
+
+    async def send(self, message):
+        self.calls += 1
+        if self.calls <= self.fail_first:
+            raise RuntimeError(f"Stub transport failure {self.calls}/{self.fail_first}")
+        self.sent.append(message)
+        return f"stub-{len(self.sent)}"
+
+
+class EmailOutbox:
+    def __init__(self, transport=None, concurrency=4, max_attempts=8, retry_base_seconds=30,
+                 retry_max_seconds=3600, send_timeout=30, poll_seconds=5):
+        self.transport = transport
+        self.concurrency = max(1, concurrency)
+        self.max_attempts = max_attempts
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.send_timeout = send_timeout
+        # A claimed message is given back if its sender has not finished by then
+        self.lease_seconds = send_timeout * 2
+        self.poll_seconds = poll_seconds
+        self._slots = asyncio.Semaphore(self.concurrency)
+        self._wake = asyncio.Event()
+        self._task = None
+
+    @property
+    def enabled(self):
+        return self.transport is not None
+
+    async def enqueue(self, db, to, subject, html, kind="email", ref=None, attachments=None):
+        """Store a message for delivery and wake the worker; returns the stored message.
+
+        ``attachments`` are ``{"filename", "content"}`` dicts with base64 content.
+        """
+        now = datetime.now(timezone.utc)
+        message = {
+            "message_id": str(uuid.uuid4()),
+            "kind": kind,
+            "ref": ref,
+            "to": list(to),
+            "subject": subject,
+            "html": html,
+            "attachments": attachments or [],
+            "status": "pending",
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now
+        }
+        await db.email_outbox.insert_one(message)
+        message.pop("_id", None)
+        self._wake.set()
+        return message
+
+    def retry_delay(self, attempts):
+        """Seconds to wait after the ``attempts``-th failed send."""
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def bury_expired(self, db):
+        """Move messages whose last allowed attempt lost its lease to ``dead``; returns how many."""
+        result = await db.email_outbox.update_many(
+            {"status": "sending", "lease_until": {"$lte": datetime.now(timezone.utc)}, "attempts": {"$gte": self.max_attempts}},
+            {
+                "$set": {"status": "dead", "last_error": "Lease expired: the sender stopped before finishing"},
+                "$unset": {"lease_until": ""}
+            }
+        )
+        if result.modified_count:
+            logger.error(f"{result.modified_count} email(s) dead after their last attempt's lease expired")
+        return result.modified_count
+
+    async def claim(self, db):
+        """Lease the next due message (or one whose lease expired with attempts left); None when nothing is due."""
+        now = datetime.now(timezone.utc)
+        message = await db.email_outbox.find_one_and_update(
+            {"$or": [
+                {"status": "pending", "next_attempt_at": {"$lte": now}},
+                {"status": "sending", "lease_until": {"$lte": now}, "attempts": {"$lt": self.max_attempts}}
+            ]},
+            {
+                "$set": {"status": "sending", "lease_until": now + timedelta(seconds=self.lease_seconds)},
+                "$inc": {"attempts": 1}
+            },
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        if message is not None:
+            message.pop("_id", None)
+        return message
+
+    async def _deliver(self, db, message):
+        try:
+            provider_id = await asyncio.wait_for(self.transport.send(message), self.send_timeout)
+        except Exception as e:
+            await self._failed(db, message, e)
+        else:
+            await db.email_outbox.update_one(
+                {"message_id": message['message_id'], "status": "sending"},
+                {
+                    "$set": {"status": "sent", "sent_at": datetime.now(timezone.utc), "provider_id": provider_id},
+                    "$unset": {"lease_until": ""}
+                }
+            )
+        finally:
+            self._slots.release()
+
+    async def _failed(self, db, message, error):
+        attempts = message['attempts']
+        update = {"last_error": f"{type(error).__name__}: {error}"}
+        if attempts >= self.max_attempts:
+            update["status"] = "dead"
+            logger.error(f"Email {message['message_id']} ({message['kind']}) dead after {attempts} attempts: {error}")
+        else:
+            update["status"] = "pending"
+            update["next_attempt_at"] = datetime.now(timezone.utc) + timedelta(seconds=self.retry_delay(attempts))
+            logger.warning(f"Email {message['message_id']} ({message['kind']}) attempt {attempts} failed: {error}")
+        await db.email_outbox.update_one(
+            {"message_id": message['message_id'], "status": "sending"},
+            {"$set": update, "$unset": {"lease_until": ""}}
+        )
+
+    async def drain(self, db):
+        """Attempt every message that is due now; returns how many were attempted."""
+        attempted = 0
+        sends = set()
+        await self.bury_expired(db)
+        while True:
+            await self._slots.acquire()
+            try:
+                message = await self.claim(db)
+            except Exception:
+                self._slots.release()
+                raise
+            if message is None:
+                self._slots.release()
+                break
+            attempted += 1
+            send = asyncio.create_task(self._deliver(db, message))
+            sends.add(send)
+            send.add_done_callback(sends.discard)
+        if sends:
+            await asyncio.gather(*sends)
+        return attempted
+
+    async def _run(self, db):
+        while True:
+            self._wake.clear()
+            try:
+                if await self.drain(db):
+                    continue
+            except Exception as e:
+                logger.error(f"Email outbox worker error: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), self.poll_seconds)
+            except asyncio.TimeoutError:
+                pass
+
+    def start(self, db):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run(db))
+
+    async def stop(self):
+        """Stop the worker; a message cut off mid-send is retried when its lease expires."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def requeue(self, db, message_id):
+        """Give a dead message a fresh set of attempts; False if there is no such dead message."""
+        result = await db.email_outbox.update_one(
+            {"message_id": message_id, "status": "dead"},
+            {"$set": {"status": "pending", "attempts": 0, "next_attempt_at": datetime.now(timezone.utc)}}
+        )
+        if result.modified_count:
+            self._wake.set()
+        return bool(result.modified_count)
+
+    async def stats(self, db, dead_limit=50):
+        """Message counts per status and the most recent dead letters."""
+        counts = {status: 0 for status in STATUSES}
+        async for row in db.email_outbox.aggregate([{"$group": {"_id": "$status", "count": {"$sum": 1}}}]):
+            counts[row['_id']] = row['count']
+        dead = await db.email_outbox.find(
+            {"status": "dead"}, {"_id": 0, "html": 0, "attachments": 0}
+        ).sort("created_at", -1).limit(dead_limit).to_list(dead_limit)
+        return {"counts": counts, "dead": dead}
@@ -0,0 +1,113 @@
+"""Keyset (cursor) pagination for the list endpoints.
+
+A page is ordered by ``(sort_field, id_field)`` and the cursor is an opaque
+token holding those two values of the last row served. The next page starts
+strictly after that row with a range condition, so it costs the same on page
+1000 as on page 1 (given an index on the same pair), and rows inserted or
+deleted meanwhile never shift later pages.
+"""
+import asyncio
+import base64
+import binascii
+from datetime import timezone
+
+from bson import json_util
+from bson.errors import InvalidBSON
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+_JSON_OPTIONS = json_util.JSONOptions(tz_aware=True, tzinfo=timezone.utc)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_value, id_value):
+    raw = json_util.dumps([sort_value, id_value], json_options=_JSON_OPTIONS)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        sort_value, id_value = json_util.loads(raw, json_options=_JSON_OPTIONS)
+    except (binascii.Error, UnicodeDecodeError, InvalidBSON, TypeError, ValueError):
+        raise InvalidCursor("Invalid cursor")
+    return sort_value, id_value
+
+
+def _after(sort_field, id_field, direction, cursor):
+    sort_value, id_value = decode_cursor(cursor)
+    op = "$gt" if direction == 1 else "$lt"
+    return {"$or": [
+        {sort_field: {op: sort_value}},
+        {sort_field: sort_value, id_field: {op: id_value}},
+    ]}
+
+
+def _clamp(limit):
+    return min(max(limit or DEFAULT_PAGE_SIZE, 1), MAX_PAGE_SIZE)
+
+
+def _finish(items, limit, sort_field, id_field):
+    """Trim the look-ahead row and build the cursor that follows the last row kept."""
+    if len(items) <= limit:
+        return items, None
+    items = items[:limit]
+    return items, encode_cursor(items[-1].get(sort_field), items[-1].get(id_field))
+
+
+async def paginate(collection, query, sort_field, id_field, direction=1, limit=None, cursor=None, projection=None):
+    """One page of ``collection`` as ``{"items": [...], "next_cursor": str | None}``.
+
+    ``next_cursor`` is None on the last page. Raises InvalidCursor for a
+    token that was not produced by ``encode_cursor``.
+    """
+    limit = _clamp(limit)
+    if cursor:
+        after = _after(sort_field, id_field, direction, cursor)
+        query = {"$and": [query, after]} if query else after
+
+    items = await collection.find(query, projection or {"_id": 0}).sort(
+        [(sort_field, direction), (id_field, direction)]
+    ).limit(limit + 1).to_list(limit + 1)
+
+    items, next_cursor = _finish(items, limit, sort_field, id_field)
+    return {"items": items, "next_cursor": next_cursor}
+
+
+async def paginate_with_total(collection, query, sort_field, id_field, direction=1, limit=None, cursor=None,
+                              skip=0, estimate_cap=None, projection=None):
+    """A page plus the total number of rows matching ``query``, in one round trip.
+
+    The page and the count come from a single ``$facet`` over the shared
+    ``$match``. With ``estimate_cap`` the count instead runs alongside the
+    page and stops at the cap (or uses collection metadata when there is no
+    filter); ``total_estimated`` then says the total is approximate.
+    """
+    limit = _clamp(limit)
+    page = []
+    if cursor:
+        page.append({"$match": _after(sort_field, id_field, direction, cursor)})
+    page.append({"$sort": {sort_field: direction, id_field: direction}})
+    if skip:
+        page.append({"$skip": skip})
+    page += [{"$limit": limit + 1}, {"$project": projection or {"_id": 0}}]
+
+    if estimate_cap is None:
+        result = await collection.aggregate([
+            {"$match": query},
+            {"$facet": {"items": page, "total": [{"$count": "n"}]}},
+        ]).to_list(1)
+        items = result[0]['items']
+        total = result[0]['total'][0]['n'] if result[0]['total'] else 0
+        estimated = False
+    else:
+        count = collection.count_documents(query, limit=estimate_cap) if query else collection.estimated_document_count()
+        items, total = await asyncio.gather(collection.aggregate([{"$match": query}, *page]).to_list(limit + 1), count)
+        estimated = not query or total >= estimate_cap
+
+    items, next_cursor = _finish(items, limit, sort_field, id_field)
+    return {"items": items, "total": total, "total_estimated": estimated, "next_cursor": next_cursor}
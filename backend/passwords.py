@@ -0,0 +1,62 @@
+"""Password hashing off the event loop.
+
+bcrypt is deliberately slow (hundreds of milliseconds per call at the
+default cost). Run inline in an async handler it stalls every other request
+on the worker, so hashing and verification go to a small dedicated thread
+pool (bcrypt releases the GIL) with a cap on how many calls may wait for it.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+from passlib.context import CryptContext
+
+
+class PasswordPoolBusy(Exception):
+    """Raised when too many password operations are already queued."""
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a bounded thread pool.
+
+    ``rounds`` is the bcrypt cost factor. Hashes made with any other cost
+    are re-hashed transparently the next time their owner logs in.
+    """
+
+    def __init__(self, rounds=12, max_workers=2, max_queue=32):
+        self.rounds = rounds
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.context = CryptContext(
+            schemes=["bcrypt"],
+            deprecated="auto",
+            bcrypt__default_rounds=rounds,
+            bcrypt__min_rounds=rounds,
+            bcrypt__max_rounds=rounds,
+        )
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bcrypt")
+        self._pending = 0
+
+    @property
+    def pending(self):
+        return self._pending
+
+    async def _run(self, func, *args):
+        if self._pending >= self.max_workers + self.max_queue:
+            raise PasswordPoolBusy()
+        self._pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        finally:
+            self._pending -= 1
+
+    async def hash(self, password):
+        return await self._run(self.context.hash, password)
+
+    async def verify_and_update(self, password, hashed):
+        """Return ``(valid, new_hash)``; ``new_hash`` is set when the stored hash uses a stale cost."""
+        if not hashed:
+            return False, None
+        return await self._run(self.context.verify_and_update, password, hashed)
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False)
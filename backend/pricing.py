@@ -0,0 +1,78 @@
+"""Invoice pricing from per-product tax rates.
+
+Each product stores ``tax_rate``: the sum of its taxes' percentages as a
+fraction, so a line's tax is ``sell_price * tax_rate`` and pricing needs no
+tax lookup. The rate is set when a product is saved and recomputed in bulk
+for every affected product when a tax changes or is deleted. Products written
+by something other than the API (seed or import scripts) may lack it;
+``fill_tax_rates`` computes and stores it the first time they are priced.
+"""
+from pymongo import UpdateOne
+
+
+def tax_rate_for(tax_ids, taxes):
+    """Combined rate of ``tax_ids`` given ``taxes`` (tax_id -> percentage); unknown ids count as zero."""
+    return sum(taxes.get(tax_id, 0) for tax_id in tax_ids or []) / 100
+
+
+async def _percentages(db, tax_ids=None):
+    query = {} if tax_ids is None else {"tax_id": {"$in": list(set(tax_ids))}}
+    taxes = await db.taxes.find(query, {"_id": 0, "tax_id": 1, "percentage": 1}).to_list(None)
+    return {t['tax_id']: t['percentage'] for t in taxes}
+
+
+async def tax_rate(db, tax_ids):
+    """Combined rate of ``tax_ids``, as stored on a product when it is saved."""
+    if not tax_ids:
+        return 0.0
+    return tax_rate_for(tax_ids, await _percentages(db, tax_ids))
+
+
+async def refresh_tax_rates(db, query):
+    """Recompute ``tax_rate`` for the products matching ``query``; returns how many changed."""
+    taxes = await _percentages(db)
+    updates = []
+    async for product in db.products.find(query, {"_id": 0, "product_id": 1, "tax_ids": 1, "tax_rate": 1}):
+        rate = tax_rate_for(product.get('tax_ids'), taxes)
+        if product.get('tax_rate') != rate:
+            updates.append(UpdateOne({"product_id": product['product_id']}, {"$set": {"tax_rate": rate}}))
+    if not updates:
+        return 0
+    result = await db.products.bulk_write(updates, ordered=False)
+    return result.modified_count
+
+
+async def fill_tax_rates(db, products):
+    """Set ``tax_rate`` on products stored without one, from their ``tax_ids``; returns how many were filled.
+
+    ``products`` are updated in place and the rates are stored.
+    """
+    missing = [product for product in products if 'tax_rate' not in product]
+    if not missing:
+        return 0
+    taxes = await _percentages(db, [tax_id for product in missing for tax_id in product.get('tax_ids', [])])
+    for product in missing:
+        product['tax_rate'] = tax_rate_for(product.get('tax_ids'), taxes)
+    # Only where it is still unset, so a concurrent refresh after a tax change wins
+    await db.products.bulk_write([
+        UpdateOne({"product_id": product['product_id'], "tax_rate": {"$exists": False}}, {"$set": {"tax_rate": product['tax_rate']}})
+        for product in missing
+    ], ordered=False)
+    return len(missing)
+
+
+def price_items(products):
+    """Invoice lines, subtotal and total tax for ``products`` (each with its ``tax_rate``)."""
+    items = []
+    subtotal = 0.0
+    for product in products:
+        price = product['sell_price']
+        tax_amount = price * product['tax_rate']
+        items.append({
+            "product_name": product['name'],
+            "price": price,
+            "tax_amount": tax_amount,
+            "total": price + tax_amount
+        })
+        subtotal += price
+    return items, subtotal, sum(item['tax_amount'] for item in items)
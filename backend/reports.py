@@ -0,0 +1,197 @@
+"""Columnar (Parquet / Arrow IPC) report exports for bookings and invoices.
+
+Rows are read from MongoDB in fixed-size record batches, converted against
+a fixed schema and written as they arrive, so a report of any size needs one
+batch of memory. Invoices are flattened to one row per line item, with the
+invoice's own fields repeated on each line.
+
+Parquet output is zstd-compressed; Arrow output is the IPC *file* format
+(Feather v2) so analysts can memory-map it with ``pyarrow.memory_map``.
+pyarrow is optional: without it ``available()`` is False and the API
+answers 501.
+"""
+import asyncio
+
+from datecodec import to_utc
+
+try:
+    import pyarrow as pa
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+
+FORMATS = {
+    "parquet": {"media_type": "application/vnd.apache.parquet", "extension": "parquet"},
+    "arrow": {"media_type": "application/vnd.apache.arrow.file", "extension": "arrow"},
+}
+
+
+def available():
+    return pa is not None
+
+
+def _schemas():
+    timestamp = pa.timestamp("ms", tz="UTC")
+    return {
+        "bookings": pa.schema([
+            ("booking_id", pa.string()),
+            ("booking_number", pa.int64()),
+            ("customer_id", pa.string()),
+            ("zone_id", pa.string()),
+            ("status", pa.string()),
+            ("appointment_datetime", timestamp),
+            ("appointment_day", pa.string()),
+            ("duration_minutes", pa.int32()),
+            ("product_ids", pa.list_(pa.string())),
+            ("vehicle_pickup_by_us", pa.bool_()),
+            ("vehicle_dropoff_by_us", pa.bool_()),
+            ("created_at", timestamp),
+            ("created_by", pa.string()),
+        ]),
+        "invoice_lines": pa.schema([
+            ("invoice_id", pa.string()),
+            ("invoice_number", pa.int64()),
+            ("invoice_prefix", pa.string()),
+            ("booking_id", pa.string()),
+            ("customer_id", pa.string()),
+            ("created_at", timestamp),
+            ("subtotal", pa.float64()),
+            ("tax_amount", pa.float64()),
+            ("discount_percentage", pa.float64()),
+            ("discount_amount", pa.float64()),
+            ("total", pa.float64()),
+            ("line_number", pa.int32()),
+            ("item_name", pa.string()),
+            ("item_price", pa.float64()),
+            ("item_tax_amount", pa.float64()),
+            ("item_total", pa.float64()),
+        ]),
+    }
+
+
+def _invoice_lines(invoice):
+    header = {key: invoice.get(key) for key in (
+        "invoice_id", "invoice_number", "invoice_prefix", "booking_id", "customer_id", "created_at",
+        "subtotal", "tax_amount", "discount_percentage", "discount_amount", "total",
+    )}
+    for number, item in enumerate(invoice.get("items") or [], start=1):
+        yield {
+            **header,
+            "line_number": number,
+            "item_name": item.get("product_name"),
+            "item_price": item.get("price"),
+            "item_tax_amount": item.get("tax_amount"),
+            "item_total": item.get("total"),
+        }
+
+
+# Report name -> (source collection, date field for range filters, row expansion)
+REPORTS = {
+    "bookings": ("bookings", "appointment_datetime", lambda doc: [doc]),
+    "invoice_lines": ("invoices", "created_at", _invoice_lines),
+}
+
+
+def report_schema(kind, columns=None):
+    """Schema of a report, narrowed to ``columns`` (ValueError on unknown names)."""
+    schema = _schemas()[kind]
+    if not columns:
+        return schema
+    unknown = [c for c in columns if c not in schema.names]
+    if unknown:
+        raise ValueError(f"Unknown columns: {', '.join(unknown)}")
+    return pa.schema([schema.field(c) for c in columns])
+
+
+class _ChunkSink:
+    """Write-only file object that hands written bytes back to the caller between batches."""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self.chunks.append(data)
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _writer(fmt, sink, schema):
+    if fmt == "parquet":
+        return pq.ParquetWriter(sink, schema, compression="zstd")
+    return ipc.new_file(sink, schema, options=ipc.IpcWriteOptions(compression="zstd"))
+
+
+def _record_batch(rows, schema, timestamps):
+    """Convert expanded rows into one record batch (runs in a worker thread)."""
+    columns = []
+    for row in rows:
+        row = {name: row.get(name) for name in schema.names}
+        # Rows written before dates were stored natively hold ISO strings
+        for name in timestamps:
+            if isinstance(row[name], str):
+                row[name] = to_utc(row[name])
+        columns.append(row)
+    return pa.RecordBatch.from_pylist(columns, schema=schema)
+
+
+async def _batches(db, kind, schema, date_condition, batch_rows):
+    """Record batches of ``batch_rows`` report rows (the last one may be shorter)."""
+    collection, date_field, expand = REPORTS[kind]
+    query = {date_field: date_condition} if date_condition else {}
+    timestamps = [field.name for field in schema if pa.types.is_timestamp(field.type)]
+    rows = []
+    async for doc in db[collection].find(query, {"_id": 0}, batch_size=batch_rows).sort(date_field, 1):
+        rows.extend(expand(doc))
+        while len(rows) >= batch_rows:
+            batch, rows = rows[:batch_rows], rows[batch_rows:]
+            yield await asyncio.to_thread(_record_batch, batch, schema, timestamps)
+    if rows:
+        yield await asyncio.to_thread(_record_batch, rows, schema, timestamps)
+
+
+async def stream_report(db, kind, fmt, date_condition=None, columns=None, batch_rows=50_000):
+    """Yield the encoded report in chunks, one per record batch.
+
+    Converting each batch of rows to Arrow, and encoding and compressing it,
+    run in worker threads so a large report does not stall the event loop.
+    """
+    schema = report_schema(kind, columns)
+    sink = _ChunkSink()
+    writer = _writer(fmt, pa.PythonFile(sink, mode="w"), schema)
+    try:
+        async for batch in _batches(db, kind, schema, date_condition, batch_rows):
+            await asyncio.to_thread(writer.write_batch, batch)
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def write_report(db, kind, fmt, path, date_condition=None, columns=None, batch_rows=50_000):
+    """Write a report to ``path``; returns the number of bytes written."""
+    size = 0
+    with open(path, "wb") as f:
+        async for chunk in stream_report(db, kind, fmt, date_condition, columns, batch_rows):
+            f.write(chunk)
+            size += len(chunk)
+    return size
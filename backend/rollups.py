@@ -0,0 +1,227 @@
+"""Incrementally maintained analytics counters.
+
+Every booking, invoice and customer write adjusts a few counter documents in
+``analytics_rollups``: one per shop-local day, one per month and one
+all-time (``_id`` ``"day:2024-05-01"``, ``"month:2024-05"``, ``"all"``).
+The analytics dashboard then reads a handful of small documents instead of
+scanning history. ``rebuild_rollups`` regenerates everything from the source
+collections, e.g. after a restore or if counters drifted.
+
+Statuses and zone ids become field names inside ``bookings_by_status`` and
+``bookings_by_zone``, so ``.``, ``$`` and ``%`` in them are percent-encoded
+(``field_key``) and decoded again when the dashboard reads them.
+"""
+import asyncio
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from urllib.parse import unquote
+
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+
+from analytics import MONTHS_SHOWN
+from datecodec import local_day
+from indexes import INDEXES
+
+# A rebuild that has not finished by then is presumed dead and may be taken over
+REBUILD_LEASE_SECONDS = 600
+
+
+def _periods(day):
+    if not day:
+        return [("all", "all", None)]
+    return [("day", f"day:{day}", day), ("month", f"month:{day[:7]}", day[:7]), ("all", "all", None)]
+
+
+def field_key(value):
+    """``value`` as a safe field name: no path separators or operator prefix."""
+    return str(value).replace("%", "%25").replace(".", "%2E").replace("$", "%24")
+
+
+def _decode_keys(counts):
+    return {unquote(key): value for key, value in counts.items()}
+
+
+def _booking_counters(booking, sign):
+    return {
+        "bookings": sign,
+        f"bookings_by_status.{field_key(booking.get('status', 'Unknown'))}": sign,
+        f"bookings_by_zone.{field_key(booking.get('zone_id'))}": sign,
+    }
+
+
+async def _apply(db, day, inc):
+    await db.analytics_rollups.bulk_write([
+        UpdateOne({"_id": _id}, {"$inc": inc, "$setOnInsert": {"kind": kind, "key": key}}, upsert=True)
+        for kind, _id, key in _periods(day)
+    ], ordered=False)
+
+
+async def record_booking(db, booking, sign=1):
+    """Count a new booking (or un-count it with ``sign=-1``)."""
+    await _apply(db, booking.get('appointment_day'), _booking_counters(booking, sign))
+
+
+async def _apply_many(db, changes):
+    """Apply many ``(day, inc)`` changes with one bulk write, merged per counter document."""
+    incs = defaultdict(lambda: defaultdict(int))
+    periods = {}
+    for day, inc in changes:
+        for kind, _id, key in _periods(day):
+            periods[_id] = (kind, key)
+            for field, value in inc.items():
+                incs[_id][field] += value
+    operations = [
+        UpdateOne({"_id": _id}, {"$inc": nonzero, "$setOnInsert": {"kind": periods[_id][0], "key": periods[_id][1]}}, upsert=True)
+        for _id, inc in incs.items()
+        if (nonzero := {field: value for field, value in inc.items() if value})
+    ]
+    if operations:
+        await db.analytics_rollups.bulk_write(operations, ordered=False)
+
+
+async def record_bookings(db, bookings):
+    """Count many new bookings with a single bulk write."""
+    await _apply_many(db, [(booking.get('appointment_day'), _booking_counters(booking, 1)) for booking in bookings])
+
+
+async def record_booking_change(db, before, after):
+    """Move a booking's counts when its status or appointment day changes."""
+    if (before.get('status'), before.get('appointment_day')) == (after.get('status'), after.get('appointment_day')):
+        return
+    await record_booking(db, before, -1)
+    await record_booking(db, after, 1)
+
+
+async def record_booking_changes(db, changes):
+    """``record_booking_change`` for many ``(before, after)`` pairs, with a single bulk write."""
+    moves = []
+    for before, after in changes:
+        if (before.get('status'), before.get('appointment_day')) == (after.get('status'), after.get('appointment_day')):
+            continue
+        moves.append((before.get('appointment_day'), _booking_counters(before, -1)))
+        moves.append((after.get('appointment_day'), _booking_counters(after, 1)))
+    await _apply_many(db, moves)
+
+
+async def record_invoice(db, invoice):
+    await _apply(db, local_day(invoice.get('created_at')), {"invoices": 1, "revenue": invoice.get('total', 0)})
+
+
+async def record_invoices(db, invoices):
+    await _apply_many(db, [
+        (local_day(invoice.get('created_at')), {"invoices": 1, "revenue": invoice.get('total', 0)})
+        for invoice in invoices
+    ])
+
+
+async def record_customer(db, customer, sign=1):
+    await _apply(db, local_day(customer.get('created_at')), {"new_customers": sign})
+
+
+async def _acquire_rebuild_lock(db):
+    """Owner token for the rebuild lock, or None while another rebuild holds it."""
+    now = datetime.now(timezone.utc)
+    lock = {"owner": str(uuid.uuid4()), "until": now + timedelta(seconds=REBUILD_LEASE_SECONDS)}
+    try:
+        await db.locks.insert_one({"_id": "rollups_rebuild", **lock})
+    except DuplicateKeyError:
+        taken = await db.locks.find_one_and_update(
+            {"_id": "rollups_rebuild", "until": {"$lt": now}}, {"$set": lock}
+        )
+        if taken is None:
+            return None
+    return lock["owner"]
+
+
+async def rebuild_rollups(db):
+    """Recompute every rollup document from bookings, invoices and customers.
+
+    The result is written to a side collection and swapped in with a rename,
+    so readers never see a half-built set. A lock document in ``locks`` keeps
+    two rebuilds from sharing the side collection; returns None without doing
+    anything while another rebuild holds it. Writes that land while the
+    rebuild is running may be lost; run it when the shop is closed.
+    """
+    owner = await _acquire_rebuild_lock(db)
+    if owner is None:
+        return None
+    try:
+        return await _rebuild(db)
+    finally:
+        await db.locks.delete_one({"_id": "rollups_rebuild", "owner": owner})
+
+
+async def _rebuild(db):
+    counters = defaultdict(lambda: defaultdict(float))
+
+    def add(day, inc):
+        for kind, _id, key in _periods(day):
+            doc = counters[(_id, kind, key)]
+            for field, value in inc.items():
+                doc[field] += value
+
+    async for booking in db.bookings.find({}, {"_id": 0, "status": 1, "zone_id": 1, "appointment_day": 1}):
+        add(booking.get('appointment_day'), _booking_counters(booking, 1))
+    async for invoice in db.invoices.find({}, {"_id": 0, "total": 1, "created_at": 1}):
+        add(local_day(invoice.get('created_at')), {"invoices": 1, "revenue": invoice.get('total', 0)})
+    async for customer in db.customers.find({}, {"_id": 0, "created_at": 1}):
+        add(local_day(customer.get('created_at')), {"new_customers": 1})
+
+    docs = []
+    for (_id, kind, key), values in counters.items():
+        doc = {"_id": _id, "kind": kind, "key": key}
+        for field, value in values.items():
+            if field != "revenue":
+                value = int(value)
+            if "." in field:
+                group, name = field.split(".", 1)
+                doc.setdefault(group, {})[name] = value
+            else:
+                doc[field] = value
+        docs.append(doc)
+    if not docs:
+        docs.append({"_id": "all", "kind": "all", "key": None})
+
+    staging = db.analytics_rollups_rebuild
+    await staging.drop()
+    await staging.insert_many(docs)
+    await staging.create_indexes(INDEXES["analytics_rollups"])
+    await staging.rename("analytics_rollups", dropTarget=True)
+    return len(docs)
+
+
+async def ensure_rollups(db):
+    """Build the rollups once if they have never been built (one worker builds, the others skip)."""
+    if not await db.analytics_rollups.find_one({"_id": "all"}, {"_id": 1}):
+        await rebuild_rollups(db)
+
+
+async def _recent_months(db, metric, value_field):
+    months = await db.analytics_rollups.find(
+        {"kind": "month", metric: {"$gt": 0}}, {"_id": 0, "key": 1, value_field: 1}
+    ).sort("key", -1).to_list(MONTHS_SHOWN)
+    return {m['key']: m.get(value_field, 0) for m in reversed(months)}
+
+
+async def dashboard_from_rollups(db):
+    """Analytics dashboard payload served from rollups; cost is independent of data size."""
+    totals, zones, bookings_by_month, revenue_by_month, customers_by_month = await asyncio.gather(
+        db.analytics_rollups.find_one({"_id": "all"}),
+        db.zones.find({}, {"_id": 0, "zone_id": 1, "name": 1}).to_list(1000),
+        _recent_months(db, "bookings", "bookings"),
+        _recent_months(db, "invoices", "revenue"),
+        _recent_months(db, "new_customers", "new_customers"),
+    )
+    totals = totals or {}
+    bookings_per_zone = _decode_keys(totals.get('bookings_by_zone', {}))
+
+    return {
+        "bookings_by_status": {k: v for k, v in _decode_keys(totals.get('bookings_by_status', {})).items() if v},
+        "bookings_by_month": bookings_by_month,
+        "revenue_by_month": revenue_by_month,
+        "zone_utilization": {zone['name']: bookings_per_zone.get(zone['zone_id'], 0) for zone in zones},
+        "customers_by_month": customers_by_month,
+        "total_revenue": totals.get('revenue', 0),
+    }
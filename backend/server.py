@@ -1,205 +1,179 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Request, Response, UploadFile, File, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi.responses import HTMLResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
 import os
 import logging
 from pathlib import Path
-from pydantic import BaseModel, Field, EmailStr, ConfigDict
-from typing import List, Optional
+from pydantic import BaseModel, EmailStr, TypeAdapter
+from typing import List, Optional, Union
 import uuid
 from datetime import datetime, timezone, timedelta
 import jwt
-from passlib.context import CryptContext
 import resend
 import asyncio
+import base64
+from zone_index import ZoneIntervalIndex
+from datecodec import to_utc, to_local, parse_day, appointment_fields, date_range
+from booking_slots import SlotConflict, on_grid, reserve_slots, reserve_many, release_slots
+from counters import SequenceAllocator, bump_version, current_version
+from indexes import ensure_indexes, index_report
+from cache import TTLCache, VersionedCache
+from passwords import PasswordHasher, PasswordPoolBusy
+from outbox import EmailOutbox, RecordingTransport, ResendTransport
+import emails
+import invoice_pdf
+from invoice_pdf import InvoicePdfRenderer, PdfPoolBusy
+from analytics import dashboard_stats
+from customer_search import search_fields, search_customers as find_customers, matching_customer_ids
+from models import (
+    BOOKING_STATUSES,
+    User, UserCreate, UserLogin, Customer, CustomerCreate, Category, CategoryCreate, Tax, TaxCreate,
+    Product, ProductCreate, WashZone, WashZoneCreate, Booking, BookingCreate, BookingRecurrence,
+    BulkBookingCreate, BulkBookingResult, BulkBookingResponse, BulkStatusUpdate, BatchInvoiceCreate,
+    BookingUpdate, Settings, SettingsUpdate, Invoice, InvoiceCreate, EmailRequest, Page,
+    CountedPage,
+)
+import customer_import
+from customer_import import ImportFormatError
+from exports import EXPORTS, export_cursor, stream_ndjson
+import reports
+import fast_json
+from fast_json import FastJSONResponse, model_projection
+from http_cache import ConditionalCompressionMiddleware, etag_for, etag_matches
+from pricing import tax_rate, refresh_tax_rates, fill_tax_rates, price_items
+from pagination import InvalidCursor, paginate, paginate_with_total
+from rollups import record_booking, record_bookings, record_booking_change, record_booking_changes, record_invoices, record_invoice, record_customer, ensure_rollups, dashboard_from_rollups
 
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
 mongo_url = os.environ['MONGO_URL']
-client = AsyncIOMotorClient(mongo_url)
+client = AsyncIOMotorClient(mongo_url, tz_aware=True)
 db = client[os.environ['DB_NAME']]
 
 app = FastAPI()
 api_router = APIRouter(prefix="/api")
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# bcrypt runs on its own bounded thread pool so logins never block the event loop
+password_hasher = PasswordHasher(
+    rounds=int(os.environ.get('BCRYPT_ROUNDS', '12')),
+    max_workers=int(os.environ.get('PASSWORD_HASH_WORKERS', '2')),
+    max_queue=int(os.environ.get('PASSWORD_HASH_QUEUE', '32'))
+)
 security = HTTPBearer()
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'your-secret-key')
 JWT_ALGORITHM = "HS256"
 JWT_EXPIRATION_HOURS = 24
 
+# Decoded bearer tokens -> User; bounds how long a role/name change can take to apply
+principal_cache = TTLCache(
+    maxsize=int(os.environ.get('AUTH_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('AUTH_CACHE_TTL_SECONDS', '30'))
+)
+
+# /dashboard/stats is polled by every open dashboard; concurrent misses share one computation
+dashboard_stats_cache = TTLCache(
+    maxsize=1,
+    ttl=float(os.environ.get('DASHBOARD_STATS_CACHE_SECONDS', '3'))
+)
+
+# Categories, taxes, products, zones and settings change a few times a month;
+# handlers that write them invalidate their entry
+reference_cache = VersionedCache(
+    ttl=float(os.environ.get('REFERENCE_CACHE_TTL_SECONDS', '300'))
+)
+
+# Rendered invoice emails by (customer, invoice, settings version); invoices are
+# immutable, so resends and previews are served from here. Customer updates,
+# deletes and imports drop that customer's entries (forget_customer_emails)
+invoice_email_cache = TTLCache(
+    maxsize=int(os.environ.get('INVOICE_EMAIL_CACHE_SIZE', '256')),
+    ttl=float(os.environ.get('REFERENCE_CACHE_TTL_SECONDS', '300'))
+)
+
+# Invoice PDFs, rendered on a process pool and cached on disk (see invoice_pdf.py)
+invoice_pdfs = InvoicePdfRenderer(
+    cache_dir=os.environ.get('PDF_CACHE_DIR', str(ROOT_DIR / 'pdf_cache')),
+    max_workers=int(os.environ.get('PDF_RENDER_WORKERS', '2')),
+    max_queue=int(os.environ.get('PDF_RENDER_QUEUE', '16'))
+)
+
 resend.api_key = os.environ.get('RESEND_API_KEY', '')
 SENDER_EMAIL = os.environ.get('SENDER_EMAIL', 'onboarding@resend.dev')
 
+# Emails go through the email_outbox collection and are delivered by a background
+# worker (see outbox.py). EMAIL_TRANSPORT=stub keeps them in memory instead of
+# calling Resend, for local runs and tests.
+EMAIL_TRANSPORT = os.environ.get('EMAIL_TRANSPORT', 'resend')
+if EMAIL_TRANSPORT == 'stub':
+    email_transport = RecordingTransport()
+elif resend.api_key:
+    email_transport = ResendTransport(SENDER_EMAIL)
+else:
+    email_transport = None
+email_outbox = EmailOutbox(
+    email_transport,
+    concurrency=int(os.environ.get('EMAIL_WORKER_CONCURRENCY', '4')),
+    max_attempts=int(os.environ.get('EMAIL_MAX_ATTEMPTS', '8')),
+    retry_base_seconds=float(os.environ.get('EMAIL_RETRY_BASE_SECONDS', '30')),
+    retry_max_seconds=float(os.environ.get('EMAIL_RETRY_MAX_SECONDS', '3600')),
+    send_timeout=float(os.environ.get('EMAIL_SEND_TIMEOUT_SECONDS', '30'))
+)
+
 logger = logging.getLogger(__name__)
 
-# Models
-class User(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    user_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    email: EmailStr
-    name: str
-    role: str
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Per-zone booking intervals backing /zones/available
+zone_index = ZoneIntervalIndex(max_age_seconds=int(os.environ.get('ZONE_INDEX_MAX_AGE_SECONDS', '60')))
 
-class UserCreate(BaseModel):
-    email: EmailStr
-    password: str
-    name: str
-    role: str = "Staff"
+# Granularity of the per-zone slot keys that make booking reservations atomic
+BOOKING_SLOT_MINUTES = int(os.environ.get('BOOKING_SLOT_MINUTES', '5'))
 
-class UserLogin(BaseModel):
-    email: EmailStr
-    password: str
+# Most rows an unpaginated list request returns (pass limit/cursor to page further)
+MAX_LIST_ROWS = int(os.environ.get('MAX_LIST_ROWS', '1000'))
 
-class Customer(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    customer_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    email: Optional[EmailStr] = None
-    phone: str
-    address: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Rows per batch read from MongoDB and per chunk written by the /export endpoints
+EXPORT_BATCH_SIZE = int(os.environ.get('EXPORT_BATCH_SIZE', '1000'))
 
-class CustomerCreate(BaseModel):
-    name: str
-    email: Optional[EmailStr] = None
-    phone: str
-    address: Optional[str] = None
+# Rows per record batch in /reports Parquet/Arrow exports
+REPORT_BATCH_ROWS = int(os.environ.get('REPORT_BATCH_ROWS', '50000'))
 
-class Category(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    category_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    description: Optional[str] = None
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Encode list responses straight from the stored rows with orjson (see fast_json.py)
+FAST_JSON_LISTS = os.environ.get('FAST_JSON_LISTS', 'false').lower() in ('1', 'true', 'yes')
 
-class CategoryCreate(BaseModel):
-    name: str
-    description: Optional[str] = None
+# Rows validated and written per batch by POST /customers/import
+CUSTOMER_IMPORT_CHUNK_SIZE = int(os.environ.get('CUSTOMER_IMPORT_CHUNK_SIZE', '1000'))
 
-class Tax(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    tax_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    percentage: float
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Most occurrences one POST /bookings/bulk may create
+BULK_BOOKING_LIMIT = int(os.environ.get('BULK_BOOKING_LIMIT', '200'))
 
-class TaxCreate(BaseModel):
-    name: str
-    percentage: float
+# Most bookings one POST /invoices/batch may invoice
+BATCH_INVOICE_LIMIT = int(os.environ.get('BATCH_INVOICE_LIMIT', '1000'))
 
-class Product(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    product_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    code: str
-    category_id: str
-    tax_ids: List[str]
-    buy_price: Optional[float] = None
-    sell_price: float
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class ProductCreate(BaseModel):
-    name: str
-    code: str
-    category_id: str
-    tax_ids: List[str]
-    buy_price: Optional[float] = None
-    sell_price: float
-
-class WashZone(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    zone_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    name: str
-    is_active: bool = True
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+# Above this many matches /bookings?estimate_total=true stops counting
+BOOKINGS_TOTAL_ESTIMATE_CAP = int(os.environ.get('BOOKINGS_TOTAL_ESTIMATE_CAP', '10000'))
 
-class WashZoneCreate(BaseModel):
-    name: str
-    is_active: bool = True
-
-class Booking(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    booking_id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    booking_number: Optional[int] = None
-    customer_id: str
-    zone_id: str
-    product_ids: List[str]
-    appointment_datetime: datetime
-    duration_minutes: int = 60
-    vehicle_pickup_by_us: bool = False
-    vehicle_dropoff_by_us: bool = False
-    status: str = "Pending"
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class BookingCreate(BaseModel):
-    customer_id: str
-    zone_id: str
-    product_ids: List[str]
-    appointment_datetime: datetime
-    duration_minutes: int = 60
-    vehicle_pickup_by_us: bool = False
-    vehicle_dropoff_by_us: bool = False
-
-class BookingUpdate(BaseModel):
-    status: Optional[str] = None
-    customer_id: Optional[str] = None
-    appointment_datetime: Optional[datetime] = None
-    duration_minutes: Optional[int] = None
-    vehicle_pickup_by_us: Optional[bool] = None
-    vehicle_dropoff_by_us: Optional[bool] = None
-    product_ids: Optional[List[str]] = None
-
-class Settings(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    settings_id: str = "default"
-    currency: str = "USD"
-    show_tax_bifurcation: bool = True
-    updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-
-class SettingsUpdate(BaseModel):
-    currency: Optional[str] = None
-    show_tax_bifurcation: Optional[bool] = None
-
-class Invoice(BaseModel):
-    model_config = ConfigDict(extra="ignore")
-    invoice_id: str
-    invoice_number: Optional[int] = None
-    invoice_prefix: Optional[str] = ""
-    booking_id: str
-    customer_id: str
-    items: List[dict]
-    subtotal: float
-    tax_amount: float
-    discount_percentage: float = 0.0
-    discount_amount: float = 0.0
-    total: float
-    created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
-    created_by: str
-
-class InvoiceCreate(BaseModel):
-    booking_id: str
-    discount_percentage: float = 0.0
-    invoice_prefix: str = ""
-    product_ids: Optional[List[str]] = None  # Optional: if provided, will update booking and use these products
-
-class EmailRequest(BaseModel):
-    recipient_email: EmailStr
-    subject: str
-    html_content: str
+# Atomic counters for booking and invoice numbers
+booking_numbers = SequenceAllocator("booking_number", block_size=int(os.environ.get('BOOKING_NUMBER_BLOCK_SIZE', '1')))
+invoice_numbers = SequenceAllocator("invoice_number", block_size=int(os.environ.get('INVOICE_NUMBER_BLOCK_SIZE', '1')))
 
 # Auth functions
-def hash_password(password: str) -> str:
-    return pwd_context.hash(password)
+async def hash_password(password: str) -> str:
+    try:
+        return await password_hasher.hash(password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password: str, hashed_password: str):
+    """Returns (valid, new_hash); new_hash is set when the stored hash should be upgraded"""
+    try:
+        return await password_hasher.verify_and_update(plain_password, hashed_password)
+    except PasswordPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
 
 def create_token(data: dict) -> str:
     to_encode = data.copy()
@@ -208,21 +182,87 @@ def create_token(data: dict) -> str:
     return jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
 
 async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    token = credentials.credentials
+    cached = principal_cache.get(token)
+    if cached is not None:
+        return cached
     try:
-        token = credentials.credentials
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
         user_id = payload.get("user_id")
         if user_id is None:
             raise HTTPException(status_code=401, detail="Invalid token")
-        user = await db.users.find_one({"user_id": user_id}, {"_id": 0})
+        user = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0})
         if not user:
             raise HTTPException(status_code=401, detail="User not found")
-        return User(**user)
+        user = User(**user)
+        # Never cache a token past its own expiry
+        principal_cache.set(token, user, ttl=payload["exp"] - datetime.now(timezone.utc).timestamp())
+        return user
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Invalid token")
 
+async def list_or_page(collection, query, sort_field, id_field, direction=1, limit=None, cursor=None, projection=None):
+    """First MAX_LIST_ROWS in (sort_field, id_field) order, or a keyset page when ``limit`` or ``cursor`` is given"""
+    projection = projection or {"_id": 0}
+    if limit is None and cursor is None:
+        return await collection.find(query, projection).sort(
+            [(sort_field, direction), (id_field, direction)]
+        ).limit(MAX_LIST_ROWS).to_list(MAX_LIST_ROWS)
+    try:
+        return await paginate(collection, query, sort_field, id_field, direction, limit, cursor, projection)
+    except InvalidCursor as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def list_response(result, model):
+    """List or page of ``model`` rows as returned by the handler, or pre-encoded when the fast JSON path is on"""
+    if FAST_JSON_LISTS and fast_json.available():
+        fast_json.conform(result['items'] if isinstance(result, dict) else result, model)
+        return FastJSONResponse(result)
+    return result
+
+async def versioned_list(request: Request, response: Response, name: str, model, load):
+    """List response whose ETag comes from the collection's change counter.
+
+    A client holding the current version gets a 304 before the collection is
+    read at all; otherwise ``load()`` builds the list as usual.
+    """
+    version = await current_version(db, name)
+    etag = etag_for(f"{name}:{version}:{request.url.query}:{FAST_JSON_LISTS}:{MAX_LIST_ROWS}".encode())
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    result = list_response(await load(), model)
+    (result if isinstance(result, Response) else response).headers.update(headers)
+    return result
+
+# Reference collections cached whole, with their list order and response model
+REFERENCE_LISTS = {
+    "categories": ("name", "category_id", Category),
+    "taxes": ("name", "tax_id", Tax),
+    "products": ("name", "product_id", Product),
+    "zones": ("name", "zone_id", WashZone),
+}
+
+async def reference_list(name: str):
+    """Full list of a reference collection, served from the reference cache"""
+    sort_field, id_field, _ = REFERENCE_LISTS[name]
+    return await reference_cache.get(name, lambda: list_or_page(db[name], {}, sort_field, id_field))
+
+async def reference_response(request: Request, name: str):
+    """Full reference list, encoded once per cache version; 304 when the client's copy is current"""
+    async def encode():
+        adapter = TypeAdapter(List[REFERENCE_LISTS[name][2]])
+        body = adapter.dump_json(adapter.validate_python(await reference_list(name)))
+        return body, etag_for(body)
+    
+    body, etag = await reference_cache.get(name, encode, variant="response")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
 # Auth routes
 @api_router.post("/auth/register")
 async def register(user_data: UserCreate):
@@ -237,8 +277,7 @@ async def register(user_data: UserCreate):
     )
     
     doc = user.model_dump()
-    doc['password_hash'] = hash_password(user_data.password)
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['password_hash'] = await hash_password(user_data.password)
     
     await db.users.insert_one(doc)
     
@@ -248,11 +287,15 @@ async def register(user_data: UserCreate):
 @api_router.post("/auth/login")
 async def login(credentials: UserLogin):
     user_doc = await db.users.find_one({"email": credentials.email}, {"_id": 0})
-    if not user_doc or not verify_password(credentials.password, user_doc.get('password_hash', '')):
+    if not user_doc:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+    valid, new_hash = await verify_password(credentials.password, user_doc.get('password_hash', ''))
+    if not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
-    if isinstance(user_doc['created_at'], str):
-        user_doc['created_at'] = datetime.fromisoformat(user_doc['created_at'])
+    # Transparently upgrade hashes made with a different BCRYPT_ROUNDS
+    if new_hash:
+        await db.users.update_one({"user_id": user_doc['user_id']}, {"$set": {"password_hash": new_hash}})
     
     user_doc.pop('password_hash', None)
     user = User(**user_doc)
@@ -265,22 +308,47 @@ async def get_me(current_user: User = Depends(get_current_user)):
     return current_user
 
 # Customer routes
-@api_router.get("/customers", response_model=List[Customer])
-async def get_customers(current_user: User = Depends(get_current_user)):
-    customers = await db.customers.find({}, {"_id": 0}).to_list(1000)
-    for c in customers:
-        if isinstance(c.get('created_at'), str):
-            c['created_at'] = datetime.fromisoformat(c['created_at'])
-    return customers
+def forget_customer_emails(customer_ids):
+    """Drop cached invoice emails of customers whose name or phone may have changed"""
+    customer_ids = set(customer_ids)
+    invoice_email_cache.invalidate_keys(lambda key: key[0] in customer_ids)
+
+@api_router.get("/customers", response_model=Union[List[Customer], Page[Customer]])
+async def get_customers(request: Request, response: Response, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    return await versioned_list(request, response, "customers", Customer, lambda: list_or_page(
+        db.customers, {}, "created_at", "customer_id", 1, limit, cursor, model_projection(Customer)
+    ))
 
 @api_router.post("/customers", response_model=Customer)
 async def create_customer(customer_data: CustomerCreate, current_user: User = Depends(get_current_user)):
     customer = Customer(**customer_data.model_dump())
     doc = customer.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc.update(search_fields(customer.name, customer.phone))
     await db.customers.insert_one(doc)
+    await bump_version(db, "customers")
+    await record_customer(db, doc)
     return customer
 
+@api_router.post("/customers/import")
+async def import_customers(file: UploadFile = File(...), on_duplicate: str = "update", current_user: User = Depends(get_current_user)):
+    """Import customers from a CSV or .xlsx file, deduplicated on phone number and email"""
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if on_duplicate not in customer_import.DUPLICATE_MODES:
+        raise HTTPException(status_code=400, detail=f"on_duplicate must be one of: {', '.join(customer_import.DUPLICATE_MODES)}")
+    if (file.filename or "").lower().endswith(".xlsx"):
+        if not customer_import.excel_available():
+            raise HTTPException(status_code=501, detail="Excel imports require openpyxl on the server; upload a CSV instead")
+        rows = customer_import.xlsx_rows(file.file)
+    else:
+        rows = customer_import.csv_rows(file.file)
+    try:
+        return await customer_import.import_customers(
+            db, rows, CustomerCreate, on_duplicate, CUSTOMER_IMPORT_CHUNK_SIZE, on_updated=forget_customer_emails
+        )
+    except ImportFormatError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @api_router.put("/customers/{customer_id}", response_model=Customer)
 async def update_customer(customer_id: str, customer_data: CustomerCreate, current_user: User = Depends(get_current_user)):
     result = await db.customers.find_one({"customer_id": customer_id}, {"_id": 0})
@@ -288,52 +356,44 @@ async def update_customer(customer_id: str, customer_data: CustomerCreate, curre
         raise HTTPException(status_code=404, detail="Customer not found")
     
     update_data = customer_data.model_dump()
+    update_data.update(search_fields(customer_data.name, customer_data.phone))
     await db.customers.update_one({"customer_id": customer_id}, {"$set": update_data})
+    await bump_version(db, "customers")
+    forget_customer_emails([customer_id])
     
     updated = await db.customers.find_one({"customer_id": customer_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return Customer(**updated)
 
 @api_router.delete("/customers/{customer_id}")
 async def delete_customer(customer_id: str, current_user: User = Depends(get_current_user)):
     if current_user.role not in ["Admin", "Manager"]:
         raise HTTPException(status_code=403, detail="Not authorized")
-    result = await db.customers.delete_one({"customer_id": customer_id})
-    if result.deleted_count == 0:
+    deleted = await db.customers.find_one_and_delete({"customer_id": customer_id}, {"_id": 0, "created_at": 1})
+    if not deleted:
         raise HTTPException(status_code=404, detail="Customer not found")
+    await bump_version(db, "customers")
+    forget_customer_emails([customer_id])
+    await record_customer(db, deleted, -1)
     return {"message": "Customer deleted"}
 
 @api_router.get("/customers/search/{query}")
 async def search_customers(query: str, current_user: User = Depends(get_current_user)):
-    customers = await db.customers.find({
-        "$or": [
-            {"name": {"$regex": query, "$options": "i"}},
-            {"phone": {"$regex": query, "$options": "i"}}
-        ]
-    }, {"_id": 0}).limit(10).to_list(10)
-    
-    for c in customers:
-        if isinstance(c.get('created_at'), str):
-            c['created_at'] = datetime.fromisoformat(c['created_at'])
-    
-    return customers
+    """Type-ahead by name or phone, best match first"""
+    return await find_customers(db, query, limit=10)
 
 # Category routes
-@api_router.get("/categories", response_model=List[Category])
-async def get_categories(current_user: User = Depends(get_current_user)):
-    categories = await db.categories.find({}, {"_id": 0}).to_list(1000)
-    for c in categories:
-        if isinstance(c.get('created_at'), str):
-            c['created_at'] = datetime.fromisoformat(c['created_at'])
-    return categories
+@api_router.get("/categories", response_model=Union[List[Category], Page[Category]])
+async def get_categories(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if limit is None and cursor is None:
+        return await reference_response(request, "categories")
+    return list_response(await list_or_page(db.categories, {}, "name", "category_id", 1, limit, cursor, model_projection(Category)), Category)
 
 @api_router.post("/categories", response_model=Category)
 async def create_category(category_data: CategoryCreate, current_user: User = Depends(get_current_user)):
     category = Category(**category_data.model_dump())
     doc = category.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.categories.insert_one(doc)
+    reference_cache.invalidate("categories")
     return category
 
 @api_router.put("/categories/{category_id}", response_model=Category)
@@ -344,10 +404,9 @@ async def update_category(category_id: str, category_data: CategoryCreate, curre
     
     update_data = category_data.model_dump()
     await db.categories.update_one({"category_id": category_id}, {"$set": update_data})
+    reference_cache.invalidate("categories")
     
     updated = await db.categories.find_one({"category_id": category_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return Category(**updated)
 
 @api_router.delete("/categories/{category_id}")
@@ -357,23 +416,22 @@ async def delete_category(category_id: str, current_user: User = Depends(get_cur
     result = await db.categories.delete_one({"category_id": category_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Category not found")
+    reference_cache.invalidate("categories")
     return {"message": "Category deleted"}
 
 # Tax routes
-@api_router.get("/taxes", response_model=List[Tax])
-async def get_taxes(current_user: User = Depends(get_current_user)):
-    taxes = await db.taxes.find({}, {"_id": 0}).to_list(1000)
-    for t in taxes:
-        if isinstance(t.get('created_at'), str):
-            t['created_at'] = datetime.fromisoformat(t['created_at'])
-    return taxes
+@api_router.get("/taxes", response_model=Union[List[Tax], Page[Tax]])
+async def get_taxes(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if limit is None and cursor is None:
+        return await reference_response(request, "taxes")
+    return list_response(await list_or_page(db.taxes, {}, "name", "tax_id", 1, limit, cursor, model_projection(Tax)), Tax)
 
 @api_router.post("/taxes", response_model=Tax)
 async def create_tax(tax_data: TaxCreate, current_user: User = Depends(get_current_user)):
     tax = Tax(**tax_data.model_dump())
     doc = tax.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.taxes.insert_one(doc)
+    reference_cache.invalidate("taxes")
     return tax
 
 @api_router.put("/taxes/{tax_id}", response_model=Tax)
@@ -384,10 +442,11 @@ async def update_tax(tax_id: str, tax_data: TaxCreate, current_user: User = Depe
     
     update_data = tax_data.model_dump()
     await db.taxes.update_one({"tax_id": tax_id}, {"$set": update_data})
+    if tax_data.percentage != result['percentage']:
+        await refresh_tax_rates(db, {"tax_ids": tax_id})
+    reference_cache.invalidate("taxes", "products")
     
     updated = await db.taxes.find_one({"tax_id": tax_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return Tax(**updated)
 
 @api_router.delete("/taxes/{tax_id}")
@@ -397,23 +456,23 @@ async def delete_tax(tax_id: str, current_user: User = Depends(get_current_user)
     result = await db.taxes.delete_one({"tax_id": tax_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Tax not found")
+    await refresh_tax_rates(db, {"tax_ids": tax_id})
+    reference_cache.invalidate("taxes", "products")
     return {"message": "Tax deleted"}
 
 # Product routes
-@api_router.get("/products", response_model=List[Product])
-async def get_products(current_user: User = Depends(get_current_user)):
-    products = await db.products.find({}, {"_id": 0}).to_list(1000)
-    for p in products:
-        if isinstance(p.get('created_at'), str):
-            p['created_at'] = datetime.fromisoformat(p['created_at'])
-    return products
+@api_router.get("/products", response_model=Union[List[Product], Page[Product]])
+async def get_products(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if limit is None and cursor is None:
+        return await reference_response(request, "products")
+    return list_response(await list_or_page(db.products, {}, "name", "product_id", 1, limit, cursor, model_projection(Product)), Product)
 
 @api_router.post("/products", response_model=Product)
 async def create_product(product_data: ProductCreate, current_user: User = Depends(get_current_user)):
-    product = Product(**product_data.model_dump())
+    product = Product(**product_data.model_dump(), tax_rate=await tax_rate(db, product_data.tax_ids))
     doc = product.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.products.insert_one(doc)
+    reference_cache.invalidate("products")
     return product
 
 @api_router.put("/products/{product_id}", response_model=Product)
@@ -423,11 +482,11 @@ async def update_product(product_id: str, product_data: ProductCreate, current_u
         raise HTTPException(status_code=404, detail="Product not found")
     
     update_data = product_data.model_dump()
+    update_data["tax_rate"] = await tax_rate(db, product_data.tax_ids)
     await db.products.update_one({"product_id": product_id}, {"$set": update_data})
+    reference_cache.invalidate("products")
     
     updated = await db.products.find_one({"product_id": product_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return Product(**updated)
 
 @api_router.delete("/products/{product_id}")
@@ -437,23 +496,22 @@ async def delete_product(product_id: str, current_user: User = Depends(get_curre
     result = await db.products.delete_one({"product_id": product_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Product not found")
+    reference_cache.invalidate("products")
     return {"message": "Product deleted"}
 
 # Wash Zone routes
-@api_router.get("/zones", response_model=List[WashZone])
-async def get_zones(current_user: User = Depends(get_current_user)):
-    zones = await db.zones.find({}, {"_id": 0}).to_list(1000)
-    for z in zones:
-        if isinstance(z.get('created_at'), str):
-            z['created_at'] = datetime.fromisoformat(z['created_at'])
-    return zones
+@api_router.get("/zones", response_model=Union[List[WashZone], Page[WashZone]])
+async def get_zones(request: Request, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    if limit is None and cursor is None:
+        return await reference_response(request, "zones")
+    return list_response(await list_or_page(db.zones, {}, "name", "zone_id", 1, limit, cursor, model_projection(WashZone)), WashZone)
 
 @api_router.post("/zones", response_model=WashZone)
 async def create_zone(zone_data: WashZoneCreate, current_user: User = Depends(get_current_user)):
     zone = WashZone(**zone_data.model_dump())
     doc = zone.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.zones.insert_one(doc)
+    reference_cache.invalidate("zones")
     return zone
 
 @api_router.put("/zones/{zone_id}", response_model=WashZone)
@@ -464,10 +522,9 @@ async def update_zone(zone_id: str, zone_data: WashZoneCreate, current_user: Use
     
     update_data = zone_data.model_dump()
     await db.zones.update_one({"zone_id": zone_id}, {"$set": update_data})
+    reference_cache.invalidate("zones")
     
     updated = await db.zones.find_one({"zone_id": zone_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return WashZone(**updated)
 
 @api_router.delete("/zones/{zone_id}")
@@ -477,6 +534,7 @@ async def delete_zone(zone_id: str, current_user: User = Depends(get_current_use
     result = await db.zones.delete_one({"zone_id": zone_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Zone not found")
+    reference_cache.invalidate("zones")
     return {"message": "Zone deleted"}
 
 # Zone availability check
@@ -496,117 +554,134 @@ async def get_available_zones(
         raise HTTPException(status_code=400, detail=f"Invalid appointment_datetime format: {str(e)}")
     
     # Get all active zones
-    all_zones = await db.zones.find({"is_active": True}, {"_id": 0}).to_list(100)
+    zones = await reference_list("zones")
+    all_zones = [zone for zone in zones if zone.get('is_active')]
     
     # If no active zones exist, return empty list
     if not all_zones:
         return {"available_zones": [], "total_available": 0}
     
-    # Get all bookings that might conflict
-    all_bookings = await db.bookings.find({
-        "status": {"$ne": "Cancelled"}
-    }, {"_id": 0}).to_list(10000)
-    
-    available_zones = []
-    
-    for zone in all_zones:
-        zone_id = zone['zone_id']
-        is_available = True
-        
-        # Check if any booking in this zone overlaps with the requested time
-        for booking in all_bookings:
-            if booking.get('zone_id') != zone_id:
-                continue
-                
-            existing_start = booking.get('appointment_datetime')
-            if existing_start is None:
-                continue
-                
-            if isinstance(existing_start, str):
-                try:
-                    # Handle both 'Z' and regular ISO format
-                    dt_str = existing_start.replace('Z', '+00:00') if existing_start.endswith('Z') else existing_start
-                    existing_start = datetime.fromisoformat(dt_str)
-                except (ValueError, AttributeError) as e:
-                    logger.warning(f"Failed to parse booking datetime {existing_start}: {e}")
-                    continue
-            elif not isinstance(existing_start, datetime):
-                continue
-            
-            existing_duration = booking.get('duration_minutes', 60)
-            existing_end = existing_start + timedelta(minutes=existing_duration)
-            
-            # Check if time slots overlap
-            if (appointment_start < existing_end and appointment_end > existing_start):
-                is_available = False
-                break
-        
-        if is_available:
-            available_zones.append(zone)
+    await zone_index.ensure_loaded(db)
+    available_zones = [
+        zone for zone in all_zones
+        if zone_index.is_available(zone['zone_id'], appointment_start, appointment_end)
+    ]
     
     logger.info(f"Zone availability check: {len(available_zones)}/{len(all_zones)} zones available for {appointment_datetime}")
     return {"available_zones": available_zones, "total_available": len(available_zones)}
 
 # Booking routes
-@api_router.get("/bookings", response_model=List[Booking])
-async def get_bookings(
-    customer_search: Optional[str] = None,
-    appointment_date: Optional[str] = None,
-    status: Optional[str] = None,
-    sort_by: str = "booking_number",
-    sort_order: str = "desc",
-    page: int = 1,
-    page_size: int = 50,
-    current_user: User = Depends(get_current_user)
-):
+def check_booking_status(status: str):
+    if status not in BOOKING_STATUSES:
+        raise HTTPException(status_code=400, detail=f"Status must be one of: {', '.join(BOOKING_STATUSES)}")
+
+def check_slot_grid(start: datetime, duration_minutes: int):
+    """Reject appointments that do not start and end on the slot grid"""
+    if not on_grid(start, duration_minutes, BOOKING_SLOT_MINUTES):
+        raise HTTPException(
+            status_code=400,
+            detail=f"Appointments must start and end on a {BOOKING_SLOT_MINUTES}-minute boundary"
+        )
+
+async def reserve_zone(zone_id: str, booking_id: str, start: datetime, end: datetime):
+    """Reserve a zone for a booking window or reject it as a double booking"""
+    try:
+        await reserve_slots(db, zone_id, booking_id, start, end, BOOKING_SLOT_MINUTES)
+    except SlotConflict as e:
+        existing = await db.bookings.find_one({"booking_id": e.booking_id}, {"_id": 0}) if e.booking_id else None
+        if not existing:
+            raise HTTPException(status_code=400, detail="Zone is already booked for this time")
+        existing_start = to_local(existing['appointment_datetime'])
+        existing_end = existing_start + timedelta(minutes=existing.get('duration_minutes', 60))
+        raise HTTPException(
+            status_code=400, 
+            detail=f"Zone is already booked from {existing_start.strftime('%Y-%m-%d %H:%M')} to {existing_end.strftime('%H:%M')}"
+        )
+
+async def bookings_query(customer_search: Optional[str], appointment_date: Optional[str], status: Optional[str]):
+    """Filter shared by the bookings list and count; None when the customer search matches nobody
+
+    The customer search matches like the customer type-ahead (see customer_search.py):
+    search words shorter than 3 characters only match the start of a name word or phone number.
+    """
     query = {}
     
     # Customer search filter
     if customer_search:
-        customers = await db.customers.find({
-            "$or": [
-                {"name": {"$regex": customer_search, "$options": "i"}},
-                {"phone": {"$regex": customer_search, "$options": "i"}}
-            ]
-        }, {"_id": 0, "customer_id": 1}).to_list(100)
-        customer_ids = [c['customer_id'] for c in customers]
-        if customer_ids:
-            query["customer_id"] = {"$in": customer_ids}
-        else:
-            return []
+        customer_ids = await matching_customer_ids(db, customer_search)
+        if not customer_ids:
+            return None
+        query["customer_id"] = {"$in": customer_ids}
     
     # Appointment date filter
     if appointment_date:
-        date_obj = datetime.fromisoformat(appointment_date)
-        start_of_day = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = date_obj.replace(hour=23, minute=59, second=59, microsecond=999999)
-        query["appointment_datetime"] = {
-            "$gte": start_of_day.isoformat(),
-            "$lte": end_of_day.isoformat()
-        }
+        try:
+            query["appointment_day"] = parse_day(appointment_date)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid appointment_date")
     
     # Status filter
     if status and status != "all":
         query["status"] = status
     
+    return query
+
+@api_router.get("/bookings", response_model=Union[List[Booking], CountedPage[Booking], Page[Booking]])
+async def get_bookings(
+    customer_search: Optional[str] = None,
+    appointment_date: Optional[str] = None,
+    status: Optional[str] = None,
+    sort_by: str = "booking_number",
+    sort_order: str = "desc",
+    page: int = 1,
+    page_size: int = 50,
+    limit: Optional[int] = None,
+    cursor: Optional[str] = None,
+    with_total: bool = False,
+    estimate_total: bool = False,
+    current_user: User = Depends(get_current_user)
+):
+    """Bookings grid.
+
+    Page-numbered list (``page``/``page_size``), or keyset pages when ``limit``
+    or ``cursor`` is given. ``with_total`` returns ``{items, total}`` in one
+    query instead of a second call to /bookings/count; ``estimate_total`` caps
+    that count for very large result sets.
+    """
+    keyset = limit is not None or cursor is not None
+    with_total = with_total or estimate_total
+    
+    query = await bookings_query(customer_search, appointment_date, status)
+    if query is None:
+        if with_total:
+            return {"items": [], "total": 0, "next_cursor": None}
+        return {"items": [], "next_cursor": None} if keyset else []
+    
     # Sort configuration
     sort_field = "booking_number" if sort_by == "booking_number" else "appointment_datetime"
     sort_direction = -1 if sort_order == "desc" else 1
     
-    # Get total count for pagination
-    total = await db.bookings.count_documents(query)
+    if with_total:
+        try:
+            return list_response(await paginate_with_total(
+                db.bookings, query, sort_field, "booking_id", sort_direction,
+                limit=limit if keyset else page_size,
+                cursor=cursor,
+                skip=0 if keyset else (page - 1) * page_size,
+                estimate_cap=BOOKINGS_TOTAL_ESTIMATE_CAP if estimate_total else None,
+                projection=model_projection(Booking)
+            ), Booking)
+        except InvalidCursor as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    if keyset:
+        return list_response(await list_or_page(db.bookings, query, sort_field, "booking_id", sort_direction, limit, cursor, model_projection(Booking)), Booking)
     
     # Get paginated results
     skip = (page - 1) * page_size
-    bookings = await db.bookings.find(query, {"_id": 0}).sort(sort_field, sort_direction).skip(skip).limit(page_size).to_list(page_size)
+    bookings = await db.bookings.find(query, model_projection(Booking)).sort([(sort_field, sort_direction), ("booking_id", sort_direction)]).skip(skip).limit(page_size).to_list(page_size)
     
-    for b in bookings:
-        if isinstance(b.get('created_at'), str):
-            b['created_at'] = datetime.fromisoformat(b['created_at'])
-        if isinstance(b.get('appointment_datetime'), str):
-            b['appointment_datetime'] = datetime.fromisoformat(b['appointment_datetime'])
-    
-    return bookings
+    return list_response(bookings, Booking)
 
 @api_router.get("/bookings/count")
 async def get_bookings_count(
@@ -615,144 +690,206 @@ async def get_bookings_count(
     status: Optional[str] = None,
     current_user: User = Depends(get_current_user)
 ):
-    query = {}
-    
-    if customer_search:
-        customers = await db.customers.find({
-            "$or": [
-                {"name": {"$regex": customer_search, "$options": "i"}},
-                {"phone": {"$regex": customer_search, "$options": "i"}}
-            ]
-        }, {"_id": 0, "customer_id": 1}).to_list(100)
-        customer_ids = [c['customer_id'] for c in customers]
-        if customer_ids:
-            query["customer_id"] = {"$in": customer_ids}
-        else:
-            return {"total": 0}
-    
-    if appointment_date:
-        date_obj = datetime.fromisoformat(appointment_date)
-        start_of_day = date_obj.replace(hour=0, minute=0, second=0, microsecond=0)
-        end_of_day = date_obj.replace(hour=23, minute=59, second=59, microsecond=999999)
-        query["appointment_datetime"] = {
-            "$gte": start_of_day.isoformat(),
-            "$lte": end_of_day.isoformat()
-        }
-    
-    if status and status != "all":
-        query["status"] = status
+    query = await bookings_query(customer_search, appointment_date, status)
+    if query is None:
+        return {"total": 0}
     
     total = await db.bookings.count_documents(query)
     return {"total": total}
 
 @api_router.post("/bookings", response_model=Booking)
 async def create_booking(booking_data: BookingCreate, current_user: User = Depends(get_current_user)):
-    # Get next booking number
-    last_booking = await db.bookings.find_one({}, {"_id": 0}, sort=[("booking_number", -1)])
-    next_booking_number = (last_booking.get('booking_number', 0) + 1) if last_booking else 1
-    
-    # Check for double booking
-    appointment_start = booking_data.appointment_datetime
-    appointment_end = appointment_start + timedelta(minutes=booking_data.duration_minutes)
-    
-    # Find overlapping bookings in the same zone
-    all_bookings = await db.bookings.find({
-        "zone_id": booking_data.zone_id,
-        "status": {"$ne": "Cancelled"}
-    }, {"_id": 0}).to_list(1000)
-    
-    for existing_booking in all_bookings:
-        existing_start = existing_booking['appointment_datetime']
-        if isinstance(existing_start, str):
-            existing_start = datetime.fromisoformat(existing_start)
-        
-        existing_duration = existing_booking.get('duration_minutes', 60)
-        existing_end = existing_start + timedelta(minutes=existing_duration)
-        
-        # Check if time slots overlap
-        if (appointment_start < existing_end and appointment_end > existing_start):
-            raise HTTPException(
-                status_code=400, 
-                detail=f"Zone is already booked from {existing_start.strftime('%Y-%m-%d %H:%M')} to {existing_end.strftime('%H:%M')}"
-            )
+    booking = Booking(**booking_data.model_dump(), created_by=current_user.user_id)
+    check_slot_grid(booking.appointment_datetime, booking.duration_minutes)
+    
+    # Claim the zone's slots atomically before the booking becomes visible
+    appointment_end = booking.appointment_datetime + timedelta(minutes=booking.duration_minutes)
+    await reserve_zone(booking.zone_id, booking.booking_id, booking.appointment_datetime, appointment_end)
+    
+    # Number the booking only once it is known to fit, so conflicts leave no gaps
+    booking.booking_number = await booking_numbers.next(db)
     
-    booking = Booking(**booking_data.model_dump(), created_by=current_user.user_id, booking_number=next_booking_number)
     doc = booking.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
-    doc['appointment_datetime'] = doc['appointment_datetime'].isoformat()
-    await db.bookings.insert_one(doc)
+    doc.update(appointment_fields(doc['appointment_datetime']))
+    try:
+        await db.bookings.insert_one(doc)
+    except Exception:
+        await release_slots(db, booking.booking_id)
+        raise
+    zone_index.add(doc)
+    await record_booking(db, doc)
+    booking = Booking(**doc)
     
     customer = await db.customers.find_one({"customer_id": booking.customer_id}, {"_id": 0})
-    if customer and customer.get('email') and resend.api_key:
+    if customer and customer.get('email') and email_outbox.enabled:
         try:
-            html_content = f"""
-            <h2>Booking Confirmation</h2>
-            <p>Dear {customer.get('name', 'Customer')},</p>
-            <p>Your booking has been confirmed.</p>
-            <p><strong>Booking Number:</strong> {booking.booking_number}</p>
-            <p><strong>Appointment:</strong> {booking.appointment_datetime.strftime('%Y-%m-%d %H:%M')}</p>
-            <p><strong>Duration:</strong> {booking.duration_minutes} minutes</p>
-            <p>Thank you for choosing our service!</p>
-            """
-            await asyncio.to_thread(
-                resend.Emails.send,
-                {
-                    "from": SENDER_EMAIL,
-                    "to": [customer['email']],
-                    "subject": "Booking Confirmation",
-                    "html": html_content
-                }
+            subject, html_content = emails.render_booking_confirmation(doc, customer)
+            await email_outbox.enqueue(
+                db, [customer['email']], subject, html_content,
+                kind="booking_confirmation", ref=booking.booking_id
             )
         except Exception as e:
-            logger.error(f"Failed to send email: {e}")
+            logger.error(f"Failed to queue email: {e}")
     
     return booking
 
+@api_router.post("/bookings/bulk", response_model=BulkBookingResponse)
+async def create_bookings_bulk(bulk_data: BulkBookingCreate, current_user: User = Depends(get_current_user)):
+    """Create a series of bookings in one zone; each occurrence is created or reported as a conflict"""
+    if (bulk_data.appointments is None) == (bulk_data.recurrence is None):
+        raise HTTPException(status_code=400, detail="Provide either appointments or recurrence")
+    if bulk_data.recurrence:
+        # Step in shop-local time so a weekly booking keeps its wall-clock time across DST changes
+        first = to_local(bulk_data.recurrence.start)
+        appointments = [first + timedelta(days=bulk_data.recurrence.every_days * i) for i in range(bulk_data.recurrence.count)]
+    else:
+        appointments = bulk_data.appointments
+    if not appointments or len(appointments) > BULK_BOOKING_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {BULK_BOOKING_LIMIT} appointments per request")
+    
+    fields = bulk_data.model_dump(exclude={"appointments", "recurrence"})
+    bookings = [Booking(**fields, appointment_datetime=appointment, created_by=current_user.user_id) for appointment in appointments]
+    for b in bookings:
+        check_slot_grid(b.appointment_datetime, b.duration_minutes)
+    windows = {
+        b.booking_id: (b.appointment_datetime, b.appointment_datetime + timedelta(minutes=b.duration_minutes))
+        for b in bookings
+    }
+    conflicts = await reserve_many(db, bulk_data.zone_id, windows, BOOKING_SLOT_MINUTES)
+    
+    # Number the bookings that fit in appointment order, from one block of the sequence
+    accepted = sorted((b for b in bookings if b.booking_id not in conflicts), key=lambda b: to_utc(b.appointment_datetime))
+    docs = []
+    if accepted:
+        for booking, number in zip(accepted, await booking_numbers.allocate(db, len(accepted))):
+            booking.booking_number = number
+            doc = booking.model_dump()
+            doc.update(appointment_fields(doc['appointment_datetime']))
+            docs.append(doc)
+        try:
+            await db.bookings.insert_many(docs)
+        except Exception:
+            await db.booking_slots.delete_many({"booking_id": {"$in": [doc['booking_id'] for doc in docs]}})
+            raise
+        for doc in docs:
+            zone_index.add(doc)
+        await record_bookings(db, docs)
+    
+    created = {doc['booking_id']: Booking(**doc) for doc in docs}
+    results = [
+        BulkBookingResult(appointment_datetime=created[b.booking_id].appointment_datetime, status="created", booking=created[b.booking_id])
+        if b.booking_id in created else
+        BulkBookingResult(appointment_datetime=to_utc(b.appointment_datetime), status="conflict", conflict_with=conflicts[b.booking_id])
+        for b in bookings
+    ]
+    
+    # One confirmation for the whole series
+    customer = await db.customers.find_one({"customer_id": bulk_data.customer_id}, {"_id": 0})
+    if docs and customer and customer.get('email') and email_outbox.enabled:
+        try:
+            subject, html_content = emails.render_booking_series_confirmation(docs, customer)
+            await email_outbox.enqueue(
+                db, [customer['email']], subject, html_content,
+                kind="booking_confirmation", ref=docs[0]['booking_id']
+            )
+        except Exception as e:
+            logger.error(f"Failed to queue email: {e}")
+    
+    return BulkBookingResponse(created=len(docs), conflicts=len(bookings) - len(docs), results=results)
+
+@api_router.post("/bookings/status")
+async def update_booking_statuses(update_data: BulkStatusUpdate, current_user: User = Depends(get_current_user)):
+    """Set the status of many bookings with one bulk write; reports the outcome per booking"""
+    check_booking_status(update_data.status)
+    booking_ids = list(dict.fromkeys(update_data.booking_ids))
+    if not booking_ids or len(booking_ids) > BULK_BOOKING_LIMIT:
+        raise HTTPException(status_code=400, detail=f"Between 1 and {BULK_BOOKING_LIMIT} bookings per request")
+    existing = {
+        b['booking_id']: b
+        for b in await db.bookings.find({"booking_id": {"$in": booking_ids}}, {"_id": 0}).to_list(None)
+    }
+    
+    results = []
+    changes = []
+    for booking_id in booking_ids:
+        before = existing.get(booking_id)
+        if before is None:
+            results.append({"booking_id": booking_id, "result": "not_found"})
+        elif before.get('status') == update_data.status:
+            results.append({"booking_id": booking_id, "result": "unchanged"})
+        elif before.get('status') == "Cancelled":
+            # Reactivating has to re-claim the zone, which may conflict; that stays a PUT per booking
+            results.append({"booking_id": booking_id, "result": "rejected", "detail": "Cancelled bookings must be reactivated one at a time"})
+        else:
+            results.append({"booking_id": booking_id, "result": "updated"})
+            changes.append((before, {**before, "status": update_data.status}))
+    
+    if changes:
+        # Each row only changes if its status is still the one read above
+        changed_at = datetime.now(timezone.utc)
+        result = await db.bookings.bulk_write([
+            UpdateOne(
+                {"booking_id": before['booking_id'], "status": before['status']},
+                {"$set": {"status": update_data.status, "status_changed_at": changed_at}}
+            )
+            for before, _ in changes
+        ], ordered=False)
+        if result.matched_count < len(changes):
+            applied = {
+                b['booking_id']
+                async for b in db.bookings.find(
+                    {"booking_id": {"$in": [before['booking_id'] for before, _ in changes]}, "status_changed_at": changed_at},
+                    {"_id": 0, "booking_id": 1}
+                )
+            }
+            changes = [change for change in changes if change[0]['booking_id'] in applied]
+            for row in results:
+                if row['result'] == "updated" and row['booking_id'] not in applied:
+                    row.update(result="conflict", detail="Status was changed by another request; reload and retry")
+        changed_ids = [before['booking_id'] for before, _ in changes]
+        if update_data.status == "Cancelled" and changed_ids:
+            await db.booking_slots.delete_many({"booking_id": {"$in": changed_ids}})
+        for _, after in changes:
+            zone_index.add(after)
+        await record_booking_changes(db, changes)
+    
+    return {"updated": len(changes), "results": results}
+
 @api_router.put("/bookings/{booking_id}", response_model=Booking)
 async def update_booking(booking_id: str, update_data: BookingUpdate, current_user: User = Depends(get_current_user)):
+    if update_data.status:
+        check_booking_status(update_data.status)
     result = await db.bookings.find_one({"booking_id": booking_id}, {"_id": 0})
     if not result:
         raise HTTPException(status_code=404, detail="Booking not found")
     
     update_dict = {}
     
-    # Check for double booking if appointment_datetime or duration is being updated
-    if update_data.appointment_datetime or update_data.duration_minutes:
-        zone_id = result['zone_id']
-        
-        appointment_start = update_data.appointment_datetime if update_data.appointment_datetime else datetime.fromisoformat(result['appointment_datetime']) if isinstance(result['appointment_datetime'], str) else result['appointment_datetime']
+    # Re-claim the zone if the booking moves, changes length or is reactivated
+    new_status = update_data.status or result.get('status')
+    reactivated = result.get('status') == "Cancelled" and new_status != "Cancelled"
+    if update_data.appointment_datetime or update_data.duration_minutes or reactivated:
+        appointment_start = to_utc(update_data.appointment_datetime or result['appointment_datetime'])
         duration = update_data.duration_minutes if update_data.duration_minutes else result.get('duration_minutes', 60)
         appointment_end = appointment_start + timedelta(minutes=duration)
+        if update_data.appointment_datetime or update_data.duration_minutes:
+            check_slot_grid(appointment_start, duration)
         
-        # Find overlapping bookings in the same zone
-        all_bookings = await db.bookings.find({
-            "zone_id": zone_id,
-            "booking_id": {"$ne": booking_id},
-            "status": {"$ne": "Cancelled"}
-        }, {"_id": 0}).to_list(1000)
-        
-        for existing_booking in all_bookings:
-            existing_start = existing_booking['appointment_datetime']
-            if isinstance(existing_start, str):
-                existing_start = datetime.fromisoformat(existing_start)
-            
-            existing_duration = existing_booking.get('duration_minutes', 60)
-            existing_end = existing_start + timedelta(minutes=existing_duration)
-            
-            # Check if time slots overlap
-            if (appointment_start < existing_end and appointment_end > existing_start):
-                raise HTTPException(
-                    status_code=400, 
-                    detail=f"Zone is already booked from {existing_start.strftime('%Y-%m-%d %H:%M')} to {existing_end.strftime('%H:%M')}"
-                )
+        if new_status != "Cancelled":
+            await reserve_zone(result['zone_id'], booking_id, appointment_start, appointment_end)
         
         if update_data.appointment_datetime:
-            update_dict['appointment_datetime'] = appointment_start.isoformat()
+            update_dict.update(appointment_fields(appointment_start))
         if update_data.duration_minutes:
             update_dict['duration_minutes'] = duration
     
+    if new_status == "Cancelled":
+        await release_slots(db, booking_id)
+    
     if update_data.status:
         update_dict['status'] = update_data.status
+        if update_data.status != result.get('status'):
+            update_dict['status_changed_at'] = datetime.now(timezone.utc)
     if update_data.customer_id:
         update_dict['customer_id'] = update_data.customer_id
     if update_data.vehicle_pickup_by_us is not None:
@@ -766,19 +903,13 @@ async def update_booking(booking_id: str, update_data: BookingUpdate, current_us
         await db.bookings.update_one({"booking_id": booking_id}, {"$set": update_dict})
     
     updated = await db.bookings.find_one({"booking_id": booking_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    if isinstance(updated['appointment_datetime'], str):
-        updated['appointment_datetime'] = datetime.fromisoformat(updated['appointment_datetime'])
+    zone_index.add(updated)
+    await record_booking_change(db, result, updated)
     return Booking(**updated)
 
 # Invoice routes
 @api_router.post("/invoices", response_model=Invoice)
 async def create_invoice(invoice_data: InvoiceCreate, current_user: User = Depends(get_current_user)):
-    booking = await db.bookings.find_one({"booking_id": invoice_data.booking_id}, {"_id": 0})
-    if not booking:
-        raise HTTPException(status_code=404, detail="Booking not found")
-    
     # Only Admin and Manager can apply discounts
     if invoice_data.discount_percentage > 0 and current_user.role not in ["Admin", "Manager"]:
         raise HTTPException(status_code=403, detail="Only Admin and Manager can apply discounts")
@@ -786,52 +917,43 @@ async def create_invoice(invoice_data: InvoiceCreate, current_user: User = Depen
     # Determine which product_ids to use
     # If product_ids provided and user is Admin/Manager, use them and update booking
     # Otherwise, use booking's existing product_ids
-    product_ids_to_use = booking['product_ids']
-    if invoice_data.product_ids is not None:
+    if invoice_data.product_ids is not None and current_user.role not in ["Admin", "Manager"]:
         # Only Admin and Manager can modify services
-        if current_user.role not in ["Admin", "Manager"]:
-            raise HTTPException(status_code=403, detail="Only Admin and Manager can modify services in invoice")
-        product_ids_to_use = invoice_data.product_ids
-        # Update booking with new product_ids
-        await db.bookings.update_one(
-            {"booking_id": invoice_data.booking_id},
-            {"$set": {"product_ids": product_ids_to_use}}
-        )
-    
-    # Get next invoice number
-    last_invoice = await db.invoices.find_one({}, {"_id": 0}, sort=[("invoice_number", -1)])
-    next_invoice_number = (last_invoice.get('invoice_number', 0) + 1) if last_invoice else 1
+        raise HTTPException(status_code=403, detail="Only Admin and Manager can modify services in invoice")
     
-    products = await db.products.find({"product_id": {"$in": product_ids_to_use}}, {"_id": 0}).to_list(100)
-    taxes_map = {}
-    all_tax_ids = []
-    for p in products:
-        all_tax_ids.extend(p.get('tax_ids', []))
+    def find_products(product_ids):
+        return db.products.find({"product_id": {"$in": product_ids}}, {"_id": 0}).to_list(100)
     
-    if all_tax_ids:
-        taxes = await db.taxes.find({"tax_id": {"$in": list(set(all_tax_ids))}}, {"_id": 0}).to_list(100)
-        taxes_map = {t['tax_id']: t for t in taxes}
+    # Independent reads go out together; the product lookup only waits for the
+    # booking when the booking decides the products
+    if invoice_data.product_ids is not None:
+        booking, products = await asyncio.gather(
+            db.bookings.find_one({"booking_id": invoice_data.booking_id}, {"_id": 0}),
+            find_products(invoice_data.product_ids)
+        )
+    else:
+        booking = await db.bookings.find_one({"booking_id": invoice_data.booking_id}, {"_id": 0})
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
     
-    items = []
-    subtotal = 0.0
+    # Number the invoice only once the booking is known to exist, so a 404 leaves no gap
+    if invoice_data.product_ids is not None:
+        _, next_invoice_number = await asyncio.gather(
+            db.bookings.update_one(
+                {"booking_id": invoice_data.booking_id},
+                {"$set": {"product_ids": invoice_data.product_ids}}
+            ),
+            invoice_numbers.next(db)
+        )
+    else:
+        products, next_invoice_number = await asyncio.gather(
+            find_products(booking['product_ids']),
+            invoice_numbers.next(db)
+        )
     
-    for product in products:
-        item_price = product['sell_price']
-        tax_amount = 0.0
-        
-        for tax_id in product.get('tax_ids', []):
-            if tax_id in taxes_map:
-                tax_amount += (item_price * taxes_map[tax_id]['percentage'] / 100)
-        
-        items.append({
-            "product_name": product['name'],
-            "price": item_price,
-            "tax_amount": tax_amount,
-            "total": item_price + tax_amount
-        })
-        subtotal += item_price
-    
-    total_tax = sum(item['tax_amount'] for item in items)
+    if await fill_tax_rates(db, products):
+        reference_cache.invalidate("products")
+    items, subtotal, total_tax = price_items(products)
     discount_amount = (subtotal + total_tax) * (invoice_data.discount_percentage / 100)
     total = subtotal + total_tax - discount_amount
     
@@ -851,18 +973,106 @@ async def create_invoice(invoice_data: InvoiceCreate, current_user: User = Depen
     )
     
     doc = invoice.model_dump()
-    doc['created_at'] = doc['created_at'].isoformat()
     await db.invoices.insert_one(doc)
+    await asyncio.gather(bump_version(db, "invoices"), record_invoice(db, doc))
     
     return invoice
 
-@api_router.get("/invoices", response_model=List[Invoice])
-async def get_invoices(current_user: User = Depends(get_current_user)):
-    invoices = await db.invoices.find({}, {"_id": 0}).sort("invoice_number", -1).to_list(1000)
-    for inv in invoices:
-        if isinstance(inv.get('created_at'), str):
-            inv['created_at'] = datetime.fromisoformat(inv['created_at'])
-    return invoices
+@api_router.post("/invoices/batch")
+async def create_invoices_batch(batch_data: BatchInvoiceCreate, current_user: User = Depends(get_current_user)):
+    """Invoice every booking in an appointment date range that has the given status and no invoice yet"""
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    try:
+        condition = date_range(batch_data.date_from, batch_data.date_to or batch_data.date_from)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Bookings invoiced by an earlier batch carry invoice_id; single invoices are looked up
+    query = {"appointment_datetime": condition, "status": batch_data.status}
+    bookings, batch_invoiced = await asyncio.gather(
+        db.bookings.find({**query, "invoice_id": None}, {"_id": 0}).sort(
+            [("appointment_datetime", 1), ("booking_id", 1)]
+        ).limit(BATCH_INVOICE_LIMIT + 1).to_list(BATCH_INVOICE_LIMIT + 1),
+        db.bookings.count_documents({**query, "invoice_id": {"$ne": None}})
+    )
+    if len(bookings) > BATCH_INVOICE_LIMIT:
+        raise HTTPException(status_code=400, detail=f"More than {BATCH_INVOICE_LIMIT} bookings to invoice; narrow the date range")
+    invoiced = {
+        i['booking_id']
+        for i in await db.invoices.find({"booking_id": {"$in": [b['booking_id'] for b in bookings]}}, {"_id": 0, "booking_id": 1}).to_list(None)
+    }
+    pending = [b for b in bookings if b['booking_id'] not in invoiced]
+    
+    # Claim each booking for its invoice first, so an overlapping run cannot invoice it again
+    claims = {b['booking_id']: str(uuid.uuid4()) for b in pending}
+    if claims:
+        await db.bookings.bulk_write([
+            UpdateOne({"booking_id": booking_id, "invoice_id": None}, {"$set": {"invoice_id": invoice_id}})
+            for booking_id, invoice_id in claims.items()
+        ], ordered=False)
+        claimed = {
+            b['booking_id']
+            async for b in db.bookings.find({"invoice_id": {"$in": list(claims.values())}}, {"_id": 0, "booking_id": 1})
+        }
+        already_invoiced = batch_invoiced + len(invoiced) + len(pending) - len(claimed)
+        pending = [b for b in pending if b['booking_id'] in claimed]
+    else:
+        already_invoiced = batch_invoiced + len(invoiced)
+    if not pending:
+        return {"invoiced": 0, "already_invoiced": already_invoiced, "invoices": []}
+    
+    try:
+        # Every product (with its stored tax rate) once, and one block of invoice numbers
+        product_ids = list({product_id for b in pending for product_id in b.get('product_ids', [])})
+        products, numbers = await asyncio.gather(
+            db.products.find({"product_id": {"$in": product_ids}}, {"_id": 0}).to_list(None),
+            invoice_numbers.allocate(db, len(pending))
+        )
+        if await fill_tax_rates(db, products):
+            reference_cache.invalidate("products")
+        products_by_id = {p['product_id']: p for p in products}
+        
+        docs = []
+        for booking, number in zip(pending, numbers):
+            # Each product once, as a single invoice's $in lookup would return it
+            items, subtotal, total_tax = price_items([products_by_id[p] for p in dict.fromkeys(booking.get('product_ids', [])) if p in products_by_id])
+            docs.append(Invoice(
+                invoice_id=claims[booking['booking_id']],
+                invoice_number=number,
+                invoice_prefix=batch_data.invoice_prefix,
+                booking_id=booking['booking_id'],
+                customer_id=booking['customer_id'],
+                items=items,
+                subtotal=subtotal,
+                tax_amount=total_tax,
+                total=subtotal + total_tax,
+                created_by=current_user.user_id
+            ).model_dump())
+        await db.invoices.insert_many(docs)
+        await bump_version(db, "invoices")
+    except Exception:
+        # Give the bookings back so a later run can invoice them
+        await db.bookings.update_many(
+            {"invoice_id": {"$in": [claims[b['booking_id']] for b in pending]}}, {"$unset": {"invoice_id": ""}}
+        )
+        raise
+    await record_invoices(db, docs)
+    
+    return {
+        "invoiced": len(docs),
+        "already_invoiced": already_invoiced,
+        "invoices": [
+            {key: doc[key] for key in ("invoice_id", "invoice_number", "invoice_prefix", "booking_id", "total")}
+            for doc in docs
+        ]
+    }
+
+@api_router.get("/invoices", response_model=Union[List[Invoice], Page[Invoice]])
+async def get_invoices(request: Request, response: Response, limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
+    return await versioned_list(request, response, "invoices", Invoice, lambda: list_or_page(
+        db.invoices, {}, "invoice_number", "invoice_id", -1, limit, cursor, model_projection(Invoice)
+    ))
 
 @api_router.get("/invoices/latest-prefix")
 async def get_latest_invoice_prefix(current_user: User = Depends(get_current_user)):
@@ -874,302 +1084,129 @@ async def get_invoice(invoice_id: str, current_user: User = Depends(get_current_
     invoice = await db.invoices.find_one({"invoice_id": invoice_id}, {"_id": 0})
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
-    if isinstance(invoice['created_at'], str):
-        invoice['created_at'] = datetime.fromisoformat(invoice['created_at'])
     return Invoice(**invoice)
 
+async def render_invoice_email(invoice):
+    """Subject and HTML of an invoice email, rendered once per invoice and settings version"""
+    key = (invoice['customer_id'], invoice['invoice_id'], reference_cache.version("settings"))
+    
+    async def render():
+        customer, settings = await asyncio.gather(
+            db.customers.find_one({"customer_id": invoice['customer_id']}, {"_id": 0, "name": 1, "phone": 1}),
+            load_settings()
+        )
+        return emails.render_invoice(invoice, customer, settings.get('currency', 'USD'))
+    return await invoice_email_cache.get_or_compute(key, render)
+
+@api_router.get("/invoices/{invoice_id}/email-preview", response_class=HTMLResponse)
+async def preview_invoice_email(invoice_id: str, current_user: User = Depends(get_current_user)):
+    invoice = await db.invoices.find_one({"invoice_id": invoice_id}, {"_id": 0})
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    _, html_content = await render_invoice_email(invoice)
+    return HTMLResponse(html_content)
+
+async def invoice_pdf_jobs(invoices):
+    """(invoice, customer, currency) arguments for rendering each of ``invoices``"""
+    customer_ids = list({invoice['customer_id'] for invoice in invoices})
+    customers, settings = await asyncio.gather(
+        db.customers.find({"customer_id": {"$in": customer_ids}}, {"_id": 0, "customer_id": 1, "name": 1, "phone": 1}).to_list(None),
+        load_settings()
+    )
+    by_id = {customer['customer_id']: customer for customer in customers}
+    currency = settings.get('currency', 'USD')
+    return [(invoice, by_id.get(invoice['customer_id']), currency) for invoice in invoices]
+
+async def render_invoice_pdf(invoice):
+    if not invoice_pdf.available():
+        raise HTTPException(status_code=501, detail="Invoice PDFs require reportlab on the server")
+    [job] = await invoice_pdf_jobs([invoice])
+    try:
+        return await invoice_pdfs.get(*job)
+    except PdfPoolBusy:
+        raise HTTPException(status_code=503, detail="Server busy, please retry", headers={"Retry-After": "1"})
+
+@api_router.get("/invoices/{invoice_id}/pdf")
+async def get_invoice_pdf(invoice_id: str, current_user: User = Depends(get_current_user)):
+    invoice = await db.invoices.find_one({"invoice_id": invoice_id}, {"_id": 0})
+    if not invoice:
+        raise HTTPException(status_code=404, detail="Invoice not found")
+    content, cached = await render_invoice_pdf(invoice)
+    filename = f"invoice_{invoice.get('invoice_prefix', '')}{invoice['invoice_number']}.pdf"
+    return Response(
+        content,
+        media_type="application/pdf",
+        headers={"Content-Disposition": f'inline; filename="{filename}"', "X-Cache": "HIT" if cached else "MISS"}
+    )
+
+@api_router.post("/invoices/pdf/prerender")
+async def prerender_invoice_pdfs(date: str, current_user: User = Depends(get_current_user)):
+    """Render the PDFs of every invoice created on a shop-local day (YYYY-MM-DD) that are not cached yet"""
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not invoice_pdf.available():
+        raise HTTPException(status_code=501, detail="Invoice PDFs require reportlab on the server")
+    try:
+        condition = date_range(date, date)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    invoices = await db.invoices.find({"created_at": condition}, {"_id": 0}).to_list(None)
+    rendered, cached = await invoice_pdfs.prerender(await invoice_pdf_jobs(invoices))
+    return {"date": date, "invoices": len(invoices), "rendered": rendered, "cached": cached}
+
 class EmailInvoiceRequest(BaseModel):
     invoice_id: str
     recipient_email: EmailStr
+    attach_pdf: bool = False
 
 @api_router.post("/invoices/email")
 async def email_invoice(request: EmailInvoiceRequest, current_user: User = Depends(get_current_user)):
-    if not resend.api_key:
+    if not email_outbox.enabled:
         raise HTTPException(status_code=500, detail="Email service not configured")
     
     invoice = await db.invoices.find_one({"invoice_id": request.invoice_id}, {"_id": 0})
     if not invoice:
         raise HTTPException(status_code=404, detail="Invoice not found")
     
-    customer = await db.customers.find_one({"customer_id": invoice['customer_id']}, {"_id": 0})
-    
-    # Get currency settings
-    settings = await db.settings.find_one({"settings_id": "default"}, {"_id": 0})
-    currency = settings.get('currency', 'USD') if settings else 'USD'
-    
-    # Currency symbol mapping
-    currency_symbols = {
-        'USD': '$',
-        'EUR': '€',
-        'GBP': '£',
-        'INR': '₹',
-        'AUD': 'A$',
-        'CAD': 'C$',
-        'JPY': '¥',
-        'CNY': '¥'
+    subject, html_content = await render_invoice_email(invoice)
+    attachments = None
+    if request.attach_pdf:
+        content, _ = await render_invoice_pdf(invoice)
+        attachments = [{
+            "filename": f"invoice_{invoice.get('invoice_prefix', '')}{invoice['invoice_number']}.pdf",
+            "content": base64.b64encode(content).decode()
+        }]
+    message = await email_outbox.enqueue(
+        db, [request.recipient_email], subject, html_content,
+        kind="invoice", ref=invoice['invoice_id'], attachments=attachments
+    )
+    return {
+        "status": "queued",
+        "message": f"Invoice queued for {request.recipient_email}",
+        "message_id": message['message_id']
     }
-    currency_symbol = currency_symbols.get(currency, '$')
-    
-    # Format currency helper
-    def format_currency(amount):
-        if currency == 'INR':
-            # Indian Rupee formatting with commas
-            return f"₹{amount:,.2f}"
-        else:
-            return f"{currency_symbol}{amount:,.2f}"
-    
-    full_invoice_number = f"{invoice.get('invoice_prefix', '')}{invoice['invoice_number']}"
-    invoice_date = datetime.fromisoformat(invoice['created_at']) if isinstance(invoice['created_at'], str) else invoice['created_at']
-    formatted_date = invoice_date.strftime('%B %d, %Y') if isinstance(invoice_date, datetime) else str(invoice_date)
-    
-    html_content = f"""
-    <!DOCTYPE html>
-    <html>
-    <head>
-        <meta charset="UTF-8">
-        <style>
-            body {{
-                font-family: Arial, sans-serif;
-                line-height: 1.6;
-                color: #333;
-                max-width: 600px;
-                margin: 0 auto;
-                padding: 20px;
-            }}
-            .header {{
-                text-align: center;
-                margin-bottom: 30px;
-                border-bottom: 3px solid #0066ff;
-                padding-bottom: 20px;
-            }}
-            .header h1 {{
-                color: #0066ff;
-                margin: 0;
-                font-size: 28px;
-            }}
-            .invoice-info {{
-                background-color: #f5f5f5;
-                padding: 15px;
-                border-radius: 5px;
-                margin-bottom: 20px;
-            }}
-            .invoice-info p {{
-                margin: 5px 0;
-            }}
-            table {{
-                width: 100%;
-                border-collapse: collapse;
-                margin: 20px 0;
-            }}
-            th {{
-                background-color: #0066ff;
-                color: white;
-                padding: 12px;
-                text-align: left;
-            }}
-            td {{
-                padding: 10px;
-                border-bottom: 1px solid #ddd;
-            }}
-            tr:nth-child(even) {{
-                background-color: #f9f9f9;
-            }}
-            .summary {{
-                margin-top: 20px;
-                text-align: right;
-            }}
-            .summary p {{
-                margin: 8px 0;
-            }}
-            .total {{
-                font-size: 18px;
-                font-weight: bold;
-                color: #0066ff;
-                border-top: 2px solid #0066ff;
-                padding-top: 10px;
-                margin-top: 10px;
-            }}
-            .footer {{
-                margin-top: 30px;
-                text-align: center;
-                color: #666;
-                font-size: 14px;
-            }}
-        </style>
-    </head>
-    <body>
-        <div class="header">
-            <h1>Car Logic</h1>
-            <h2 style="margin: 10px 0; color: #666;">Car Wash Manager</h2>
-        </div>
-        
-        <p>Dear {customer.get('name', 'Customer') if customer else 'Customer'},</p>
-        <p>Thank you for your business! Please find your invoice details below:</p>
-        
-        <div class="invoice-info">
-            <p><strong>Invoice Number:</strong> {full_invoice_number}</p>
-            <p><strong>Date:</strong> {formatted_date}</p>
-            {f'<p><strong>Customer Phone:</strong> {customer.get("phone", "N/A")}</p>' if customer and customer.get('phone') else ''}
-        </div>
-        
-        <h3>Invoice Items:</h3>
-        <table>
-            <thead>
-                <tr>
-                    <th>Service</th>
-                    <th style="text-align: right;">Price</th>
-                    <th style="text-align: right;">Tax</th>
-                    <th style="text-align: right;">Total</th>
-                </tr>
-            </thead>
-            <tbody>
-    """
-    
-    for item in invoice['items']:
-        html_content += f"""
-                <tr>
-                    <td>{item['product_name']}</td>
-                    <td style="text-align: right;">{format_currency(item['price'])}</td>
-                    <td style="text-align: right;">{format_currency(item['tax_amount'])}</td>
-                    <td style="text-align: right;"><strong>{format_currency(item['total'])}</strong></td>
-                </tr>
-        """
-    
-    html_content += f"""
-            </tbody>
-        </table>
-        
-        <div class="summary">
-            <p><strong>Subtotal:</strong> {format_currency(invoice['subtotal'])}</p>
-            <p><strong>Tax:</strong> {format_currency(invoice['tax_amount'])}</p>
-    """
-    
-    if invoice.get('discount_percentage', 0) > 0:
-        html_content += f"<p style='color: #28a745;'><strong>Discount ({invoice['discount_percentage']}%):</strong> -{format_currency(invoice['discount_amount'])}</p>"
-    
-    html_content += f"""
-            <p class="total">Total: {format_currency(invoice['total'])}</p>
-        </div>
-        
-        <div class="footer">
-            <p>Thank you for choosing Car Logic Car Wash!</p>
-            <p>If you have any questions, please contact us.</p>
-        </div>
-    </body>
-    </html>
-    """
-    
-    try:
-        email = await asyncio.to_thread(
-            resend.Emails.send,
-            {
-                "from": SENDER_EMAIL,
-                "to": [request.recipient_email],
-                "subject": f"Invoice {full_invoice_number} from Car Logic",
-                "html": html_content
-            }
-        )
-        return {
-            "status": "success",
-            "message": f"Invoice emailed to {request.recipient_email}",
-            "email_id": email.get("id")
-        }
-    except Exception as e:
-        logger.error(f"Failed to send invoice email: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
 @api_router.get("/analytics/dashboard")
 async def get_analytics(current_user: User = Depends(get_current_user)):
-    # Booking analytics
-    bookings = await db.bookings.find({}, {"_id": 0}).to_list(10000)
-    customers = await db.customers.find({}, {"_id": 0}).to_list(10000)
-    invoices = await db.invoices.find({}, {"_id": 0}).to_list(10000)
-    zones = await db.zones.find({}, {"_id": 0}).to_list(100)
-    
-    # Bookings by status
-    bookings_by_status = {}
-    for booking in bookings:
-        status = booking.get('status', 'Unknown')
-        bookings_by_status[status] = bookings_by_status.get(status, 0) + 1
-    
-    # Bookings by month (last 6 months)
-    from collections import defaultdict
-    bookings_by_month = defaultdict(int)
-    for booking in bookings:
-        apt_date = booking.get('appointment_datetime')
-        if isinstance(apt_date, str):
-            apt_date = datetime.fromisoformat(apt_date)
-        if apt_date:
-            month_key = apt_date.strftime('%Y-%m')
-            bookings_by_month[month_key] += 1
-    
-    # Revenue by month
-    revenue_by_month = defaultdict(float)
-    for invoice in invoices:
-        created = invoice.get('created_at')
-        if isinstance(created, str):
-            created = datetime.fromisoformat(created)
-        if created:
-            month_key = created.strftime('%Y-%m')
-            revenue_by_month[month_key] += invoice.get('total', 0)
-    
-    # Zone utilization
-    zone_utilization = {}
-    for zone in zones:
-        zone_bookings = [b for b in bookings if b.get('zone_id') == zone['zone_id']]
-        zone_utilization[zone['name']] = len(zone_bookings)
-    
-    # Customer growth
-    customers_by_month = defaultdict(int)
-    for customer in customers:
-        created = customer.get('created_at')
-        if isinstance(created, str):
-            created = datetime.fromisoformat(created)
-        if created:
-            month_key = created.strftime('%Y-%m')
-            customers_by_month[month_key] += 1
-    
-    return {
-        "bookings_by_status": bookings_by_status,
-        "bookings_by_month": dict(sorted(bookings_by_month.items())[-6:]),
-        "revenue_by_month": dict(sorted(revenue_by_month.items())[-6:]),
-        "zone_utilization": zone_utilization,
-        "customers_by_month": dict(sorted(customers_by_month.items())[-6:]),
-        "total_revenue": sum(inv.get('total', 0) for inv in invoices)
-    }
+    return await dashboard_from_rollups(db)
 
 @api_router.post("/send-email")
 async def send_email(request: EmailRequest, current_user: User = Depends(get_current_user)):
-    if not resend.api_key:
+    if not email_outbox.enabled:
         raise HTTPException(status_code=500, detail="Email service not configured")
     
-    params = {
-        "from": SENDER_EMAIL,
-        "to": [request.recipient_email],
-        "subject": request.subject,
-        "html": request.html_content
+    message = await email_outbox.enqueue(db, [request.recipient_email], request.subject, request.html_content)
+    return {
+        "status": "queued",
+        "message": f"Email queued for {request.recipient_email}",
+        "message_id": message['message_id']
     }
-    
-    try:
-        email = await asyncio.to_thread(resend.Emails.send, params)
-        return {
-            "status": "success",
-            "message": f"Email sent to {request.recipient_email}",
-            "email_id": email.get("id")
-        }
-    except Exception as e:
-        logger.error(f"Failed to send email: {str(e)}")
-        raise HTTPException(status_code=500, detail=f"Failed to send email: {str(e)}")
 
-@api_router.get("/users", response_model=List[User])
-async def get_users(current_user: User = Depends(get_current_user)):
+@api_router.get("/users", response_model=Union[List[User], Page[User]])
+async def get_users(limit: Optional[int] = None, cursor: Optional[str] = None, current_user: User = Depends(get_current_user)):
     if current_user.role != "Admin":
         raise HTTPException(status_code=403, detail="Not authorized")
-    users = await db.users.find({}, {"_id": 0, "password_hash": 0}).to_list(1000)
-    for u in users:
-        if isinstance(u.get('created_at'), str):
-            u['created_at'] = datetime.fromisoformat(u['created_at'])
-    return users
+    return list_response(await list_or_page(db.users, {}, "email", "user_id", 1, limit, cursor, model_projection(User)), User)
 
 @api_router.post("/users", response_model=User)
 async def create_user(user_data: UserCreate, current_user: User = Depends(get_current_user)):
@@ -1187,8 +1224,7 @@ async def create_user(user_data: UserCreate, current_user: User = Depends(get_cu
     )
     
     doc = user.model_dump()
-    doc['password_hash'] = hash_password(user_data.password)
-    doc['created_at'] = doc['created_at'].isoformat()
+    doc['password_hash'] = await hash_password(user_data.password)
     
     await db.users.insert_one(doc)
     return user
@@ -1210,46 +1246,129 @@ async def update_user(user_id: str, update_data: UserUpdate, current_user: User
         {"user_id": user_id}, 
         {"$set": {"name": update_data.name, "role": update_data.role}}
     )
+    principal_cache.invalidate_where(lambda user: user.user_id == user_id)
     
     updated = await db.users.find_one({"user_id": user_id}, {"_id": 0, "password_hash": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
     return User(**updated)
 
 @api_router.get("/dashboard/stats")
 async def get_dashboard_stats(current_user: User = Depends(get_current_user)):
-    total_customers = await db.customers.count_documents({})
-    total_bookings = await db.bookings.count_documents({})
-    pending_bookings = await db.bookings.count_documents({"status": "Pending"})
-    completed_bookings = await db.bookings.count_documents({"status": "Completed"})
-    total_zones = await db.zones.count_documents({})
-    active_zones = await db.zones.count_documents({"is_active": True})
-    
+    return await dashboard_stats_cache.get_or_compute("stats", lambda: dashboard_stats(db))
+
+@api_router.get("/export/{kind}")
+async def export_collection(
+    kind: str,
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream every booking, customer or invoice (optionally within a date range) as NDJSON"""
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if kind not in EXPORTS:
+        raise HTTPException(status_code=404, detail="Unknown export")
+    try:
+        condition = date_range(date_from, date_to)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    cursor = export_cursor(db, kind, condition, EXPORT_BATCH_SIZE)
+    filename = f"{kind}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.ndjson"
+    return StreamingResponse(
+        stream_ndjson(cursor, EXPORT_BATCH_SIZE),
+        media_type="application/x-ndjson",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/reports/{kind}")
+async def export_report(
+    kind: str,
+    format: str = "parquet",
+    date_from: Optional[str] = None,
+    date_to: Optional[str] = None,
+    columns: Optional[str] = None,
+    current_user: User = Depends(get_current_user)
+):
+    """Stream bookings or invoice lines as compressed Parquet or Arrow IPC for analysis"""
+    if current_user.role not in ["Admin", "Manager"]:
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if kind not in reports.REPORTS:
+        raise HTTPException(status_code=404, detail="Unknown report")
+    if format not in reports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"Format must be one of: {', '.join(reports.FORMATS)}")
+    if not reports.available():
+        raise HTTPException(status_code=501, detail="Columnar reports require pyarrow on the server")
+    selected = [c.strip() for c in columns.split(",") if c.strip()] if columns else None
+    try:
+        condition = date_range(date_from, date_to)
+        reports.report_schema(kind, selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    spec = reports.FORMATS[format]
+    filename = f"{kind}-{datetime.now(timezone.utc).strftime('%Y%m%d-%H%M%S')}.{spec['extension']}"
+    return StreamingResponse(
+        reports.stream_report(db, kind, format, condition, selected, REPORT_BATCH_ROWS),
+        media_type=spec["media_type"],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+@api_router.get("/admin/cache-stats")
+async def get_cache_stats(current_user: User = Depends(get_current_user)):
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
     return {
-        "total_customers": total_customers,
-        "total_bookings": total_bookings,
-        "pending_bookings": pending_bookings,
-        "completed_bookings": completed_bookings,
-        "total_zones": total_zones,
-        "active_zones": active_zones
+        "auth": principal_cache.stats(),
+        "dashboard_stats": dashboard_stats_cache.stats(),
+        "reference": reference_cache.stats(),
+        "invoice_emails": invoice_email_cache.stats()
     }
 
+@api_router.get("/admin/email-outbox")
+async def get_email_outbox(current_user: User = Depends(get_current_user)):
+    """Outbox message counts per status and the latest dead letters"""
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await email_outbox.stats(db)
+
+@api_router.post("/admin/email-outbox/{message_id}/retry")
+async def retry_email(message_id: str, current_user: User = Depends(get_current_user)):
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    if not await email_outbox.requeue(db, message_id):
+        raise HTTPException(status_code=404, detail="Dead letter not found")
+    return {"message": "Email requeued"}
+
+@api_router.get("/admin/indexes")
+async def get_index_report(current_user: User = Depends(get_current_user)):
+    """Missing, unused and undeclared indexes per collection (usage from $indexStats)"""
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return await index_report(db)
+
+@api_router.post("/admin/indexes/rebuild")
+async def rebuild_indexes(current_user: User = Depends(get_current_user)):
+    """Create missing indexes and rebuild those whose definition changed (startup only creates missing ones)"""
+    if current_user.role != "Admin":
+        raise HTTPException(status_code=403, detail="Not authorized")
+    return {"actions": await ensure_indexes(db, rebuild=True)}
+
 # Settings routes
+async def load_settings():
+    """Settings document, served from the reference cache"""
+    async def load():
+        settings = await db.settings.find_one({"settings_id": "default"}, {"_id": 0})
+        if not settings:
+            # Create default settings (upsert, so concurrent first loads cannot insert twice)
+            settings = Settings().model_dump()
+            await db.settings.update_one({"settings_id": "default"}, {"$setOnInsert": settings}, upsert=True)
+        return settings
+    return await reference_cache.get("settings", load)
+
 @api_router.get("/settings", response_model=Settings)
 async def get_settings():
     """Get application settings (public endpoint for currency display)"""
-    settings = await db.settings.find_one({"settings_id": "default"}, {"_id": 0})
-    if not settings:
-        # Create default settings
-        default_settings = Settings()
-        doc = default_settings.model_dump()
-        doc['updated_at'] = doc['updated_at'].isoformat()
-        await db.settings.insert_one(doc)
-        return default_settings
-    
-    if isinstance(settings.get('updated_at'), str):
-        settings['updated_at'] = datetime.fromisoformat(settings['updated_at'])
-    return Settings(**settings)
+    return Settings(**await load_settings())
 
 @api_router.put("/settings", response_model=Settings)
 async def update_settings(update_data: SettingsUpdate, current_user: User = Depends(get_current_user)):
@@ -1259,7 +1378,7 @@ async def update_settings(update_data: SettingsUpdate, current_user: User = Depe
     settings = await db.settings.find_one({"settings_id": "default"}, {"_id": 0})
     if not settings:
         settings = Settings().model_dump()
-        settings['updated_at'] = datetime.now(timezone.utc).isoformat()
+        settings['updated_at'] = datetime.now(timezone.utc)
         await db.settings.insert_one(settings)
     
     update_dict = {}
@@ -1267,13 +1386,12 @@ async def update_settings(update_data: SettingsUpdate, current_user: User = Depe
         update_dict['currency'] = update_data.currency
     if update_data.show_tax_bifurcation is not None:
         update_dict['show_tax_bifurcation'] = update_data.show_tax_bifurcation
-    update_dict['updated_at'] = datetime.now(timezone.utc).isoformat()
+    update_dict['updated_at'] = datetime.now(timezone.utc)
     
     await db.settings.update_one({"settings_id": "default"}, {"$set": update_dict})
+    reference_cache.invalidate("settings")
     
     updated = await db.settings.find_one({"settings_id": "default"}, {"_id": 0})
-    if isinstance(updated['updated_at'], str):
-        updated['updated_at'] = datetime.fromisoformat(updated['updated_at'])
     return Settings(**updated)
 
 # Cancel booking
@@ -1284,16 +1402,23 @@ async def cancel_booking(booking_id: str, current_user: User = Depends(get_curre
         raise HTTPException(status_code=404, detail="Booking not found")
     
     await db.bookings.update_one({"booking_id": booking_id}, {"$set": {"status": "Cancelled"}})
+    await release_slots(db, booking_id)
+    zone_index.remove(booking_id)
     
     updated = await db.bookings.find_one({"booking_id": booking_id}, {"_id": 0})
-    if isinstance(updated['created_at'], str):
-        updated['created_at'] = datetime.fromisoformat(updated['created_at'])
-    if isinstance(updated['appointment_datetime'], str):
-        updated['appointment_datetime'] = datetime.fromisoformat(updated['appointment_datetime'])
+    await record_booking_change(db, result, updated)
     return Booking(**updated)
 
 app.include_router(api_router)
 
+# ETags/304s and compression for JSON GET responses. SERVER_TIMING=true adds the
+# process CPU time of each response, for scripts/benchmark_http_cache.py only
+app.add_middleware(
+    ConditionalCompressionMiddleware,
+    minimum_size=int(os.environ.get('COMPRESS_MIN_BYTES', '1024')),
+    server_timing=os.environ.get('SERVER_TIMING', 'false').lower() in ('1', 'true', 'yes')
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
@@ -1307,6 +1432,40 @@ logging.basicConfig(
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 )
 
+@app.on_event("startup")
+async def bootstrap_indexes():
+    await ensure_indexes(db)
+
+@app.on_event("startup")
+async def init_analytics_rollups():
+    await ensure_rollups(db)
+
+@app.on_event("startup")
+async def init_product_tax_rates():
+    # Products saved before tax_rate existed
+    if await refresh_tax_rates(db, {"tax_rate": {"$exists": False}}):
+        reference_cache.invalidate("products")
+
+@app.on_event("startup")
+async def init_bookings():
+    await booking_numbers.seed(db, "bookings", "booking_number")
+    await invoice_numbers.seed(db, "invoices", "invoice_number")
+    await zone_index.load(db)
+
+@app.on_event("startup")
+async def warm_reference_cache():
+    await asyncio.gather(
+        load_settings(),
+        *(reference_list(name) for name in REFERENCE_LISTS)
+    )
+
+@app.on_event("startup")
+async def start_email_outbox():
+    email_outbox.start(db)
+
 @app.on_event("shutdown")
 async def shutdown_db_client():
-    client.close()
\ No newline at end of file
+    await email_outbox.stop()
+    client.close()
+    password_hasher.shutdown()
+    invoice_pdfs.shutdown()
\ No newline at end of file
@@ -0,0 +1,201 @@
+"""In-memory per-zone interval index for booking availability checks.
+
+Each zone keeps its non-cancelled bookings as parallel arrays sorted by start
+time, so "does anything overlap [start, end)" is a bisect plus a scan over
+the handful of bookings that could possibly reach into the window.
+"""
+import asyncio
+import bisect
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+
+from datecodec import to_utc
+
+logger = logging.getLogger(__name__)
+
+
+class _ZoneIntervals:
+    """Bookings of a single zone, sorted by start timestamp."""
+
+    __slots__ = ("starts", "ends", "ids", "max_duration")
+
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+        self.ids = []
+        # Longest booking ever seen in the zone; bounds how far back an
+        # overlapping booking can start. Never shrinks, which stays correct.
+        self.max_duration = 0.0
+
+    def add(self, start, end, booking_id):
+        i = bisect.bisect_right(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        self.ids.insert(i, booking_id)
+        self.max_duration = max(self.max_duration, end - start)
+
+    def remove(self, start, booking_id):
+        i = bisect.bisect_left(self.starts, start)
+        while i < len(self.starts) and self.starts[i] == start:
+            if self.ids[i] == booking_id:
+                del self.starts[i], self.ends[i], self.ids[i]
+                return True
+            i += 1
+        return False
+
+    def find_overlap(self, start, end, exclude_id=None):
+        lo = bisect.bisect_left(self.starts, start - self.max_duration)
+        hi = bisect.bisect_left(self.starts, end)
+        for i in range(lo, hi):
+            if self.ends[i] > start and self.ids[i] != exclude_id:
+                return self.starts[i], self.ends[i], self.ids[i]
+        return None
+
+
+class ZoneIntervalIndex:
+    """Per-zone index of non-cancelled bookings keyed by time interval.
+
+    The index is loaded once from Mongo and then kept current by the booking
+    handlers. Because it lives in process memory, it is also reloaded after
+    ``max_age_seconds`` so that several uvicorn workers converge on writes
+    made by their siblings. That reload runs in a background task: requests
+    keep using the current contents meanwhile, and bookings this process adds
+    or removes during the reload are applied again on top of the new data.
+    """
+
+    def __init__(self, max_age_seconds=60):
+        self.max_age_seconds = max_age_seconds
+        self._zones = {}
+        self._bookings = {}
+        self._loaded_at = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_task = None
+        # booking_id -> document (or None when removed) for writes made while a load runs
+        self._pending = None
+
+    def __len__(self):
+        return len(self._bookings)
+
+    @property
+    def is_stale(self):
+        if self._loaded_at is None:
+            return True
+        return self.max_age_seconds > 0 and time.monotonic() - self._loaded_at > self.max_age_seconds
+
+    @classmethod
+    def _build(cls, bookings):
+        grouped = {}
+        entries = {}
+        for booking in bookings:
+            interval = cls._interval(booking)
+            if interval is None:
+                continue
+            zone_id, start, end = interval
+            grouped.setdefault(zone_id, []).append((start, end, booking['booking_id']))
+            entries[booking['booking_id']] = interval
+
+        zones = {}
+        for zone_id, items in grouped.items():
+            items.sort()
+            intervals = _ZoneIntervals()
+            intervals.starts = [s for s, _, _ in items]
+            intervals.ends = [e for _, e, _ in items]
+            intervals.ids = [b for _, _, b in items]
+            intervals.max_duration = max(e - s for s, e, _ in items)
+            zones[zone_id] = intervals
+        return zones, entries
+
+    def build(self, bookings):
+        """Replace the index contents from an iterable of booking documents."""
+        self._zones, self._bookings = self._build(bookings)
+        self._loaded_at = time.monotonic()
+
+    async def load(self, db):
+        """(Re)load every non-cancelled booking from the database."""
+        async with self._load_lock:
+            self._pending = {}
+            try:
+                cursor = db.bookings.find(
+                    {"status": {"$ne": "Cancelled"}},
+                    {"_id": 0, "booking_id": 1, "zone_id": 1, "appointment_datetime": 1, "duration_minutes": 1}
+                )
+                bookings = [b async for b in cursor]
+                self._zones, self._bookings = await asyncio.to_thread(self._build, bookings)
+                self._loaded_at = time.monotonic()
+                pending = self._pending
+            finally:
+                self._pending = None
+            for booking_id, booking in pending.items():
+                if booking is None:
+                    self.remove(booking_id)
+                else:
+                    self.add(booking)
+            logger.info(f"Zone interval index loaded with {len(self._bookings)} bookings")
+
+    async def _refresh(self, db):
+        try:
+            await self.load(db)
+        except Exception as e:
+            logger.error(f"Zone interval index refresh failed: {e}")
+        finally:
+            self._refresh_task = None
+
+    async def ensure_loaded(self, db):
+        """Load the index on first use; once stale, reload it in the background."""
+        if self._loaded_at is None:
+            await self.load(db)
+        elif self.is_stale and self._refresh_task is None:
+            self._refresh_task = asyncio.create_task(self._refresh(db))
+
+    def add(self, booking):
+        """Index a booking document, replacing any previous entry for it."""
+        self.remove(booking['booking_id'])
+        if self._pending is not None:
+            self._pending[booking['booking_id']] = booking
+        if booking.get('status') == "Cancelled":
+            return
+        interval = self._interval(booking)
+        if interval is None:
+            return
+        zone_id, start, end = interval
+        self._zones.setdefault(zone_id, _ZoneIntervals()).add(start, end, booking['booking_id'])
+        self._bookings[booking['booking_id']] = interval
+
+    def remove(self, booking_id):
+        if self._pending is not None:
+            self._pending[booking_id] = None
+        interval = self._bookings.pop(booking_id, None)
+        if interval is None:
+            return
+        zone_id, start, _ = interval
+        self._zones[zone_id].remove(start, booking_id)
+
+    def find_conflict(self, zone_id, start, end, exclude_booking_id=None):
+        """Return ``(start, end, booking_id)`` of a booking overlapping the window, or None.
+
+        ``start`` and ``end`` are datetimes; the returned bounds are aware UTC datetimes.
+        """
+        intervals = self._zones.get(zone_id)
+        if intervals is None:
+            return None
+        hit = intervals.find_overlap(to_utc(start).timestamp(), to_utc(end).timestamp(), exclude_booking_id)
+        if hit is None:
+            return None
+        hit_start, hit_end, booking_id = hit
+        return (
+            datetime.fromtimestamp(hit_start, timezone.utc),
+            datetime.fromtimestamp(hit_end, timezone.utc),
+            booking_id,
+        )
+
+    def is_available(self, zone_id, start, end, exclude_booking_id=None):
+        return self.find_conflict(zone_id, start, end, exclude_booking_id) is None
+
+    @staticmethod
+    def _interval(booking):
+        start = to_utc(booking.get('appointment_datetime'))
+        if start is None or not booking.get('zone_id'):
+            return None
+        end = start + timedelta(minutes=booking.get('duration_minutes', 60))
+        return booking['zone_id'], start.timestamp(), end.timestamp()
@@ -2,6 +2,7 @@ import requests
 import sys
 from datetime import datetime, timedelta
 import json
+from concurrent.futures import ThreadPoolExecutor
 
 class CarWashAPITester:
     def __init__(self, base_url="https://cleanwheels-10.preview.emergentagent.com"):
@@ -493,6 +494,30 @@ class CarWashAPITester:
         if success:
             print(f"   ✅ Pagination working - got {len(response)} bookings")
         
+        # Test cursor pagination: walk every page and check no booking repeats
+        seen = []
+        cursor = ""
+        while True:
+            success, response = self.run_test(
+                "Get bookings page by cursor",
+                "GET",
+                f"bookings?limit=5&cursor={cursor}" if cursor else "bookings?limit=5",
+                200,
+                token=self.tokens.get("Admin")
+            )
+            if not success:
+                break
+            seen.extend(b['booking_id'] for b in response['items'])
+            cursor = response['next_cursor']
+            if not cursor:
+                break
+        
+        if success:
+            if len(seen) == len(set(seen)):
+                print(f"   ✅ Cursor pagination walked {len(seen)} bookings without repeats")
+            else:
+                print(f"   ❌ Cursor pagination repeated {len(seen) - len(set(seen))} bookings")
+        
         # Test bookings count
         success, response = self.run_test(
             "Get bookings count",
@@ -504,6 +529,21 @@ class CarWashAPITester:
         
         if success and 'total' in response:
             print(f"   ✅ Total bookings count: {response['total']}")
+            count = response['total']
+        else:
+            return False
+        
+        # Test list and total in one call
+        success, response = self.run_test(
+            "Get bookings with total",
+            "GET",
+            "bookings?page=1&page_size=10&with_total=true",
+            200,
+            token=self.tokens.get("Admin")
+        )
+        
+        if success and response.get('total') == count:
+            print(f"   ✅ Combined call returned {len(response['items'])} bookings of {response['total']}")
             return True
         
         return False
@@ -559,6 +599,102 @@ class CarWashAPITester:
         
         return False
 
+    def test_concurrent_numbering(self, parallel=200):
+        """Fire parallel creates and check booking/invoice numbers stay unique"""
+        print("\n🔢 Testing Concurrent Booking/Invoice Numbering...")
+        
+        required_fields = ['customer_id', 'zone_id', 'product_id']
+        for field in required_fields:
+            if field not in self.test_data:
+                print(f"   ❌ Missing {field} for concurrent creation")
+                return False
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.tokens.get("Admin")}'
+        }
+        # Spread bookings a month out, one hour apart, so none of them conflict
+        base_time = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=30)
+        
+        def create_booking(i):
+            return requests.post(f"{self.api_url}/bookings", headers=headers, json={
+                "customer_id": self.test_data['customer_id'],
+                "zone_id": self.test_data['zone_id'],
+                "product_ids": [self.test_data['product_id']],
+                "appointment_datetime": (base_time + timedelta(hours=i)).isoformat()
+            })
+        
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            responses = list(pool.map(create_booking, range(parallel)))
+        bookings = [r.json() for r in responses if r.status_code == 200]
+        
+        def create_invoice(booking):
+            return requests.post(f"{self.api_url}/invoices", headers=headers, json={"booking_id": booking['booking_id']})
+        
+        with ThreadPoolExecutor(max_workers=50) as pool:
+            responses = list(pool.map(create_invoice, bookings))
+        invoices = [r.json() for r in responses if r.status_code == 200]
+        
+        for label, rows, field in (("booking", bookings, "booking_number"), ("invoice", invoices, "invoice_number")):
+            self.tests_run += 1
+            numbers = [row[field] for row in rows]
+            if len(rows) == parallel and len(set(numbers)) == len(numbers):
+                self.tests_passed += 1
+                print(f"✅ Passed - {len(numbers)} parallel {label}s got unique numbers")
+            else:
+                print(f"❌ Failed - {len(rows)}/{parallel} {label}s created, {len(numbers) - len(set(numbers))} duplicate numbers")
+        
+        # Free the zone again
+        for booking in bookings:
+            requests.put(f"{self.api_url}/bookings/{booking['booking_id']}/cancel", headers=headers)
+        
+        return True
+
+    def test_concurrent_slot_claims(self, parallel=20):
+        """Fire parallel creates for the same zone and time and check exactly one wins"""
+        print("\n🎯 Testing Concurrent Bookings For One Slot...")
+        
+        required_fields = ['customer_id', 'zone_id', 'product_id']
+        for field in required_fields:
+            if field not in self.test_data:
+                print(f"   ❌ Missing {field} for concurrent creation")
+                return False
+        
+        headers = {
+            'Content-Type': 'application/json',
+            'Authorization': f'Bearer {self.tokens.get("Admin")}'
+        }
+        # Two months out, clear of the bookings made by test_concurrent_numbering
+        appointment = datetime.now().replace(hour=9, minute=0, second=0, microsecond=0) + timedelta(days=60)
+        
+        def create_booking(_):
+            return requests.post(f"{self.api_url}/bookings", headers=headers, json={
+                "customer_id": self.test_data['customer_id'],
+                "zone_id": self.test_data['zone_id'],
+                "product_ids": [self.test_data['product_id']],
+                "appointment_datetime": appointment.isoformat(),
+                "duration_minutes": 60
+            })
+        
+        with ThreadPoolExecutor(max_workers=parallel) as pool:
+            responses = list(pool.map(create_booking, range(parallel)))
+        winners = [r for r in responses if r.status_code == 200]
+        conflicts = [r for r in responses if r.status_code == 400]
+        
+        self.tests_run += 1
+        if len(winners) == 1 and len(conflicts) == parallel - 1:
+            self.tests_passed += 1
+            print(f"✅ Passed - 1 of {parallel} parallel bookings won the slot, {len(conflicts)} rejected")
+        else:
+            print(f"❌ Failed - {len(winners)} bookings won, {len(conflicts)} rejected, "
+                  f"status codes {sorted({r.status_code for r in responses})}")
+        
+        # Free the zone again
+        for response in winners:
+            requests.put(f"{self.api_url}/bookings/{response.json()['booking_id']}/cancel", headers=headers)
+        
+        return len(winners) == 1
+
     def test_role_based_access(self):
         """Test role-based access control"""
         print("\n🔒 Testing Role-Based Access Control...")
@@ -640,6 +776,8 @@ def main():
         tester.test_bookings_crud,
         tester.test_bookings_filtering,
         tester.test_invoices_crud,
+        tester.test_concurrent_numbering,
+        tester.test_concurrent_slot_claims,
         tester.test_role_based_access,
         tester.test_delete_operations
     ]
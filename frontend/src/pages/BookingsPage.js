@@ -75,10 +75,6 @@ export default function BookingsPage() {
     fetchInvoices();
   }, [customerSearch, appointmentDate, statusFilter, sortBy, sortOrder, page]);
 
-  useEffect(() => {
-    fetchTotalCount();
-  }, [customerSearch, appointmentDate, statusFilter]);
-
   // Handle navigation from calendar with selected date/time
   useEffect(() => {
     if (location.state) {
@@ -122,7 +118,8 @@ export default function BookingsPage() {
         sort_by: sortBy,
         sort_order: sortOrder,
         page: page.toString(),
-        page_size: pageSize.toString()
+        page_size: pageSize.toString(),
+        with_total: 'true'
       });
 
       if (customerSearch) params.append('customer_search', customerSearch);
@@ -130,23 +127,10 @@ export default function BookingsPage() {
       if (statusFilter !== 'all') params.append('status', statusFilter);
 
       const response = await axios.get(`${API}/bookings?${params}`);
-      setBookings(response.data);
-    } catch (error) {
-      toast.error('Failed to fetch bookings');
-    }
-  };
-
-  const fetchTotalCount = async () => {
-    try {
-      const params = new URLSearchParams();
-      if (customerSearch) params.append('customer_search', customerSearch);
-      if (appointmentDate) params.append('appointment_date', appointmentDate);
-      if (statusFilter !== 'all') params.append('status', statusFilter);
-
-      const response = await axios.get(`${API}/bookings/count?${params}`);
+      setBookings(response.data.items);
       setTotalCount(response.data.total);
     } catch (error) {
-      console.error('Failed to fetch count', error);
+      toast.error('Failed to fetch bookings');
     }
   };
 
@@ -530,7 +514,6 @@ export default function BookingsPage() {
       setAvailableZones([]);
       setCustomerQuery('');
       fetchBookings();
-      fetchTotalCount();
     } catch (error) {
       toast.error(error.response?.data?.detail || 'Operation failed');
     }
@@ -701,6 +684,7 @@ export default function BookingsPage() {
                   <input
                     id="datetime"
                     type="datetime-local"
+                    step="300"
                     className="flex h-10 w-full rounded-md border border-input bg-background px-3 py-2 text-sm ring-offset-background file:border-0 file:bg-transparent file:text-sm file:font-medium placeholder:text-muted-foreground focus-visible:outline-none focus-visible:ring-2 focus-visible:ring-ring focus-visible:ring-offset-2 disabled:cursor-not-allowed disabled:opacity-50"
                     value={formData.appointment_datetime}
                     onChange={(e) => setFormData({ ...formData, appointment_datetime: e.target.value })}
@@ -417,6 +417,25 @@ export default function InvoicesPage() {
   };
 
   const handleDownload = async (invoiceId) => {
+    try {
+      const response = await axios.get(`${API}/invoices/${invoiceId}/pdf`, { responseType: 'blob' });
+      const disposition = response.headers['content-disposition'] || '';
+      const fileName = disposition.match(/filename="([^"]+)"/)?.[1] || `invoice_${invoiceId}.pdf`;
+      const url = URL.createObjectURL(response.data);
+      const link = document.createElement('a');
+      link.href = url;
+      link.download = fileName;
+      link.click();
+      URL.revokeObjectURL(url);
+      toast.success('PDF downloaded successfully');
+      return;
+    } catch (error) {
+      if (error.response?.status !== 501) {
+        toast.error('Failed to download invoice');
+        return;
+      }
+    }
+    // Server cannot render PDFs (reportlab not installed): build it in the browser
     try {
       const response = await axios.get(`${API}/invoices/${invoiceId}`);
       const customer = customers.find(c => c.customer_id === response.data.customer_id);
@@ -455,7 +474,7 @@ export default function InvoicesPage() {
         invoice_id: selectedInvoice.invoice_id,
         recipient_email: emailAddress
       });
-      toast.success(`Invoice emailed to ${emailAddress}`);
+      toast.success(`Invoice queued for ${emailAddress}`);
       setEmailOpen(false);
       setEmailAddress('');
     } catch (error) {
@@ -0,0 +1,68 @@
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.errors import BulkWriteError
+from dotenv import load_dotenv
+
+from booking_slots import slot_keys
+from indexes import ensure_indexes
+from datecodec import to_utc
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+slot_minutes = int(os.environ.get('BOOKING_SLOT_MINUTES', '5'))
+
+async def backfill_booking_slots():
+    """Claim zone slots for every active booking created before slot reservations existed.
+
+    Safe to re-run: already-claimed slots are skipped. With --rebuild the slot
+    collection is emptied first, e.g. after changing BOOKING_SLOT_MINUTES.
+    """
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    
+    if '--rebuild' in sys.argv:
+        await db.booking_slots.delete_many({})
+        print("✓ Cleared existing booking slots")
+    await ensure_indexes(db, collections=["booking_slots"])
+    
+    processed = 0
+    conflicts = 0
+    async for booking in db.bookings.find({"status": {"$ne": "Cancelled"}}, {"_id": 0}):
+        start = to_utc(booking.get('appointment_datetime'))
+        if not start or not booking.get('zone_id'):
+            continue
+        end = start + timedelta(minutes=booking.get('duration_minutes', 60))
+        docs = [
+            {"zone_id": booking['zone_id'], "slot": slot, "booking_id": booking['booking_id'], "claimed_at": datetime.now(timezone.utc)}
+            for slot in slot_keys(start, end, slot_minutes)
+        ]
+        try:
+            await db.booking_slots.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Slots this booking already holds are fine; anything else is a legacy double booking
+            for error in e.details.get('writeErrors', []):
+                holder = await db.booking_slots.find_one(
+                    {"zone_id": booking['zone_id'], "slot": error['op']['slot']}, {"_id": 0, "booking_id": 1}
+                )
+                if holder and holder['booking_id'] != booking['booking_id']:
+                    conflicts += 1
+                    print(f"! Booking {booking['booking_id']} overlaps {holder['booking_id']} at {error['op']['slot']}")
+                    break
+        processed += 1
+    
+    print(f"✓ Backfilled slots for {processed} bookings ({conflicts} pre-existing overlaps)")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(backfill_booking_slots())
@@ -0,0 +1,48 @@
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from customer_search import search_fields
+from indexes import ensure_indexes
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+BATCH_SIZE = 1000
+
+async def backfill_customer_search():
+    """Derive the type-ahead search fields for customers created before they existed.
+
+    Pass --all to recompute every customer, e.g. after changing the normalization.
+    """
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    
+    await ensure_indexes(db, collections=["customers"])
+    query = {} if '--all' in sys.argv else {"search_grams": {"$exists": False}}
+    
+    updated = 0
+    batch = []
+    async for customer in db.customers.find(query, {"_id": 1, "name": 1, "phone": 1}):
+        batch.append(UpdateOne({"_id": customer['_id']}, {"$set": search_fields(customer.get('name'), customer.get('phone'))}))
+        if len(batch) >= BATCH_SIZE:
+            updated += (await db.customers.bulk_write(batch, ordered=False)).modified_count
+            batch = []
+    if batch:
+        updated += (await db.customers.bulk_write(batch, ordered=False)).modified_count
+    
+    print(f"✓ Updated search fields for {updated} customers")
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(backfill_customer_search())
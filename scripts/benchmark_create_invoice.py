@@ -0,0 +1,80 @@
+"""Measure POST /api/invoices latency against a live backend.
+
+Creates its own tax, category, products, zone, customer and bookings, then
+invoices the bookings one at a time and reports the latency distribution:
+
+    python scripts/benchmark_create_invoice.py http://localhost:8000 --invoices 200
+
+Run it on the same deployment before and after a change to compare.
+"""
+import argparse
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import requests
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def post(session, url, payload):
+    response = session.post(url, json=payload)
+    response.raise_for_status()
+    return response.json()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base_url", nargs="?", default="http://localhost:8000")
+    parser.add_argument("--invoices", type=int, default=200)
+    parser.add_argument("--products", type=int, default=5, help="products per booking")
+    parser.add_argument("--email", default="admin@carlogic.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+    api_url = f"{args.base_url.rstrip('/')}/api"
+    run_id = uuid.uuid4().hex[:6]
+
+    session = requests.Session()
+    token = post(session, f"{api_url}/auth/login", {"email": args.email, "password": args.password})['token']
+    session.headers['Authorization'] = f"Bearer {token}"
+
+    tax = post(session, f"{api_url}/taxes", {"name": f"Bench VAT {run_id}", "percentage": 18})
+    category = post(session, f"{api_url}/categories", {"name": f"Bench {run_id}"})
+    product_ids = [
+        post(session, f"{api_url}/products", {
+            "name": f"Bench service {run_id}-{i}", "code": f"B{run_id}{i}", "category_id": category['category_id'],
+            "tax_ids": [tax['tax_id']], "sell_price": 10 + i
+        })['product_id']
+        for i in range(args.products)
+    ]
+    zone = post(session, f"{api_url}/zones", {"name": f"Bench bay {run_id}", "description": "benchmark"})
+    customer = post(session, f"{api_url}/customers", {"name": f"Bench customer {run_id}", "phone": run_id})
+
+    start = datetime.now().replace(minute=0, second=0, microsecond=0) + timedelta(days=365)
+    bookings = [
+        post(session, f"{api_url}/bookings", {
+            "customer_id": customer['customer_id'], "zone_id": zone['zone_id'], "product_ids": product_ids,
+            "appointment_datetime": (start + timedelta(hours=i)).isoformat()
+        })
+        for i in range(args.invoices)
+    ]
+
+    samples = []
+    for booking in bookings:
+        t0 = time.perf_counter()
+        post(session, f"{api_url}/invoices", {"booking_id": booking['booking_id']})
+        samples.append((time.perf_counter() - t0) * 1000)
+
+    print(f"POST /api/invoices n={len(samples)} p50={statistics.median(samples):7.2f} ms"
+          f"  p99={percentile(samples, 99):7.2f} ms  max={max(samples):7.2f} ms")
+
+    for booking in bookings:
+        session.put(f"{api_url}/bookings/{booking['booking_id']}/cancel")
+
+
+if __name__ == "__main__":
+    main()
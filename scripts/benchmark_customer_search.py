@@ -0,0 +1,99 @@
+"""Type-ahead latency of the indexed customer search against the legacy regex scan.
+
+Seeds a throwaway database (<DB_NAME>_search_bench) with synthetic customers
+and needs a running MongoDB, e.g.:
+
+    python scripts/benchmark_customer_search.py 100000
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+import random
+import statistics
+import time
+import uuid
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from customer_search import search_customers, search_fields
+from indexes import ensure_indexes
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+FIRST = ["James", "Maria", "Wei", "Aisha", "José", "Olga", "Ravi", "Fatima", "John", "Yuki", "Liam", "Zoë"]
+LAST = ["Smith", "García", "Chen", "Khan", "Müller", "Ivanova", "Patel", "Okafor", "Johnson", "Tanaka", "Brown"]
+QUERIES = 200
+
+def make_customer(i):
+    name = f"{random.choice(FIRST)} {random.choice(LAST)}{random.randrange(1000)}"
+    phone = f"+1 ({random.randrange(200, 999)}) {random.randrange(100, 999)}-{i % 10000:04d}"
+    return {"customer_id": str(uuid.uuid4()), "name": name, "phone": phone, **search_fields(name, phone)}
+
+def make_queries(customers):
+    """Mix of what people type: 2-3 letter prefixes, whole words, inner substrings, phone fragments."""
+    queries = []
+    for _ in range(QUERIES):
+        c = random.choice(customers)
+        first, last = c['name'].split()
+        digits = c['phone_digits']
+        queries.append(random.choice([
+            first[:2], last[:3], first, f"{first} {last[:2]}", last[2:6], digits[-4:], digits[1:7],
+        ]))
+    return queries
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+async def legacy_search(db, query):
+    """The original unanchored, case-insensitive regex scan."""
+    return await db.customers.find({
+        "$or": [
+            {"name": {"$regex": query, "$options": "i"}},
+            {"phone": {"$regex": query, "$options": "i"}}
+        ]
+    }, {"_id": 0}).limit(10).to_list(10)
+
+async def timed(search, db, queries):
+    samples = []
+    for query in queries:
+        t0 = time.perf_counter()
+        await search(db, query)
+        samples.append((time.perf_counter() - t0) * 1000)
+    return samples
+
+async def run(count):
+    random.seed(count)
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    scratch_name = f"{db_name}_search_bench"
+    await client.drop_database(scratch_name)
+    db = client[scratch_name]
+    
+    customers = [make_customer(i) for i in range(count)]
+    for i in range(0, count, 10_000):
+        await db.customers.insert_many(customers[i:i + 10_000])
+    await ensure_indexes(db, collections=["customers"])
+    queries = make_queries(customers)
+    
+    await timed(search_customers, db, queries[:20])  # warm up
+    for label, search in (("indexed", search_customers), ("regex", legacy_search)):
+        samples = await timed(search, db, queries)
+        print(f"{count:>9,} customers | {label:<8} p50={statistics.median(samples):7.2f} ms"
+              f"  p99={percentile(samples, 99):7.2f} ms  max={max(samples):7.2f} ms")
+    
+    await client.drop_database(scratch_name)
+    client.close()
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [100_000]
+    for size in sizes:
+        asyncio.run(run(size))
@@ -0,0 +1,75 @@
+"""Bytes on the wire and server CPU per request for the polled list endpoints.
+
+Run against a live backend, e.g.:
+
+    python scripts/benchmark_http_cache.py http://localhost:8000 --requests 50
+
+Each endpoint is fetched uncompressed, with gzip, with brotli, and as a
+conditional GET with the ETag of the previous response. Server CPU comes
+from the Server-Timing header the API adds to JSON GET responses when it is
+started with SERVER_TIMING=true (otherwise it shows as nan); it is
+process-wide CPU time, which is why requests are sent one at a time.
+"""
+import argparse
+import statistics
+
+import requests
+
+ENDPOINTS = ["customers", "products", "zones", "invoices"]
+MODES = {
+    "identity": {"Accept-Encoding": "identity"},
+    "gzip": {"Accept-Encoding": "gzip"},
+    "br": {"Accept-Encoding": "br"},
+}
+
+
+def server_cpu_ms(response):
+    for metric in response.headers.get("Server-Timing", "").split(","):
+        name, _, dur = metric.strip().partition(";dur=")
+        if name == "process-cpu" and dur:
+            return float(dur)
+    return float("nan")
+
+
+def fetch(session, url, headers):
+    response = session.get(url, headers=headers, stream=True)
+    wire = len(response.raw.read(decode_content=False))
+    return response, wire
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base_url", nargs="?", default="http://localhost:8000")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--email", default="admin@carlogic.com")
+    parser.add_argument("--password", default="admin123")
+    args = parser.parse_args()
+    api_url = f"{args.base_url.rstrip('/')}/api"
+
+    session = requests.Session()
+    token = session.post(f"{api_url}/auth/login", json={"email": args.email, "password": args.password}).json()['token']
+    session.headers['Authorization'] = f"Bearer {token}"
+
+    for endpoint in ENDPOINTS:
+        url = f"{api_url}/{endpoint}"
+        etag = None
+        for mode, headers in MODES.items():
+            wires, cpus = [], []
+            for _ in range(args.requests):
+                response, wire = fetch(session, url, headers)
+                wires.append(wire)
+                cpus.append(server_cpu_ms(response))
+                etag = response.headers.get("ETag")
+            print(f"{endpoint:<10} {mode:<12} status={response.status_code}  wire={statistics.median(wires):>9,.0f} B"
+                  f"  server cpu={statistics.median(cpus):6.2f} ms")
+        wires, cpus = [], []
+        for _ in range(args.requests):
+            response, wire = fetch(session, url, {"If-None-Match": etag or "", "Accept-Encoding": "gzip"})
+            wires.append(wire)
+            cpus.append(server_cpu_ms(response))
+        print(f"{endpoint:<10} {'conditional':<12} status={response.status_code}  wire={statistics.median(wires):>9,.0f} B"
+              f"  server cpu={statistics.median(cpus):6.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""Measure latency of an unrelated endpoint while a burst of logins hits the API.
+
+Run against a live backend, e.g.:
+
+    python scripts/benchmark_login_storm.py http://localhost:8000 --logins 200
+
+Before password hashing moved off the event loop, every bcrypt call froze the
+worker, so /api/settings p99 grew with the login burst.
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def probe(api_url, stop, samples):
+    session = requests.Session()
+    while not stop.is_set():
+        t0 = time.perf_counter()
+        session.get(f"{api_url}/settings")
+        samples.append((time.perf_counter() - t0) * 1000)
+        time.sleep(0.01)
+
+
+def login(api_url, email, password):
+    return requests.post(f"{api_url}/auth/login", json={"email": email, "password": password}).status_code
+
+
+def measure(api_url, seconds, logins, concurrency, email, password):
+    samples = []
+    stop = threading.Event()
+    prober = threading.Thread(target=probe, args=(api_url, stop, samples))
+    prober.start()
+    codes = []
+    if logins:
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            codes = list(pool.map(lambda _: login(api_url, email, password), range(logins)))
+    else:
+        time.sleep(seconds)
+    stop.set()
+    prober.join()
+    return samples, codes
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("base_url", nargs="?", default="http://localhost:8000")
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--email", default="staff@carlogic.com")
+    parser.add_argument("--password", default="staff123")
+    args = parser.parse_args()
+    api_url = f"{args.base_url.rstrip('/')}/api"
+
+    for label, logins in (("idle", 0), ("login storm", args.logins)):
+        samples, codes = measure(api_url, 3, logins, args.concurrency, args.email, args.password)
+        status_counts = {code: codes.count(code) for code in set(codes)}
+        print(f"{label:<12} /api/settings n={len(samples):<5} p50={statistics.median(samples):7.1f} ms"
+              f"  p99={percentile(samples, 99):7.1f} ms  max={max(samples):7.1f} ms"
+              + (f"  login statuses={status_counts}" if codes else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""CPU time and allocations of the two list-response encodings.
+
+Compares, for synthetic bookings stored the way the API stores them:
+
+* validated - what FastAPI does with response_model=List[Booking]: validate
+  every row, dump it to JSON-compatible Python, encode with json
+* fast      - the FAST_JSON_LISTS path: conform the stored rows (defaults,
+  string dates) and encode them with orjson
+
+    python scripts/benchmark_serialization.py 1000 10000
+"""
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import copy
+import json
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import List
+
+from pydantic import TypeAdapter
+
+from datecodec import appointment_fields
+from fast_json import FastJSONResponse, conform
+from models import Booking
+
+ROUNDS = 5
+
+
+def make_rows(count):
+    base = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+    return [{
+        "booking_id": str(uuid.uuid4()),
+        "booking_number": i + 1,
+        "customer_id": str(uuid.uuid4()),
+        "zone_id": str(uuid.uuid4()),
+        "product_ids": [str(uuid.uuid4()) for _ in range(3)],
+        **appointment_fields(base + timedelta(minutes=30 * i)),
+        "duration_minutes": 60,
+        "vehicle_pickup_by_us": False,
+        "vehicle_dropoff_by_us": True,
+        "status": "Pending",
+        "created_at": base,
+        "created_by": str(uuid.uuid4()),
+    } for i in range(count)]
+
+
+adapter = TypeAdapter(List[Booking])
+
+
+def validated(rows):
+    content = adapter.dump_python(adapter.validate_python(rows), mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")).encode()
+
+
+def fast(rows):
+    return FastJSONResponse(conform(rows, Booking)).body
+
+
+def legacy_rows(count):
+    """Rows as older versions stored them: ISO string dates, defaulted fields missing."""
+    rows = make_rows(count)
+    for row in rows:
+        row['appointment_datetime'] = row['appointment_datetime'].isoformat()
+        row['created_at'] = row['created_at'].isoformat()
+        del row['appointment_day'], row['vehicle_pickup_by_us'], row['status']
+    return rows
+
+
+def measure(encode, rows):
+    encode(rows)  # warm up
+    t0 = time.process_time()
+    for _ in range(ROUNDS):
+        body = encode(rows)
+    cpu_ms = (time.process_time() - t0) / ROUNDS * 1000
+    tracemalloc.start()
+    encode(rows)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return cpu_ms, peak, len(body)
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or [1_000, 10_000]
+    for size in sizes:
+        rows = make_rows(size)
+        assert json.loads(validated(rows)) == json.loads(fast(rows)), "encodings disagree"
+        legacy = legacy_rows(10)
+        assert json.loads(validated(copy.deepcopy(legacy))) == json.loads(fast(legacy)), "legacy rows disagree"
+        results = {name: measure(encode, rows) for name, encode in (("validated", validated), ("fast", fast))}
+        for name, (cpu_ms, peak, length) in results.items():
+            print(f"{size:>7,} rows | {name:<9} cpu {cpu_ms:8.2f} ms | peak alloc {peak / 1024:9.0f} KiB | body {length / 1024:7.0f} KiB")
+        print(f"{size:>7,} rows | speedup {results['validated'][0] / results['fast'][0]:.1f}x cpu,"
+              f" {results['validated'][1] / results['fast'][1]:.1f}x less peak allocation")
+
+
+if __name__ == "__main__":
+    main()
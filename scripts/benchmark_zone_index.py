@@ -0,0 +1,89 @@
+import sys
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import random
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from zone_index import ZoneIntervalIndex
+
+ZONES = [f"zone-{i:03d}" for i in range(1, 9)]
+QUERIES = 200
+
+
+def make_bookings(count):
+    """Synthetic bookings spread over the zones, stored the way the API stores them."""
+    base = datetime(2024, 1, 1, 8, 0, tzinfo=timezone.utc)
+    span_minutes = count * 90 // len(ZONES)
+    bookings = []
+    for _ in range(count):
+        start = base + timedelta(minutes=random.randrange(0, span_minutes, 15))
+        bookings.append({
+            "booking_id": str(uuid.uuid4()),
+            "zone_id": random.choice(ZONES),
+            "appointment_datetime": start.isoformat(),
+            "duration_minutes": random.choice([30, 45, 60, 90]),
+            "status": "Pending",
+        })
+    return bookings, base, span_minutes
+
+
+def loop_available(all_bookings, start, end):
+    """The original /zones/available algorithm: zones x bookings with per-row parsing."""
+    available = []
+    for zone_id in ZONES:
+        is_available = True
+        for booking in all_bookings:
+            if booking.get('zone_id') != zone_id:
+                continue
+            existing_start = datetime.fromisoformat(booking['appointment_datetime'])
+            existing_end = existing_start + timedelta(minutes=booking.get('duration_minutes', 60))
+            if start < existing_end and end > existing_start:
+                is_available = False
+                break
+        if is_available:
+            available.append(zone_id)
+    return available
+
+
+def index_available(index, start, end):
+    return [zone_id for zone_id in ZONES if index.is_available(zone_id, start, end)]
+
+
+def run(count):
+    random.seed(count)
+    bookings, base, span_minutes = make_bookings(count)
+    windows = []
+    for _ in range(QUERIES):
+        start = base + timedelta(minutes=random.randrange(0, span_minutes, 15))
+        windows.append((start, start + timedelta(minutes=60)))
+
+    t0 = time.perf_counter()
+    index = ZoneIntervalIndex(max_age_seconds=0)
+    index.build(bookings)
+    build_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    index_results = [index_available(index, s, e) for s, e in windows]
+    index_us = (time.perf_counter() - t0) / QUERIES * 1e6
+
+    # The loop is slow enough that a few queries give a stable per-query figure
+    loop_queries = max(1, min(QUERIES, 2_000_000 // count))
+    t0 = time.perf_counter()
+    loop_results = [loop_available(bookings, s, e) for s, e in windows[:loop_queries]]
+    loop_us = (time.perf_counter() - t0) / loop_queries * 1e6
+
+    assert loop_results == index_results[:loop_queries], "index and loop disagree"
+    print(f"{count:>9,} bookings | build {build_ms:9.1f} ms | index {index_us:9.1f} us/query"
+          f" | loop {loop_us:12.1f} us/query | speedup {loop_us / index_us:9.0f}x")
+
+
+if __name__ == "__main__":
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    for size in sizes:
+        run(size)
@@ -0,0 +1,46 @@
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from indexes import ensure_indexes, index_report
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+async def check_indexes():
+    """Report missing/changed/unused indexes; --apply creates missing and rebuilds changed ones, --prune also drops undeclared ones."""
+    client = AsyncIOMotorClient(mongo_url)
+    db = client[db_name]
+    
+    if '--apply' in sys.argv or '--prune' in sys.argv:
+        for action in await ensure_indexes(db, prune='--prune' in sys.argv, rebuild=True):
+            print(f"• {action}")
+    
+    report = await index_report(db)
+    for name, entry in report.items():
+        print(f"\n{name}")
+        for index_name, ops in sorted(entry['usage'].items()):
+            print(f"  {index_name:<45} {ops:>10} ops")
+        for index_name in entry['missing']:
+            print(f"  ! missing    {index_name}")
+        for index_name in entry['changed']:
+            print(f"  ! changed    {index_name}")
+        for index_name in entry['unused']:
+            print(f"  ? unused     {index_name}")
+        for index_name in entry['undeclared']:
+            print(f"  ? undeclared {index_name}")
+    
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(check_indexes())
@@ -0,0 +1,61 @@
+"""Write Parquet/Arrow reports of bookings and invoice lines to a local directory.
+
+    python scripts/export_reports.py --out reports/ --from 2024-05-01 --to 2024-05-31
+    python scripts/export_reports.py --report invoice_lines --format arrow --columns created_at,item_name,item_total
+
+Same output as GET /api/reports/{report}, without going through the API.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import argparse
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+import reports
+from datecodec import date_range
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+async def export_reports(args):
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    
+    out = Path(args.out)
+    out.mkdir(parents=True, exist_ok=True)
+    condition = date_range(args.date_from, args.date_to)
+    columns = args.columns.split(",") if args.columns else None
+    suffix = f"_{args.date_from or 'start'}_{args.date_to or 'now'}" if condition else ""
+    
+    for kind in args.report or list(reports.REPORTS):
+        path = out / f"{kind}{suffix}.{reports.FORMATS[args.format]['extension']}"
+        size = await reports.write_report(db, kind, args.format, path, condition, columns, args.batch_rows)
+        print(f"✓ {path} ({size / 1024:.0f} KiB)")
+    
+    client.close()
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--report", action="append", choices=list(reports.REPORTS))
+    parser.add_argument("--format", choices=list(reports.FORMATS), default="parquet")
+    parser.add_argument("--from", dest="date_from")
+    parser.add_argument("--to", dest="date_to")
+    parser.add_argument("--columns")
+    parser.add_argument("--batch-rows", type=int, default=50_000)
+    parser.add_argument("--out", default="reports")
+    args = parser.parse_args()
+    if not reports.available():
+        sys.exit("! pyarrow is not installed (pip install pyarrow)")
+    asyncio.run(export_reports(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Import customers from a CSV or .xlsx file.
+
+    python scripts/import_customers.py customers.csv
+    python scripts/import_customers.py customers.xlsx --on-duplicate skip --errors import_errors.csv
+
+Same behaviour as POST /api/customers/import (see backend/customer_import.py),
+without the upload.
+"""
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import argparse
+import asyncio
+import csv
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+load_dotenv(BACKEND_DIR / '.env')
+
+import customer_import
+from customer_import import ImportFormatError
+from models import CustomerCreate
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+async def import_file(args):
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    
+    with open(args.path, "rb") as f:
+        if args.path.lower().endswith(".xlsx"):
+            rows = customer_import.xlsx_rows(f)
+        else:
+            rows = customer_import.csv_rows(f)
+        try:
+            report = await customer_import.import_customers(db, rows, CustomerCreate, args.on_duplicate, args.chunk_size)
+        except ImportFormatError as e:
+            sys.exit(f"! {e}")
+        finally:
+            client.close()
+    
+    print(f"✓ {report['rows']} rows: {report['inserted']} inserted, {report['updated']} updated, "
+          f"{report['skipped']} skipped, {report['failed']} failed")
+    if report['errors'] and args.errors:
+        with open(args.errors, "w", newline="", encoding="utf-8") as out:
+            writer = csv.DictWriter(out, fieldnames=["row", "error"])
+            writer.writeheader()
+            writer.writerows(report['errors'])
+        print(f"! errors written to {args.errors}")
+    else:
+        for error in report['errors'][:20]:
+            print(f"! row {error['row']}: {error['error']}")
+    if report['failed'] > len(report['errors']):
+        print(f"! ... {report['failed'] - len(report['errors'])} more errors not listed")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--on-duplicate", choices=customer_import.DUPLICATE_MODES, default="update")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--errors", help="write the per-row error report to this CSV file")
+    args = parser.parse_args()
+    if args.path.lower().endswith(".xlsx") and not customer_import.excel_available():
+        sys.exit("! openpyxl is not installed (pip install openpyxl)")
+    asyncio.run(import_file(args))
+
+if __name__ == "__main__":
+    main()
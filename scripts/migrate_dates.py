@@ -0,0 +1,78 @@
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import UpdateOne
+from dotenv import load_dotenv
+
+from datecodec import to_utc, appointment_fields
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+BATCH_SIZE = 1000
+
+# Timestamp fields that older releases stored as ISO strings
+TIMESTAMP_FIELDS = {
+    "users": ["created_at"],
+    "customers": ["created_at"],
+    "categories": ["created_at"],
+    "taxes": ["created_at"],
+    "products": ["created_at"],
+    "zones": ["created_at"],
+    "bookings": ["created_at", "appointment_datetime"],
+    "invoices": ["created_at"],
+    "settings": ["updated_at"],
+}
+
+async def migrate_collection(db, name, fields):
+    query = {"$or": [{field: {"$type": "string"}} for field in fields]}
+    if name == "bookings":
+        query["$or"].append({"appointment_day": {"$exists": False}})
+    
+    migrated = 0
+    batch = []
+    async for doc in db[name].find(query, {"_id": 1, **{field: 1 for field in fields}}).batch_size(BATCH_SIZE):
+        update = {}
+        for field in fields:
+            if field == "appointment_datetime":
+                if doc.get(field) is not None:
+                    update.update(appointment_fields(doc[field]))
+            elif isinstance(doc.get(field), str):
+                update[field] = to_utc(doc[field])
+        update = {k: v for k, v in update.items() if v is not None}
+        if update:
+            batch.append(UpdateOne({"_id": doc["_id"]}, {"$set": update}))
+        if len(batch) >= BATCH_SIZE:
+            await db[name].bulk_write(batch, ordered=False)
+            migrated += len(batch)
+            batch = []
+    if batch:
+        await db[name].bulk_write(batch, ordered=False)
+        migrated += len(batch)
+    return migrated
+
+async def migrate_dates():
+    """Convert ISO-string timestamps to BSON dates and add bookings.appointment_day.
+
+    Naive strings are read as SHOP_TIMEZONE wall-clock time. Safe to re-run.
+    """
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    
+    for name, fields in TIMESTAMP_FIELDS.items():
+        migrated = await migrate_collection(db, name, fields)
+        print(f"✓ {name}: migrated {migrated} documents")
+    
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(migrate_dates())
@@ -0,0 +1,33 @@
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from rollups import rebuild_rollups
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+async def main():
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    db = client[db_name]
+    
+    count = await rebuild_rollups(db)
+    if count is None:
+        print("! Another rollup rebuild is running; try again when it has finished")
+    else:
+        print(f"✓ Rebuilt {count} analytics rollup documents")
+    
+    client.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())
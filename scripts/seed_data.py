@@ -40,7 +40,7 @@ async def seed_database():
             "name": "Admin User",
             "role": "Admin",
             "password_hash": pwd_context.hash("admin123"),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(admin_user)
         print("[OK] Admin user created (admin@carlogic.com / admin123)")
@@ -62,7 +62,7 @@ async def seed_database():
             "name": "Manager User",
             "role": "Manager",
             "password_hash": pwd_context.hash("manager123"),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(manager_user)
         print("[OK] Manager user created (manager@carlogic.com / manager123)")
@@ -83,7 +83,7 @@ async def seed_database():
             "name": "Staff User",
             "role": "Staff",
             "password_hash": pwd_context.hash("staff123"),
-            "created_at": datetime.now(timezone.utc).isoformat()
+            "created_at": datetime.now(timezone.utc)
         }
         await db.users.insert_one(staff_user)
         print("[OK] Staff user created (staff@carlogic.com / staff123)")
@@ -98,9 +98,9 @@ async def seed_database():
     categories_count = await db.categories.count_documents({})
     if categories_count == 0:
         categories = [
-            {"category_id": "cat-001", "name": "Basic Wash", "description": "Standard washing services", "created_at": datetime.now(timezone.utc).isoformat()},
-            {"category_id": "cat-002", "name": "Premium Wash", "description": "Premium detailing services", "created_at": datetime.now(timezone.utc).isoformat()},
-            {"category_id": "cat-003", "name": "Detailing", "description": "Complete car detailing", "created_at": datetime.now(timezone.utc).isoformat()},
+            {"category_id": "cat-001", "name": "Basic Wash", "description": "Standard washing services", "created_at": datetime.now(timezone.utc)},
+            {"category_id": "cat-002", "name": "Premium Wash", "description": "Premium detailing services", "created_at": datetime.now(timezone.utc)},
+            {"category_id": "cat-003", "name": "Detailing", "description": "Complete car detailing", "created_at": datetime.now(timezone.utc)},
         ]
         await db.categories.insert_many(categories)
         print("[OK] Sample categories created")
@@ -109,8 +109,8 @@ async def seed_database():
     taxes_count = await db.taxes.count_documents({})
     if taxes_count == 0:
         taxes = [
-            {"tax_id": "tax-001", "name": "GST", "percentage": 18.0, "created_at": datetime.now(timezone.utc).isoformat()},
-            {"tax_id": "tax-002", "name": "Service Tax", "percentage": 5.0, "created_at": datetime.now(timezone.utc).isoformat()},
+            {"tax_id": "tax-001", "name": "GST", "percentage": 18.0, "created_at": datetime.now(timezone.utc)},
+            {"tax_id": "tax-002", "name": "Service Tax", "percentage": 5.0, "created_at": datetime.now(timezone.utc)},
         ]
         await db.taxes.insert_many(taxes)
         print("[OK] Sample taxes created")
@@ -119,9 +119,9 @@ async def seed_database():
     zones_count = await db.zones.count_documents({})
     if zones_count == 0:
         zones = [
-            {"zone_id": "zone-001", "name": "Zone A", "is_active": True, "created_at": datetime.now(timezone.utc).isoformat()},
-            {"zone_id": "zone-002", "name": "Zone B", "is_active": True, "created_at": datetime.now(timezone.utc).isoformat()},
-            {"zone_id": "zone-003", "name": "Zone C", "is_active": False, "created_at": datetime.now(timezone.utc).isoformat()},
+            {"zone_id": "zone-001", "name": "Zone A", "is_active": True, "created_at": datetime.now(timezone.utc)},
+            {"zone_id": "zone-002", "name": "Zone B", "is_active": True, "created_at": datetime.now(timezone.utc)},
+            {"zone_id": "zone-003", "name": "Zone C", "is_active": False, "created_at": datetime.now(timezone.utc)},
         ]
         await db.zones.insert_many(zones)
         print("[OK] Sample wash zones created")
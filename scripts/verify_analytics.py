@@ -0,0 +1,156 @@
+import sys
+import os
+from pathlib import Path
+
+# Add backend directory to path
+BACKEND_DIR = Path(__file__).parent.parent / 'backend'
+sys.path.append(str(BACKEND_DIR))
+
+import asyncio
+import random
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+from motor.motor_asyncio import AsyncIOMotorClient
+from dotenv import load_dotenv
+
+from analytics import dashboard_analytics
+from rollups import rebuild_rollups, dashboard_from_rollups
+from datecodec import to_local, appointment_fields
+
+load_dotenv(BACKEND_DIR / '.env')
+
+mongo_url = os.environ['MONGO_URL']
+db_name = os.environ['DB_NAME']
+
+STATUSES = ["Pending", "In Progress", "Completed", "Cancelled"]
+
+def legacy_analytics(bookings, customers, invoices, zones):
+    """The original in-Python /analytics/dashboard computation, kept as the reference."""
+    bookings_by_status = {}
+    for booking in bookings:
+        status = booking.get('status', 'Unknown')
+        bookings_by_status[status] = bookings_by_status.get(status, 0) + 1
+
+    bookings_by_month = defaultdict(int)
+    for booking in bookings:
+        apt_date = to_local(booking.get('appointment_datetime'))
+        if apt_date:
+            bookings_by_month[apt_date.strftime('%Y-%m')] += 1
+
+    revenue_by_month = defaultdict(float)
+    for invoice in invoices:
+        created = to_local(invoice.get('created_at'))
+        if created:
+            revenue_by_month[created.strftime('%Y-%m')] += invoice.get('total', 0)
+
+    zone_utilization = {}
+    for zone in zones:
+        zone_bookings = [b for b in bookings if b.get('zone_id') == zone['zone_id']]
+        zone_utilization[zone['name']] = len(zone_bookings)
+
+    customers_by_month = defaultdict(int)
+    for customer in customers:
+        created = to_local(customer.get('created_at'))
+        if created:
+            customers_by_month[created.strftime('%Y-%m')] += 1
+
+    return {
+        "bookings_by_status": bookings_by_status,
+        "bookings_by_month": dict(sorted(bookings_by_month.items())[-6:]),
+        "revenue_by_month": dict(sorted(revenue_by_month.items())[-6:]),
+        "zone_utilization": zone_utilization,
+        "customers_by_month": dict(sorted(customers_by_month.items())[-6:]),
+        "total_revenue": sum(inv.get('total', 0) for inv in invoices)
+    }
+
+def rounded(value):
+    """Float sums differ in the last bits depending on addition order."""
+    if isinstance(value, dict):
+        return {k: rounded(v) for k, v in value.items()}
+    if isinstance(value, float):
+        return round(value, 6)
+    return value
+
+async def seed(db, count):
+    random.seed(count)
+    now = datetime.now(timezone.utc)
+    zones = [{"zone_id": str(uuid.uuid4()), "name": f"Zone {i}", "is_active": True} for i in range(4)]
+    customers = [
+        {"customer_id": str(uuid.uuid4()), "name": f"Customer {i}", "phone": str(i),
+         "created_at": now - timedelta(days=random.randrange(0, 400))}
+        for i in range(count // 5)
+    ]
+    bookings = []
+    invoices = []
+    for i in range(count):
+        booking = {
+            "booking_id": str(uuid.uuid4()),
+            "booking_number": i + 1,
+            "customer_id": random.choice(customers)['customer_id'],
+            "zone_id": random.choice(zones)['zone_id'],
+            "status": random.choice(STATUSES),
+            "duration_minutes": 60,
+            "created_at": now,
+            **appointment_fields(now - timedelta(days=random.randrange(-30, 400), minutes=random.randrange(0, 1440))),
+        }
+        bookings.append(booking)
+        if booking['status'] == "Completed":
+            invoices.append({
+                "invoice_id": str(uuid.uuid4()),
+                "booking_id": booking['booking_id'],
+                "total": round(random.uniform(10, 300), 2),
+                "created_at": booking['appointment_datetime'] + timedelta(hours=2),
+            })
+    await db.zones.insert_many(zones)
+    await db.customers.insert_many(customers)
+    await db.bookings.insert_many(bookings)
+    if invoices:
+        await db.invoices.insert_many(invoices)
+
+async def verify_analytics():
+    """Compare the aggregation-based analytics and the rollups with the legacy computation.
+
+    By default this seeds a throwaway database (<DB_NAME>_analytics_check) with
+    synthetic data and builds its rollups; pass --live to compare against the
+    real database (and its current rollups, which shows any drift) instead.
+    """
+    client = AsyncIOMotorClient(mongo_url, tz_aware=True)
+    live = '--live' in sys.argv
+    scratch_name = f"{db_name}_analytics_check"
+    db = client[db_name if live else scratch_name]
+
+    if not live:
+        await client.drop_database(scratch_name)
+        await seed(db, 5000)
+        await rebuild_rollups(db)
+
+    expected = legacy_analytics(
+        await db.bookings.find({}, {"_id": 0}).to_list(None),
+        await db.customers.find({}, {"_id": 0}).to_list(None),
+        await db.invoices.find({}, {"_id": 0}).to_list(None),
+        await db.zones.find({}, {"_id": 0}).to_list(None),
+    )
+    outputs = {
+        "aggregation": await dashboard_analytics(db),
+        "rollups": await dashboard_from_rollups(db),
+    }
+
+    if not live:
+        await client.drop_database(scratch_name)
+    client.close()
+
+    failed = False
+    for label, actual in outputs.items():
+        mismatches = [key for key in expected if rounded(expected[key]) != rounded(actual.get(key))]
+        for key in mismatches:
+            print(f"✗ {label} {key}\n  legacy: {expected[key]}\n  {label}: {actual.get(key)}")
+        if mismatches:
+            failed = True
+        else:
+            print(f"✓ {label.capitalize()} output matches the legacy computation ({len(expected)} sections)")
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    asyncio.run(verify_analytics())
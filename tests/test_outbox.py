@@ -0,0 +1,208 @@
+"""Email outbox delivery: claiming, retries, dead letters and requeue.
+
+Runs against an in-memory database (mongomock-motor) with the
+``RecordingTransport`` stub, so no MongoDB server or email provider is needed.
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "backend"))
+os.environ.setdefault("MONGO_URL", "mongodb://localhost:27017")
+os.environ.setdefault("DB_NAME", "outbox_test")
+os.environ["EMAIL_TRANSPORT"] = "stub"
+os.environ["EMAIL_MAX_ATTEMPTS"] = "3"
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+from outbox import EmailOutbox, RecordingTransport  # noqa: E402
+
+
+def new_db():
+    return mongomock_motor.AsyncMongoMockClient(tz_aware=True)["outbox_test"]
+
+
+async def enqueue(outbox, db, subject="Hello"):
+    return await outbox.enqueue(db, ["customer@example.com"], subject, "<p>Hi</p>")
+
+
+async def stored(db, message):
+    return await db.email_outbox.find_one({"message_id": message['message_id']}, {"_id": 0})
+
+
+async def make_due(db, message):
+    await db.email_outbox.update_one(
+        {"message_id": message['message_id']}, {"$set": {"next_attempt_at": datetime.now(timezone.utc)}}
+    )
+
+
+def test_claim_leases_a_message_once():
+    async def run():
+        db = new_db()
+        outbox = EmailOutbox(RecordingTransport())
+        message = await enqueue(outbox, db)
+        first, second = await asyncio.gather(outbox.claim(db), outbox.claim(db))
+        claimed = [m for m in (first, second) if m is not None]
+        assert [m['message_id'] for m in claimed] == [message['message_id']]
+        assert claimed[0]['status'] == "sending"
+        assert claimed[0]['attempts'] == 1
+        assert claimed[0]['lease_until'] > datetime.now(timezone.utc)
+
+    asyncio.run(run())
+
+
+def test_expired_lease_is_claimed_again():
+    async def run():
+        db = new_db()
+        outbox = EmailOutbox(RecordingTransport())
+        message = await enqueue(outbox, db)
+        assert await outbox.claim(db) is not None
+        assert await outbox.claim(db) is None
+        await db.email_outbox.update_one(
+            {"message_id": message['message_id']},
+            {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+        )
+        again = await outbox.claim(db)
+        assert again['message_id'] == message['message_id']
+        assert again['attempts'] == 2
+
+    asyncio.run(run())
+
+
+def test_expired_lease_on_last_attempt_is_dead_lettered():
+    async def run():
+        db = new_db()
+        transport = RecordingTransport()
+        outbox = EmailOutbox(transport, max_attempts=2)
+        message = await enqueue(outbox, db)
+
+        async def crash_mid_send():
+            # Claimed, then the sender dies: the lease simply runs out
+            assert await outbox.claim(db) is not None
+            await db.email_outbox.update_one(
+                {"message_id": message['message_id']},
+                {"$set": {"lease_until": datetime.now(timezone.utc) - timedelta(seconds=1)}}
+            )
+
+        await crash_mid_send()
+        await crash_mid_send()
+        assert await outbox.claim(db) is None
+        assert await outbox.drain(db) == 0
+        doc = await stored(db, message)
+        assert (doc['status'], doc['attempts']) == ("dead", 2)
+        assert "Lease expired" in doc['last_error']
+        assert "lease_until" not in doc
+        assert transport.calls == 0
+
+    asyncio.run(run())
+
+
+def test_failed_send_is_retried_with_backoff():
+    async def run():
+        db = new_db()
+        transport = RecordingTransport(fail_first=2)
+        outbox = EmailOutbox(transport, retry_base_seconds=30, retry_max_seconds=3600)
+        message = await enqueue(outbox, db)
+
+        before = datetime.now(timezone.utc)
+        assert await outbox.drain(db) == 1
+        doc = await stored(db, message)
+        assert doc['status'] == "pending"
+        assert doc['attempts'] == 1
+        assert "Stub transport failure 1/2" in doc['last_error']
+        assert before + timedelta(seconds=15) <= doc['next_attempt_at'] <= datetime.now(timezone.utc) + timedelta(seconds=30)
+        # Not due yet: nothing is attempted
+        assert await outbox.drain(db) == 0
+
+        await make_due(db, message)
+        before = datetime.now(timezone.utc)
+        assert await outbox.drain(db) == 1
+        doc = await stored(db, message)
+        assert doc['attempts'] == 2
+        # The second retry waits twice as long as the first
+        assert before + timedelta(seconds=30) <= doc['next_attempt_at'] <= datetime.now(timezone.utc) + timedelta(seconds=60)
+
+        await make_due(db, message)
+        assert await outbox.drain(db) == 1
+        doc = await stored(db, message)
+        assert doc['status'] == "sent"
+        assert doc['provider_id'] == "stub-1"
+        assert "lease_until" not in doc
+        assert [m['subject'] for m in transport.sent] == ["Hello"]
+
+    asyncio.run(run())
+
+
+def test_retry_delay_is_capped():
+    outbox = EmailOutbox(RecordingTransport(), retry_base_seconds=30, retry_max_seconds=3600)
+    for attempts in (1, 4, 20):
+        expected = min(3600, 30 * 2 ** (attempts - 1))
+        assert expected / 2 <= outbox.retry_delay(attempts) <= expected
+
+
+def test_message_is_dead_after_max_attempts_and_can_be_requeued():
+    async def run():
+        db = new_db()
+        transport = RecordingTransport(fail_first=3)
+        outbox = EmailOutbox(transport, max_attempts=3)
+        message = await enqueue(outbox, db)
+
+        for attempt in range(3):
+            await make_due(db, message)
+            assert await outbox.drain(db) == 1
+        doc = await stored(db, message)
+        assert doc['status'] == "dead"
+        assert doc['attempts'] == 3
+        assert transport.sent == []
+        # Dead letters are never picked up again on their own
+        await make_due(db, message)
+        assert await outbox.drain(db) == 0
+
+        stats = await outbox.stats(db)
+        assert stats['counts']['dead'] == 1
+        assert [m['message_id'] for m in stats['dead']] == [message['message_id']]
+
+        assert await outbox.requeue(db, message['message_id'])
+        doc = await stored(db, message)
+        assert (doc['status'], doc['attempts']) == ("pending", 0)
+        assert await outbox.drain(db) == 1
+        assert (await stored(db, message))['status'] == "sent"
+        assert len(transport.sent) == 1
+
+        # Only dead messages can be requeued
+        assert not await outbox.requeue(db, message['message_id'])
+        assert not await outbox.requeue(db, "no-such-message")
+
+    asyncio.run(run())
+
+
+def test_server_uses_stub_transport_and_configured_attempts():
+    from fastapi.testclient import TestClient
+
+    import server
+
+    assert isinstance(server.email_transport, RecordingTransport)
+    assert server.email_outbox.max_attempts == 3
+
+    server.db = new_db()
+    client = TestClient(server.app)
+    response = client.post("/api/auth/register", json={
+        "email": "admin@example.com", "password": "secret", "name": "Admin", "role": "Admin"
+    })
+    headers = {"Authorization": f"Bearer {response.json()['token']}"}
+    response = client.post("/api/send-email", json={
+        "recipient_email": "customer@example.com", "subject": "Queued", "html_content": "<p>Hi</p>"
+    }, headers=headers)
+    assert response.status_code == 200
+    assert response.json()['status'] == "queued"
+
+    async def deliver():
+        await server.email_outbox.drain(server.db)
+        return await stored(server.db, response.json())
+
+    doc = asyncio.run(deliver())
+    assert doc['status'] == "sent"
+    assert server.email_transport.sent[-1]['to'] == ["customer@example.com"]